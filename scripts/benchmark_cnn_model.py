@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Benchmark the image inference throughput of the neural network model.
+
+Measures the images per second by batch size of the decode and resize
+pipeline alone, sequential and prefetching on a thread pool, and of the
+whole prediction with the saved network on CPU. Synthetic JPEG images are
+used, so no dataset is needed:
+
+    PYTHONPATH=src/models/cnn_keras_model \
+        python scripts/benchmark_cnn_model.py \
+        --batch-sizes 1 8 32 128 --output benchmark_cnn.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import time
+
+
+DEFAULT_BATCH_SIZES = [1, 8, 16, 32, 64, 128]
+
+
+def make_images(count, size, seed=0):
+    """
+    Random JPEG encoded images, smooth enough to compress like photos.
+        :param count: number of images
+        :param size: side of the square images, in pixels
+        :param seed=0: random seed
+    """
+    import cv2
+    import numpy as np
+
+    random = np.random.RandomState(seed)
+    images = []
+    for _ in range(count):
+        noise = random.randint(0, 256, (size // 8, size // 8, 3),
+                               dtype=np.uint8)
+        image = cv2.resize(noise, (size, size),
+                           interpolation=cv2.INTER_CUBIC)
+        images.append(cv2.imencode('.jpg', image)[1].tobytes())
+    return images
+
+
+def images_per_second(function, count, repeats):
+    """
+    Best throughput of a few runs.
+        :param function: function without arguments processing count images
+        :param count: number of images processed by a call
+        :param repeats: number of calls
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def benchmark_decode(images, batch_sizes, workers, repeats):
+    """
+    Throughput of the decode and resize pipeline, without the network.
+        :param images: encoded images
+        :param batch_sizes: batch sizes to measure
+        :param workers: decoding threads of the prefetching pipeline
+        :param repeats: runs of every measure
+    """
+    from neural_network_model.processing.images import iter_batches
+
+    def consume(batch_size, workers, prefetch):
+        for _ in iter_batches(images, batch_size=batch_size,
+                              workers=workers, prefetch=prefetch):
+            pass
+
+    results = {}
+    for batch_size in batch_sizes:
+        sequential = images_per_second(
+            lambda: consume(batch_size, 1, 0), len(images), repeats)
+        prefetching = images_per_second(
+            lambda: consume(batch_size, workers, 2), len(images), repeats)
+        results[str(batch_size)] = {
+            'sequential_images_per_second': sequential,
+            'prefetching_images_per_second': prefetching,
+        }
+        print(f'decode {batch_size:>6} batch {sequential:>10.1f} images/s '
+              f'sequential {prefetching:>10.1f} images/s prefetching')
+    return results
+
+
+def benchmark_predict(images, batch_sizes, workers, repeats):
+    """
+    Throughput of the whole prediction with the saved network.
+        :param images: encoded images
+        :param batch_sizes: batch sizes to measure
+        :param workers: decoding threads
+        :param repeats: runs of every measure
+    """
+    from neural_network_model.predict import iter_predictions, warmup
+
+    warmup()
+    results = {}
+    for batch_size in batch_sizes:
+        def predict():
+            for _ in iter_predictions(input_data=images,
+                                      batch_size=batch_size,
+                                      workers=workers):
+                pass
+        predict()  # the network builds a function per input shape
+        throughput = images_per_second(predict, len(images), repeats)
+        results[str(batch_size)] = {'images_per_second': throughput}
+        print(f'predict {batch_size:>5} batch {throughput:>10.1f} images/s')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--images', type=int, default=512,
+                        help='number of images of every measure')
+    parser.add_argument('--image-size', type=int, default=400,
+                        help='side of the synthetic images, in pixels')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='decoding threads')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--decode-only', action='store_true',
+                        help='skip the network, no trained model needed')
+    parser.add_argument('--output', help='json file to write the results to')
+    args = parser.parse_args()
+
+    import cv2
+    import numpy
+    from neural_network_model import __version__ as version
+
+    logging.getLogger('neural_network_model').setLevel(logging.WARNING)
+
+    images = make_images(args.images, args.image_size)
+    results = {
+        'model_version': version,
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'opencv': cv2.__version__,
+        'cpus': os.cpu_count(),
+        'workers': args.workers,
+        'images': args.images,
+        'image_size': args.image_size,
+        'decode': benchmark_decode(images, args.batch_sizes, args.workers,
+                                   args.repeats),
+    }
+    if not args.decode_only:
+        import keras
+        results['keras'] = keras.__version__
+        results['predict'] = benchmark_predict(
+            images, args.batch_sizes, args.workers, args.repeats)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+"""
+Benchmark the inference of the regression model.
+
+Measures the import and model load time, the load time of the pickled and of
+the memory mapped pipeline, the latency and peak memory of the prediction
+functions at several batch sizes, the time spent in every step of the
+pipeline, the fused categorical encoder against the two encoders it replaces,
+and the peak memory of the pipeline with and without copies in the steps.
+Results are written to JSON, and can be compared with the results of another
+commit:
+
+    PYTHONPATH=src/models/regression_model python scripts/benchmark_model.py \
+        --output benchmark.json --compare baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 10000, 1000000]
+
+# the record based frozen pipeline is meant for small batches
+FROZEN_MAX_BATCH_SIZE = 100
+
+IMPORT_SCRIPT = '''
+import json
+import logging
+import sys
+import time
+start = time.perf_counter()
+from regression_model.predict import make_prediction
+from regression_model.processing.data_management import pipeline_registry
+imported = time.perf_counter()
+logging.getLogger('regression_model').setLevel(sys.argv[1])
+pipeline_registry.get()
+loaded = time.perf_counter()
+# one write, the package logs are written by a background thread
+sys.stdout.write('import_times: ' + json.dumps(
+    {'import_s': imported - start, 'load_s': loaded - imported}) + '\\n')
+'''
+
+
+def git_commit():
+    """Return the current git commit, None outside of a git checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_batch(data, batch_size):
+    """
+    Repeat the rows of a dataset up to a batch size.
+        :param data: dataset
+        :param batch_size: number of rows
+    """
+    import pandas as pd
+
+    repeats = batch_size // len(data) + 1
+    return pd.concat([data] * repeats, ignore_index=True)[:batch_size]
+
+
+def time_call(function, min_repeats=3, min_time=1.0):
+    """
+    Call a function repeatedly, returns the time of every call in seconds.
+        :param function: function without arguments
+        :param min_repeats=3: minimum number of calls
+        :param min_time=1.0: minimum total time in seconds
+    """
+    times = []
+    while len(times) < min_repeats or sum(times) < min_time:
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+        if len(times) >= 1000:
+            break
+    return times
+
+
+def peak_memory(function):
+    """
+    Return the peak memory allocated by a call, in bytes.
+        :param function: function without arguments
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_import(log_level):
+    """
+    Time the import of the package and the model load, in a new process.
+        :param log_level: level of the package logs while loading the model
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_SCRIPT, log_level])
+    # the package logs are written in the background, around this line
+    line, = [line for line in output.decode().splitlines()
+             if line.startswith('import_times: ')]
+    return json.loads(line[len('import_times: '):])
+
+
+def benchmark_load(min_time):
+    """
+    Load time of the pickled pipeline and of its memory mapped artifact.
+        :param min_time: minimum time spent on every format, in seconds
+    """
+    from regression_model.config import config
+    from regression_model.processing.data_management import load_pipeline
+    from regression_model import __version__ as version
+
+    file_names = {
+        'pickle': f'{config.PIPELINE_SAVE_FILE}{version}.pkl',
+        'artifact': f'{config.ARTIFACT_SAVE_DIR}{version}',
+    }
+    results = {}
+    for name, file_name in file_names.items():
+        times = time_call(lambda: load_pipeline(file_name=file_name),
+                          min_time=min_time)
+        results[name] = statistics.median(times) * 1000
+        print(f'load {name:<19}{results[name]:>23.3f} ms')
+    return {'median_ms': results}
+
+
+def benchmark_latency(data, batch_sizes, min_time):
+    """
+    Latency, throughput and peak memory of every prediction function.
+        :param data: valid input rows
+        :param batch_sizes: batch sizes to measure
+        :param min_time: minimum time spent on every measure, in seconds
+    """
+    from regression_model.predict import (
+        make_batch_prediction, make_frozen_prediction, make_prediction)
+
+    functions = {
+        'make_prediction': lambda batch: make_prediction(input_data=batch),
+        'make_batch_prediction':
+            lambda batch: make_batch_prediction(input_data=batch),
+    }
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = make_batch(data, batch_size)
+        records = None
+        if batch_size <= FROZEN_MAX_BATCH_SIZE:
+            records = batch.to_dict(orient='records')
+        calls = dict(functions)
+        if records is not None:
+            calls['make_frozen_prediction'] = (
+                lambda _: make_frozen_prediction(input_data=records))
+
+        for name, function in calls.items():
+            def call():
+                return function(batch)
+            call()  # warm up
+            times = time_call(call, min_time=min_time)
+            results.setdefault(name, {})[str(batch_size)] = {
+                'repeats': len(times),
+                'min_ms': min(times) * 1000,
+                'median_ms': statistics.median(times) * 1000,
+                'mean_ms': statistics.mean(times) * 1000,
+                'rows_per_second': batch_size / statistics.median(times),
+                'peak_memory_bytes': peak_memory(call),
+            }
+            print(f'{name:<24}{batch_size:>10} rows '
+                  f'{statistics.median(times) * 1000:>12.3f} ms')
+    return results
+
+
+def benchmark_steps(data, batch_size, min_time):
+    """
+    Time spent in every step of the pipeline, for one batch size.
+        :param data: valid input rows
+        :param batch_size: number of rows
+        :param min_time: minimum time spent on every step, in seconds
+    """
+    from regression_model.config import config
+    from regression_model.processing.data_management import (
+        load_pipeline, pipeline_registry)
+    from regression_model import __version__ as version
+
+    # a pipeline whose steps copy their input, so that every step can
+    # be timed repeatedly on the same input
+    pipeline = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{version}.pkl')
+    pipeline_registry.get()
+    X = make_batch(data, batch_size)[config.FEATURES]
+
+    results = {}
+    *transformers, (model_name, model) = pipeline.steps
+    for name, step in transformers:
+        times = time_call(lambda: step.transform(X), min_time=min_time)
+        results[name] = statistics.median(times) * 1000
+        X = step.transform(X)
+    times = time_call(lambda: model.predict(X), min_time=min_time)
+    results[model_name] = statistics.median(times) * 1000
+
+    total = sum(results.values())
+    for name, step_ms in results.items():
+        print(f'{name:<24}{step_ms:>12.3f} ms {step_ms / total:>8.1%}')
+    return {'batch_size': batch_size, 'median_ms': results}
+
+
+def benchmark_encoders(batch_size, min_time):
+    """
+    Time of the fused categorical encoder against the two encoders.
+        :param batch_size: number of rows
+        :param min_time: minimum time spent on every encoder, in seconds
+    """
+    import numpy as np
+    from regression_model.config import config
+    from regression_model.processing import preprocessors as pp
+    from regression_model.processing.data_management import load_dataset
+
+    imputer = pp.CategoricalImputer(variables=config.CATEGORICAL_VARS_WITH_NA)
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = imputer.transform(data[config.FEATURES]), np.log(
+        data[config.TARGET])
+    rare_encoder = pp.RareLabelCategoricalEncoder(
+        tol=0.01, variables=config.CATEGORICAL_VARS).fit(X, y)
+    encoder = pp.CategoricalEncoder(variables=config.CATEGORICAL_VARS).fit(
+        rare_encoder.transform(X), y)
+    fused = pp.RareLabelOrdinalEncoder(
+        tol=0.01, variables=config.CATEGORICAL_VARS).fit(X, y)
+    batch = make_batch(X, batch_size)
+
+    encoders = {
+        'two_step': lambda: encoder.transform(rare_encoder.transform(batch)),
+        'fused': lambda: fused.transform(batch),
+    }
+    results = {}
+    for name, function in encoders.items():
+        times = time_call(function, min_time=min_time)
+        results[name] = statistics.median(times) * 1000
+        print(f'{name + " encoding":<24}{batch_size:>10} rows '
+              f'{results[name]:>12.3f} ms')
+    return {'batch_size': batch_size, 'median_ms': results}
+
+
+def benchmark_copies(data, batch_size):
+    """
+    Peak memory of the pipeline with copying and with in place steps.
+        :param data: valid input rows
+        :param batch_size: number of rows
+    """
+    from regression_model.config import config
+    from regression_model.processing.data_management import (
+        disable_copies, load_pipeline)
+    from regression_model import __version__ as version
+
+    file_name = f'{config.PIPELINE_SAVE_FILE}{version}.pkl'
+    pipelines = {'copy': load_pipeline(file_name=file_name),
+                 'in_place': disable_copies(load_pipeline(
+                     file_name=file_name))}
+    batch = make_batch(data, batch_size)[config.FEATURES]
+
+    results = {}
+    for name, pipeline in pipelines.items():
+        # the in place steps modify their input, each call gets its own
+        X = batch.copy()
+        results[name] = peak_memory(lambda: pipeline.predict(X))
+        print(f'{name:<24}{batch_size:>10} rows '
+              f'{results[name] / 2 ** 20:>12.1f} MiB peak')
+    return {'batch_size': batch_size, 'peak_memory_bytes': results}
+
+
+def load_data():
+    """Test rows, without the ones the model would reject"""
+    from regression_model.config import config
+    from regression_model.processing.data_management import load_dataset
+    from regression_model.processing.validation import validate_inputs
+
+    data = load_dataset(file_name=config.TESTING_DATA_FILE)
+    return validate_inputs(input_data=data).reset_index(drop=True)
+
+
+def compare(results, baseline):
+    """
+    Print the ratio of every latency to a baseline, above 1 is slower.
+        :param results: benchmark results
+        :param baseline: benchmark results to compare with
+    """
+    print(f"\ncompared with {baseline.get('commit')}")
+    for name, sizes in results['latency'].items():
+        for batch_size, result in sizes.items():
+            base = baseline['latency'].get(name, {}).get(batch_size)
+            if base is None:
+                continue
+            ratio = result['median_ms'] / base['median_ms']
+            print(f'{name:<24}{batch_size:>10} rows {ratio:>8.2f}x')
+    for name, step_ms in results['steps']['median_ms'].items():
+        base = baseline['steps']['median_ms'].get(name)
+        if base:
+            print(f'{name:<35}{step_ms / base:>8.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--step-batch-size', type=int, default=10000,
+                        help='batch size of the per step breakdown')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='minimum seconds spent on every measure')
+    parser.add_argument('--output', help='json file to write the results to')
+    parser.add_argument('--compare', help='json results to compare with')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='level of the package logs while measuring, '
+                             'INFO to include the cost of the prediction '
+                             'logs')
+    args = parser.parse_args()
+
+    import numpy
+    import pandas
+    import sklearn
+    from regression_model import __version__ as version
+
+    logging.getLogger('regression_model').setLevel(args.log_level)
+
+    results = {
+        'commit': git_commit(),
+        'model_version': version,
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'log_level': args.log_level,
+        'import': benchmark_import(args.log_level),
+    }
+    print(f"import {results['import']['import_s'] * 1000:.1f} ms, "
+          f"model load {results['import']['load_s'] * 1000:.1f} ms")
+
+    results['load'] = benchmark_load(args.min_time)
+
+    data = load_data()
+    results['latency'] = benchmark_latency(data, args.batch_sizes,
+                                           args.min_time)
+    results['steps'] = benchmark_steps(data, args.step_batch_size,
+                                       args.min_time)
+    results['encoders'] = benchmark_encoders(args.step_batch_size,
+                                             args.min_time)
+    results['copies'] = benchmark_copies(data, args.step_batch_size)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Load test the prediction endpoints.
+
+Sends single-record prediction requests from concurrent clients and reports
+the latency percentiles and throughput of every target, e.g. comparing the
+WSGI and ASGI modes:
+
+    python scripts/load_test.py \
+        --email user@email.com --password secret \
+        --token-url http://localhost:8000/api/user/token/ \
+        --data src/models/regression_model/regression_model/datasets/test.csv \
+        --target wsgi=http://localhost:8000/api/predict/ \
+        --target asgi=http://localhost:8001/api/predict/async/
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import threading
+import time
+import urllib.request
+
+
+def read_records(file_name, limit=1000):
+    """
+    Read house records from a csv file, casting the numbers.
+        :param file_name: csv file with the records
+        :param limit=1000: max number of records to read
+    """
+    records = []
+    with open(file_name) as csv_file:
+        for row in csv.DictReader(csv_file):
+            record = {}
+            for key, value in row.items():
+                if value in ('', 'NA'):
+                    record[key] = None
+                    continue
+                try:
+                    record[key] = float(value)
+                except ValueError:
+                    record[key] = value
+            records.append(record)
+            if len(records) == limit:
+                break
+    return records
+
+
+def post(url, payload, token=None):
+    """
+    Post a json payload, returns the decoded json response.
+        :param url: url
+        :param payload: json serializable payload
+        :param token=None: JWT token
+    """
+    headers = {'Content-Type': 'application/json'}
+    if token is not None:
+        headers['Authorization'] = 'JWT ' + token
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers=headers, method='POST')
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode())
+
+
+def percentile(values, fraction):
+    """
+    Return a percentile of a sorted list.
+        :param values: sorted values
+        :param fraction: percentile, between 0 and 1
+    """
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def run(url, token, records, concurrency, number_of_requests):
+    """
+    Send the requests from concurrent clients, returns the statistics.
+        :param url: prediction url
+        :param token: JWT token
+        :param records: records to send, one per request
+        :param concurrency: number of concurrent clients
+        :param number_of_requests: total number of requests
+    """
+    latencies = []
+    errors = []
+    counter = iter(range(number_of_requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            record = records[index % len(records)]
+            start = time.perf_counter()
+            try:
+                post(url, record, token)
+            except Exception as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else None,
+        'requests_per_second': len(latencies) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--target', action='append', required=True,
+                        help='name=url of a prediction endpoint')
+    parser.add_argument('--data', required=True,
+                        help='csv file with the records to send')
+    parser.add_argument('--token-url', help='url to request a JWT token')
+    parser.add_argument('--email', help='user to request the token')
+    parser.add_argument('--password', help='password to request the token')
+    parser.add_argument('--token', help='JWT token, instead of requesting')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    token = args.token
+    if token is None:
+        token = post(args.token_url, {'email': args.email,
+                                      'password': args.password})['token']
+    records = read_records(args.data)
+
+    print(f"{'mode':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'req/s':>10}")
+    for target in args.target:
+        name, url = target.split('=', 1)
+        stats = run(url, token, records, args.concurrency, args.requests)
+        print(f"{name:<10}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms'] or 0:>10.1f}{stats['p99_ms'] or 0:>10.1f}"
+              f"{stats['requests_per_second']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Prediction requests to /api/predict/async/ are served by an async view that
+scores them in a pool of worker processes, every other request is handed to
+the Django WSGI application. Run it with an ASGI server, e.g.:
+
+    uvicorn app.asgi:application --host 0.0.0.0 --port 8001
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+django_application = get_wsgi_application()
+
+from predict.asgi import AsyncPredictApplication  # noqa: E402
+
+application = AsyncPredictApplication(fallback=WsgiToAsgi(django_application))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
+import json
 import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'core',
     'user',
+    'predict',
 ]
 
 MIDDLEWARE = [
@@ -128,5 +130,53 @@ STATIC_URL = '/static/'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Model serving
+# Concurrent prediction requests are scored together, in batches of up to
+# PREDICT_MAX_BATCH_SIZE rows collected during PREDICT_MAX_LATENCY_MS.
+
+PREDICT_MAX_BATCH_SIZE = int(os.environ.get('PREDICT_MAX_BATCH_SIZE', 64))
+
+PREDICT_MAX_LATENCY_MS = float(os.environ.get('PREDICT_MAX_LATENCY_MS', 5))
+
+PREDICT_TIMEOUT = float(os.environ.get('PREDICT_TIMEOUT', 10))
+
+PREDICT_WARMUP = os.environ.get('PREDICT_WARMUP', '') == '1'
+
+# alias of the cache sharing predictions between workers, e.g. 'default',
+# predictions are cached in the memory of each worker if empty
+PREDICT_CACHE = os.environ.get('PREDICT_CACHE', '')
+
+# share of the prediction calls timed step by step, served with the
+# other metrics of each process at /api/predict/metrics/, 0 disables it
+PREDICT_PIPELINE_METRICS_SAMPLE_RATE = float(
+    os.environ.get('PREDICT_PIPELINE_METRICS_SAMPLE_RATE', 0))
+
+# worker processes scoring the requests of the ASGI application
+PREDICT_WORKERS = int(os.environ.get('PREDICT_WORKERS', os.cpu_count() or 1))
+
+# Model plugins
+# Every installed model package is served at /api/predict/models/<name>/
+# from its own pool of PREDICT_MODEL_WORKERS processes, serving at most
+# PREDICT_MODEL_MAX_CONCURRENCY requests at once. Requests wait up to
+# PREDICT_MODEL_QUEUE_TIMEOUT seconds for a free slot.
+
+PREDICT_MODEL_WORKERS = int(os.environ.get('PREDICT_MODEL_WORKERS', 1))
+
+PREDICT_MODEL_MAX_CONCURRENCY = int(
+    os.environ.get('PREDICT_MODEL_MAX_CONCURRENCY', 4))
+
+PREDICT_MODEL_QUEUE_TIMEOUT = float(
+    os.environ.get('PREDICT_MODEL_QUEUE_TIMEOUT', 1))
+
+# per model workers and max_concurrency, e.g.
+# {"neural_network_model": {"workers": 2, "max_concurrency": 2}}
+PREDICT_MODEL_OPTIONS = json.loads(
+    os.environ.get('PREDICT_MODEL_OPTIONS', '{}'))
+
+# plugins that are not installed as packages, by model name, e.g.
+# {"regression_model": "regression_model.plugin:plugin"}
+PREDICT_MODEL_PLUGINS = json.loads(
+    os.environ.get('PREDICT_MODEL_PLUGINS', '{}'))
+
 # rest configuration
 from app.restconf.main import *
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class PredictConfig(AppConfig):
+    name = 'predict'
+
+    def ready(self):
+        """Load the models at startup, instead of on the first request"""
+        from regression_model.processing.instrumentation import (
+            pipeline_metrics)
+        pipeline_metrics.sample_rate = (
+            settings.PREDICT_PIPELINE_METRICS_SAMPLE_RATE)
+        if settings.PREDICT_WARMUP:
+            from regression_model.predict import warmup
+            from predict.plugins import model_registry
+            warmup()
+            model_registry.warmup()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+
+from regression_model.predict import warmup
+from regression_model.processing.data_management import version_router
+
+from predict.scoring import parse_records, predict_rows
+
+
+PREDICT_ASYNC_PATH = '/api/predict/async/'
+
+_logger = logging.getLogger(__name__)
+
+
+def _warmup_worker():
+    """Load the model once in every worker process"""
+    warmup()
+
+
+def authenticate(authorization):
+    """Return the user of a JWT authorization header, None if invalid"""
+    request = HttpRequest()
+    request.META['HTTP_AUTHORIZATION'] = authorization
+    try:
+        result = JSONWebTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    finally:
+        close_old_connections()
+    return result[0] if result else None
+
+
+class AsyncPredictApplication:
+    """ASGI application serving predictions from a process pool.
+
+    Prediction requests are handled on the event loop, while the CPU
+    bound scoring runs in a pool of worker processes that load the model
+    once, so a single server uses every core without blocking on I/O.
+    Every other request is passed on to the fallback application.
+    """
+
+    def __init__(self, fallback, max_workers=None, executor=None):
+        """
+        Initialization function.
+            :param fallback: ASGI application for the other paths
+            :param max_workers=None: number of worker processes
+            :param executor=None: executor to use instead of a process pool
+        """
+        self.fallback = fallback
+        self.max_workers = max_workers or settings.PREDICT_WORKERS
+        self.executor = executor
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_warmup_worker)
+        return self.executor
+
+    async def _startup(self):
+        """Start the worker processes ahead of the first request"""
+        loop = asyncio.get_event_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, _warmup_worker)
+            for _ in range(self.max_workers)])
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self._startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http' or scope['path'] != PREDICT_ASYNC_PATH:
+            return await self.fallback(scope, receive, send)
+        if scope['method'] != 'POST':
+            return await self._respond(send, 405,
+                                       {'detail': 'Method not allowed.'})
+        return await self.predict(scope, receive, send)
+
+    async def predict(self, scope, receive, send):
+        """Async prediction view"""
+        loop = asyncio.get_event_loop()
+        headers = dict(scope['headers'])
+        authorization = headers.get(b'authorization', b'').decode('latin1')
+        if not authorization:
+            user = None
+        else:
+            # the user lookup hits the database, keep it off the loop
+            user = await loop.run_in_executor(None, authenticate,
+                                              authorization)
+        if user is None:
+            return await self._respond(
+                send, 401,
+                {'detail': 'Authentication credentials were not provided.'})
+
+        body = await self._read_body(receive)
+        try:
+            data = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return await self._respond(send, 400,
+                                       {'detail': 'JSON parse error'})
+        rows, error = parse_records(data)
+        if error:
+            return await self._respond(send, 400, {'detail': error})
+
+        version = version_router.choose_version()
+        try:
+            predictions = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), predict_rows,
+                                     rows, version),
+                timeout=settings.PREDICT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return await self._respond(send, 504, {
+                'detail': f'The model did not answer in '
+                          f'{settings.PREDICT_TIMEOUT} seconds'})
+        except Exception as e:
+            _logger.exception('Prediction failed')
+            if isinstance(e, BrokenProcessPool):
+                # a worker died, the next request starts a new pool
+                self.executor = None
+            return await self._respond(send, 500,
+                                       {'detail': 'Prediction failed'})
+        return await self._respond(send, 200, {'predictions': predictions,
+                                               'version': version})
+
+    async def _read_body(self, receive):
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+        return body
+
+    async def _respond(self, send, status, data):
+        content = json.dumps(data).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(content)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': content})
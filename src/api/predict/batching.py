@@ -0,0 +1,81 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class PredictionBatcher:
+    """Aggregate concurrent single-row requests into batch predictions.
+
+    Rows submitted from the request threads are queued, and a background
+    thread scores them together in one vectorized call as soon as
+    max_batch_size rows are waiting, or max_latency seconds have passed
+    since the first of them arrived.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_latency=0.005):
+        """
+        Initialization function.
+            :param predict_batch: callable scoring a list of rows, returns
+                                  one result per row
+            :param max_batch_size=64: max number of rows per batch
+            :param max_latency=0.005: max seconds a row waits for others
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        """Start the worker thread, once per process"""
+        # threads do not survive a fork, pre-fork workers start their own
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for prediction, returns a future of its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, rows, timeout=None):
+        """Predict some rows, blocking until their batches are scored"""
+        futures = [self.submit(row) for row in rows]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def _collect(self):
+        """Wait for the next batch of queued rows"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = [row for row, _ in batch]
+            try:
+                results = self.predict_batch(rows)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,258 @@
+"""Serve the model packages installed next to the API.
+
+Model packages register a plugin under the ENTRY_POINT_GROUP entry point
+group. A plugin has a name, a version, the JSON schema of one input record
+(input_schema), and load(), warmup() and predict_batch(rows) methods.
+predict_batch returns a dict with the 'predictions', one per row and
+None for the invalid rows, and the 'version' of the model that made
+them, which can differ from the plugin version when the package routes
+some of the traffic to a candidate model.
+
+Every model is served from its own pool of worker processes, loaded and
+warmed up once, and accepts a limited number of concurrent requests, so
+the slow requests of one model never hold the workers of another.
+"""
+
+import importlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import pkg_resources
+from django.conf import settings
+
+
+ENTRY_POINT_GROUP = 'deployment_framework.models'
+
+REQUIRED_ATTRIBUTES = ('name', 'version', 'input_schema', 'load', 'warmup',
+                       'predict_batch')
+
+# plugins loaded in this process, by import path
+_loaded_plugins = {}
+
+
+class ModelBusy(Exception):
+    """The model is already serving its max number of requests"""
+
+
+class ModelTimeout(Exception):
+    """The model did not answer in time"""
+
+
+class ModelUnavailable(Exception):
+    """A worker process of the model died"""
+
+
+def load_plugin(path):
+    """
+    Import a plugin, once per process.
+        :param path: import path of the plugin, 'module:attribute'
+    """
+    if path not in _loaded_plugins:
+        module_name, _, attribute = path.partition(':')
+        plugin = importlib.import_module(module_name)
+        for name in attribute.split('.'):
+            plugin = getattr(plugin, name)
+        missing = [name for name in REQUIRED_ATTRIBUTES
+                   if not hasattr(plugin, name)]
+        if missing:
+            raise TypeError(f'{path} is not a model plugin, '
+                            f'it has no {", ".join(missing)}')
+        _loaded_plugins[path] = plugin
+    return _loaded_plugins[path]
+
+
+def _warmup_worker(path):
+    """Load and warm up a plugin in a worker process"""
+    plugin = load_plugin(path)
+    plugin.load()
+    plugin.warmup()
+
+
+def _start_worker():
+    """Nothing, the worker process is warmed up by the pool initializer"""
+
+
+def _predict_in_worker(path, rows):
+    return load_plugin(path).predict_batch(rows)
+
+
+def discover_plugins():
+    """Import paths of the installed plugins, by model name"""
+    paths = {}
+    for entry_point in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP):
+        paths[entry_point.name] = (
+            f'{entry_point.module_name}:{".".join(entry_point.attrs)}')
+    # plugins of packages that are only on the path, e.g. in development
+    paths.update(settings.PREDICT_MODEL_PLUGINS)
+    return paths
+
+
+def check_records(data, input_schema):
+    """Return the records of a request payload, and an error if any"""
+    rows = [data] if isinstance(data, dict) else data
+    is_valid = isinstance(rows, list) and len(rows) > 0
+    if not is_valid or not all(isinstance(row, dict) for row in rows):
+        return None, 'Expected a record or a list of records'
+    missing = sorted({field for row in rows
+                      for field in input_schema.get('required', [])
+                      if field not in row})
+    if missing:
+        return None, 'Missing fields: ' + ', '.join(missing)
+    return rows, None
+
+
+class ModelServer:
+    """One model, served from its own pool of worker processes"""
+
+    def __init__(self, name, path, workers=1, max_concurrency=4,
+                 executor=None):
+        """
+        Initialization function.
+            :param name: model name
+            :param path: import path of the plugin, 'module:attribute'
+            :param workers=1: number of worker processes
+            :param max_concurrency=4: max requests served at once,
+                                      further ones wait for a slot
+            :param executor=None: executor to use instead of a process
+                                  pool, warmed up once by warmup()
+        """
+        self.name = name
+        self.path = path
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.plugin = load_plugin(path)
+        self._executor = executor
+        # only the pools created here are replaced when a worker dies
+        self._owns_executor = executor is None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_warmup_worker,
+                    initargs=(self.path,))
+            return self._executor
+
+    def _replace_broken_executor(self, executor):
+        """Drop a pool whose worker died, the next request starts one"""
+        with self._lock:
+            if self._owns_executor and self._executor is executor:
+                executor.shutdown(wait=False)
+                self._executor = None
+
+    def warmup(self):
+        """Start the worker processes ahead of the first request"""
+        if self._executor is not None:
+            # not a pool of ours, its workers have no initializer
+            self._executor.submit(_warmup_worker, self.path).result()
+            return
+        executor = self._get_executor()
+        # the pool starts a worker per pending task, up to workers, and
+        # every worker loads and warms up the plugin in the initializer
+        futures = [executor.submit(_start_worker)
+                   for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def predict(self, rows, queue_timeout=None, timeout=None):
+        """
+        Predict some rows in a worker process, returns the predictions
+        and the model version, as predict_batch.
+            :param rows: input records
+            :param queue_timeout=None: max seconds to wait for a free slot
+            :param timeout=None: max seconds to wait for the predictions
+        """
+        if not self._slots.acquire(timeout=queue_timeout):
+            raise ModelBusy(f'{self.name} is serving '
+                            f'{self.max_concurrency} requests already')
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_predict_in_worker, self.path, rows)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._replace_broken_executor(executor)
+            raise ModelUnavailable(f'{self.name} lost a worker process')
+        except Exception:
+            self._slots.release()
+            raise
+        # a running prediction can not be cancelled, its slot is held
+        # until it finishes, even once the caller stopped waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise ModelTimeout(f'{self.name} did not answer '
+                               f'in {timeout} seconds')
+        except BrokenProcessPool:
+            # a worker crashed, e.g. out of memory, or failed its warmup
+            self._replace_broken_executor(executor)
+            raise ModelUnavailable(f'{self.name} lost a worker process')
+
+    def describe(self):
+        return {'name': self.name, 'version': self.plugin.version,
+                'input_schema': self.plugin.input_schema,
+                'max_concurrency': self.max_concurrency}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class ModelRegistry:
+    """The model servers of the installed plugins, created on first use"""
+
+    def __init__(self, plugins=None, executor_factory=None):
+        """
+        Initialization function.
+            :param plugins=None: import paths of the plugins by model name,
+                                 the installed ones by default
+            :param executor_factory=None: callable returning the executor
+                                          of a model, process pools by
+                                          default
+        """
+        self._plugins = plugins
+        self._executor_factory = executor_factory
+        self._servers = None
+        self._lock = threading.Lock()
+
+    @property
+    def servers(self):
+        with self._lock:
+            if self._servers is None:
+                plugins = self._plugins
+                if plugins is None:
+                    plugins = discover_plugins()
+                self._servers = {
+                    name: self._create_server(name, path)
+                    for name, path in sorted(plugins.items())}
+            return self._servers
+
+    def _create_server(self, name, path):
+        options = settings.PREDICT_MODEL_OPTIONS.get(name, {})
+        executor = None
+        if self._executor_factory is not None:
+            executor = self._executor_factory()
+        return ModelServer(
+            name, path,
+            workers=options.get('workers', settings.PREDICT_MODEL_WORKERS),
+            max_concurrency=options.get(
+                'max_concurrency', settings.PREDICT_MODEL_MAX_CONCURRENCY),
+            executor=executor)
+
+    def get(self, name):
+        """The server of a model, None if it is not installed"""
+        return self.servers.get(name)
+
+    def warmup(self):
+        for server in self.servers.values():
+            server.warmup()
+
+
+model_registry = ModelRegistry()
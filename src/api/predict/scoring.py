@@ -0,0 +1,77 @@
+import functools
+
+import pandas as pd
+from django.conf import settings
+from regression_model.config import config
+from regression_model.predict import make_cached_prediction
+from regression_model.processing.cache import DjangoCache, PredictionCache
+from regression_model.processing.errors import InvalidModelInputError
+
+
+@functools.lru_cache(maxsize=None)
+def get_prediction_cache():
+    """Shared Django cache if PREDICT_CACHE names one, else in-memory"""
+    if settings.PREDICT_CACHE:
+        return PredictionCache(DjangoCache(alias=settings.PREDICT_CACHE))
+    return PredictionCache()
+
+
+def parse_records(data):
+    """Return the rows of a request payload, and an error message if any"""
+    rows = [data] if isinstance(data, dict) else data
+    is_valid = isinstance(rows, list) and len(rows) > 0
+    if not is_valid or not all(isinstance(row, dict) for row in rows):
+        return None, 'Expected a record or a list of records'
+    missing = sorted({feature for row in rows
+                      for feature in config.FEATURES
+                      if feature not in row})
+    if missing:
+        return None, 'Missing fields: ' + ', '.join(missing)
+    return rows, None
+
+
+def _predict_rows(rows, version):
+    """Score rows in one call, None for the rows that were not valid"""
+    result = make_cached_prediction(input_data=pd.DataFrame(rows),
+                                    cache=get_prediction_cache(),
+                                    version=version)
+    predictions = iter(result.get('predictions'))
+    return [float(next(predictions)) if valid else None
+            for valid in result.get('valid_rows')]
+
+
+def _predict_rows_isolated(rows, version):
+    try:
+        return _predict_rows(rows, version)
+    except (InvalidModelInputError, ValueError, TypeError):
+        if len(rows) == 1:
+            return [None]
+        # a single unprocessable row fails the whole call, isolate it
+        return [_predict_rows_isolated([row], version)[0] for row in rows]
+
+
+def predict_rows(rows, version):
+    """
+    Score a batch of rows with one vectorized model call.
+    Returns a prediction per row, None for the invalid rows.
+        :param rows: input records
+        :param version: model version to score with
+    """
+    return _predict_rows_isolated(rows, version)
+
+
+def predict_routed_rows(items):
+    """
+    Score the rows of a batch, with one model call per version.
+    Returns a prediction per row, None for the invalid rows.
+        :param items: (input record, model version) pairs
+    """
+    rows_by_version = {}
+    for position, (row, version) in enumerate(items):
+        rows_by_version.setdefault(version, []).append((position, row))
+    predictions = [None] * len(items)
+    for version, positioned_rows in rows_by_version.items():
+        scored = predict_rows([row for _, row in positioned_rows], version)
+        for (position, _), prediction in zip(positioned_rows, scored):
+            predictions[position] = prediction
+    return predictions
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from predict.asgi import AsyncPredictApplication, PREDICT_ASYNC_PATH
+
+
+def call_application(application, path, method='POST', body=b'',
+                     headers=None):
+    """Run one http request through an ASGI application"""
+    scope = {'type': 'http', 'path': path, 'method': method,
+             'headers': headers or []}
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    status = sent[0]['status']
+    return status, json.loads(sent[1]['body'].decode('utf-8'))
+
+
+async def fallback(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{"django": true}'})
+
+
+class AsyncPredictApplicationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.application = AsyncPredictApplication(
+            fallback, max_workers=1, executor=ThreadPoolExecutor(1))
+        self.headers = [(b'authorization', b'JWT token')]
+
+    def test_other_paths_use_fallback(self):
+        """Test that only the prediction path is served asynchronously"""
+        status, data = call_application(self.application, '/api/user/me/',
+                                        method='GET')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'django': True})
+
+    def test_login_required(self):
+        """Test that authentication is required"""
+        status, _ = call_application(self.application, PREDICT_ASYNC_PATH,
+                                     body=b'{}')
+
+        self.assertEqual(status, 401)
+
+    @patch('predict.asgi.authenticate', return_value=object())
+    @patch('predict.asgi.parse_records', return_value=([{'a': 1}], None))
+    @patch('predict.asgi.version_router.choose_version',
+           return_value='1.0.0')
+    @patch('predict.asgi.predict_rows', return_value=[100000.0])
+    def test_predict(self, predict_rows, choose_version, parse_records,
+                     authenticate):
+        """Test predicting a record in the executor"""
+        status, data = call_application(self.application, PREDICT_ASYNC_PATH,
+                                        body=b'{"a": 1}',
+                                        headers=self.headers)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['predictions'], [100000.0])
+        self.assertEqual(data['version'], '1.0.0')
+        predict_rows.assert_called_once_with([{'a': 1}], '1.0.0')
+
+    @patch('predict.asgi.authenticate', return_value=object())
+    @patch('predict.asgi.parse_records', return_value=([{'a': 1}], None))
+    @patch('predict.asgi.predict_rows',
+           side_effect=lambda rows, version: time.sleep(1))
+    def test_timeout(self, predict_rows, parse_records, authenticate):
+        """Test that a model answering too late gets a 504"""
+        with self.settings(PREDICT_TIMEOUT=0.01):
+            status, data = call_application(
+                self.application, PREDICT_ASYNC_PATH, body=b'{"a": 1}',
+                headers=self.headers)
+
+        self.assertEqual(status, 504)
+        self.assertIn('detail', data)
+
+    @patch('predict.asgi.authenticate', return_value=object())
+    @patch('predict.asgi.parse_records', return_value=([{'a': 1}], None))
+    @patch('predict.asgi.predict_rows',
+           side_effect=BrokenProcessPool('a worker died'))
+    def test_worker_failure(self, predict_rows, parse_records, authenticate):
+        """Test that a failing worker gets a 500, and a new pool"""
+        with self.assertLogs('predict.asgi', level='ERROR'):
+            status, data = call_application(
+                self.application, PREDICT_ASYNC_PATH, body=b'{"a": 1}',
+                headers=self.headers)
+
+        self.assertEqual(status, 500)
+        self.assertEqual(data, {'detail': 'Prediction failed'})
+        self.assertIsNone(self.application.executor)
+
+    @patch('predict.asgi.authenticate', return_value=object())
+    def test_invalid_json(self, authenticate):
+        """Test that the body must be valid JSON"""
+        status, _ = call_application(self.application, PREDICT_ASYNC_PATH,
+                                     body=b'not json', headers=self.headers)
+
+        self.assertEqual(status, 400)
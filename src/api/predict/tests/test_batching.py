@@ -0,0 +1,63 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from predict.batching import PredictionBatcher
+
+
+class PredictionBatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.batches = []
+
+        def predict_batch(rows):
+            self.batches.append(list(rows))
+            return [row * 2 for row in rows]
+
+        self.predict_batch = predict_batch
+
+    def test_rows_are_scored_together(self):
+        """Test that queued rows are scored in one call"""
+        batcher = PredictionBatcher(self.predict_batch, max_batch_size=64,
+                                    max_latency=0.05)
+        results = batcher.predict([1, 2, 3, 4, 5])
+
+        self.assertEqual(results, [2, 4, 6, 8, 10])
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5]])
+
+    def test_batches_are_limited_in_size(self):
+        """Test that a batch does not exceed max_batch_size rows"""
+        batcher = PredictionBatcher(self.predict_batch, max_batch_size=2,
+                                    max_latency=0.05)
+        results = batcher.predict([1, 2, 3, 4, 5])
+
+        self.assertEqual(results, [2, 4, 6, 8, 10])
+        self.assertTrue(all(len(batch) <= 2 for batch in self.batches))
+
+    def test_concurrent_requests_are_combined(self):
+        """Test that rows from concurrent threads share a batch"""
+        batcher = PredictionBatcher(self.predict_batch, max_batch_size=64,
+                                    max_latency=0.2)
+        results = {}
+
+        def request(value):
+            results[value] = batcher.predict([value])[0]
+
+        threads = [threading.Thread(target=request, args=(value,))
+                   for value in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {value: value * 2 for value in range(8)})
+        self.assertLess(len(self.batches), 8)
+
+    def test_errors_are_raised_to_the_caller(self):
+        """Test that a failing batch raises in the requesting thread"""
+        def predict_batch(rows):
+            raise RuntimeError('model not available')
+
+        batcher = PredictionBatcher(predict_batch, max_latency=0.001)
+        with self.assertRaises(RuntimeError):
+            batcher.predict([1])
@@ -0,0 +1,234 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from predict import views
+from predict.plugins import (
+    ModelBusy, ModelRegistry, ModelServer, ModelTimeout, ModelUnavailable,
+    load_plugin)
+
+
+MODELS_URL = reverse('predict:models')
+TOKEN_URL = reverse('user:token')
+
+
+class EchoPlugin:
+    """Predicts the value of every record, None when negative"""
+    name = 'echo'
+    version = '0.0.1'
+    input_schema = {'type': 'object', 'required': ['value'],
+                    'properties': {'value': {'type': 'number'}}}
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def load(self):
+        pass
+
+    def warmup(self):
+        pass
+
+    def predict_batch(self, rows):
+        self.started.set()
+        self.release.wait()
+        return {'predictions': [row['value'] if row['value'] >= 0 else None
+                                for row in rows],
+                'version': self.version}
+
+
+class WorkerPlugin(EchoPlugin):
+    """Predicts the process id and number of warmups of the worker"""
+
+    def __init__(self):
+        super().__init__()
+        self.warmups = 0
+
+    def warmup(self):
+        self.warmups += 1
+
+    def predict_batch(self, rows):
+        if any(row.get('crash') for row in rows):
+            # dies as on a segfault or out of memory
+            os._exit(1)
+        return {'predictions': [[os.getpid(), self.warmups] for _ in rows],
+                'version': self.version}
+
+
+echo_plugin = EchoPlugin()
+slow_plugin = EchoPlugin()
+worker_plugin = WorkerPlugin()
+not_a_plugin = object()
+
+PLUGINS = {'echo': 'predict.tests.test_plugins:echo_plugin',
+           'slow': 'predict.tests.test_plugins:slow_plugin'}
+
+
+def model_url(name):
+    return reverse('predict:model-predict', kwargs={'name': name})
+
+
+class ModelServerTests(SimpleTestCase):
+
+    def test_load_plugin_checks_the_protocol(self):
+        """Test that a plugin must have the plugin attributes"""
+        self.assertIs(load_plugin(PLUGINS['echo']), echo_plugin)
+        with self.assertRaises(TypeError):
+            load_plugin('predict.tests.test_plugins:not_a_plugin')
+
+    def test_slow_model_does_not_starve_another(self):
+        """Test the concurrency limit is per model"""
+        slow = ModelServer('slow', PLUGINS['slow'], max_concurrency=1,
+                           executor=ThreadPoolExecutor(2))
+        echo = ModelServer('echo', PLUGINS['echo'], max_concurrency=1,
+                           executor=ThreadPoolExecutor(2))
+        slow_plugin.release.clear()
+        try:
+            pending = ThreadPoolExecutor(1).submit(
+                slow.predict, [{'value': 1}])
+            # the slow request holds the only slot
+            self.assertTrue(slow_plugin.started.wait(timeout=1))
+            with self.assertRaises(ModelBusy):
+                slow.predict([{'value': 2}], queue_timeout=0.01)
+            self.assertEqual(echo.predict([{'value': 3}], timeout=1),
+                             {'predictions': [3], 'version': '0.0.1'})
+        finally:
+            slow_plugin.release.set()
+        self.assertEqual(pending.result(timeout=1)['predictions'], [1])
+
+    def test_timed_out_request_keeps_its_slot(self):
+        """Test a request still running after its timeout counts"""
+        slow = ModelServer('slow', PLUGINS['slow'], max_concurrency=1,
+                           executor=ThreadPoolExecutor(2))
+        slow_plugin.release.clear()
+        try:
+            with self.assertRaises(ModelTimeout):
+                slow.predict([{'value': 1}], timeout=0.01)
+            with self.assertRaises(ModelBusy):
+                slow.predict([{'value': 2}], queue_timeout=0.01,
+                             timeout=0.1)
+        finally:
+            slow_plugin.release.set()
+        self.assertEqual(slow.predict([{'value': 3}], queue_timeout=1,
+                                      timeout=1)['predictions'], [3])
+
+    def test_process_pool(self):
+        """Test predicting in a worker process, warmed up once"""
+        server = ModelServer('worker',
+                             'predict.tests.test_plugins:worker_plugin',
+                             workers=1)
+        try:
+            server.warmup()
+            result = server.predict([{'value': 1}], timeout=10)
+        finally:
+            server.shutdown()
+
+        [[pid, warmups]] = result['predictions']
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(warmups, 1)
+        self.assertEqual(result['version'], '0.0.1')
+
+    def test_dead_worker_is_replaced(self):
+        """Test a pool whose worker died is replaced for the next request"""
+        server = ModelServer('worker',
+                             'predict.tests.test_plugins:worker_plugin',
+                             workers=1)
+        try:
+            [[first_pid, _]] = server.predict([{'value': 1}],
+                                              timeout=10)['predictions']
+            with self.assertRaises(ModelUnavailable):
+                server.predict([{'crash': True}], timeout=10)
+            result = server.predict([{'value': 1}], queue_timeout=1,
+                                    timeout=10)
+        finally:
+            server.shutdown()
+
+        [[pid, warmups]] = result['predictions']
+        self.assertNotEqual(pid, first_pid)
+        self.assertEqual(warmups, 1)
+
+
+@patch.object(views, 'model_registry', ModelRegistry(
+    plugins=PLUGINS, executor_factory=lambda: ThreadPoolExecutor(2)))
+class ModelApiTests(TestCase):
+    """Test the model plugin API with a JWT token"""
+
+    def setUp(self):
+        password = 'testpass'
+        user = get_user_model().objects.create_user(
+            email='test@email.com', password=password)
+        self.client = APIClient()
+        payload = {'email': user.email, 'password': password}
+        token = self.client.post(TOKEN_URL, payload).data.get('token')
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+
+    def test_list_models(self):
+        """Test listing the models with their version and schema"""
+        res = self.client.get(MODELS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        models = {model['name']: model for model in res.data['models']}
+        self.assertEqual(sorted(models), ['echo', 'slow'])
+        self.assertEqual(models['echo']['version'], '0.0.1')
+        self.assertEqual(models['echo']['input_schema']['required'],
+                         ['value'])
+
+    def test_predict_with_a_model(self):
+        """Test predicting records with one of the models"""
+        payload = [{'value': 1}, {'value': -1}]
+        res = self.client.post(model_url('echo'), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['predictions'], [1, None])
+        self.assertEqual(res.data['model'], 'echo')
+        self.assertEqual(res.data['version'], '0.0.1')
+
+    def test_unknown_model(self):
+        res = self.client.post(model_url('missing'), {'value': 1},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_fields(self):
+        """Test that records must have the required fields of the model"""
+        res = self.client.post(model_url('echo'), {'other': 1},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('value', res.data['detail'])
+
+    def test_busy_model(self):
+        """Test that a model serving its max requests answers 503"""
+        server = views.model_registry.get('echo')
+        with patch.object(server, 'predict', side_effect=ModelBusy('busy')):
+            res = self.client.post(model_url('echo'), {'value': 1},
+                                   format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_unavailable_model(self):
+        """Test that a model that lost a worker answers 503"""
+        server = views.model_registry.get('echo')
+        with patch.object(server, 'predict',
+                          side_effect=ModelUnavailable('echo lost a worker')):
+            with self.assertLogs('predict.views', level='ERROR'):
+                res = self.client.post(model_url('echo'), {'value': 1},
+                                       format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['detail'], 'echo lost a worker')
+
+    def test_login_required(self):
+        self.client.credentials()
+        res = self.client.get(MODELS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,149 @@
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from regression_model.config import config
+from regression_model.processing.instrumentation import pipeline_metrics
+
+from predict import views
+
+
+PREDICT_URL = reverse('predict:predict')
+METRICS_URL = reverse('predict:metrics')
+TOKEN_URL = reverse('user:token')
+
+
+def sample_record(**params):
+    """Create a house record with every model feature"""
+    record = {feature: 1 for feature in config.FEATURES}
+    record.update(params)
+    return record
+
+
+class PublicPredictApiTests(TestCase):
+    """Test the unauthenticated predict API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Test that authentication is required"""
+        res = self.client.post(PREDICT_URL, sample_record(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_metrics(self):
+        """Test the step and cache metrics are served to Prometheus"""
+        pipeline_metrics.clear()
+        self.addCleanup(pipeline_metrics.clear)
+        pipeline_metrics.observe('columnar_transform', seconds=0.002,
+                                 rows_in=10, rows_out=10, output_bytes=800)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            f'{config.PIPELINE_NAME}_step_seconds_count'
+            f'{{step="columnar_transform"}} 1',
+            res.content.decode())
+        self.assertIn(f'{config.PIPELINE_NAME}_prediction_cache_hit_rate',
+                      res.content.decode())
+
+
+class PrivatePredictApiTests(TestCase):
+    """Test the predict API with a JWT token"""
+
+    def setUp(self):
+        password = 'testpass'
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password=password
+        )
+        self.client = APIClient()
+        payload = {'email': self.user.email, 'password': password}
+        token = self.client.post(TOKEN_URL, payload).data.get('token')
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + token)
+
+    @patch.object(views.version_router, 'choose_version',
+                  return_value='1.0.0')
+    @patch.object(views.batcher, 'predict_batch')
+    def test_predict_single_record(self, predict_batch, choose_version):
+        """Test predicting one record"""
+        predict_batch.return_value = [100000.0]
+        res = self.client.post(PREDICT_URL, sample_record(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['predictions'], [100000.0])
+        self.assertEqual(res.data['version'], '1.0.0')
+
+    @patch.object(views.version_router, 'choose_version',
+                  return_value='candidate')
+    @patch.object(views.batcher, 'predict_batch')
+    def test_predict_reports_the_routed_version(self, predict_batch,
+                                                choose_version):
+        """Test every row is scored with the version reported"""
+        predict_batch.return_value = [100000.0, 100000.0]
+        res = self.client.post(PREDICT_URL, [sample_record()] * 2,
+                               format='json')
+
+        self.assertEqual(res.data['version'], 'candidate')
+        rows = predict_batch.call_args[0][0]
+        self.assertEqual([version for _, version in rows],
+                         ['candidate', 'candidate'])
+
+    @patch.object(views.batcher, 'predict_batch')
+    def test_predict_list_of_records(self, predict_batch):
+        """Test predicting several records, keeping invalid ones as null"""
+        predict_batch.side_effect = lambda rows: [
+            None if row['GrLivArea'] <= 0 else 1.0 for row, _ in rows]
+        payload = [sample_record(), sample_record(GrLivArea=0)]
+        res = self.client.post(PREDICT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['predictions'], [1.0, None])
+
+    @override_settings(PREDICT_TIMEOUT=0.1)
+    @patch.object(views.batcher, 'predict_batch')
+    def test_predict_timeout(self, predict_batch):
+        """Test a model that does not answer in time returns a 504"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        predict_batch.side_effect = lambda rows: (
+            release.wait(10) and [1.0] * len(rows))
+        res = self.client.post(PREDICT_URL, sample_record(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertIn('detail', res.data)
+
+    @patch.object(views.batcher, 'predict_batch')
+    def test_predict_failure(self, predict_batch):
+        """Test a model error returns a 500 with a detail"""
+        predict_batch.side_effect = RuntimeError('model failed')
+        with self.assertLogs('predict.views', level='ERROR'):
+            res = self.client.post(PREDICT_URL, sample_record(),
+                                   format='json')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(res.data['detail'], 'Prediction failed')
+
+    def test_missing_fields(self):
+        """Test that records must contain every model feature"""
+        record = sample_record()
+        del record['GrLivArea']
+        res = self.client.post(PREDICT_URL, record, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('GrLivArea', res.data['detail'])
+
+    def test_invalid_payload(self):
+        """Test that the payload must be records"""
+        res = self.client.post(PREDICT_URL, [1, 2], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
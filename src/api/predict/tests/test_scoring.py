@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from regression_model.processing.errors import InvalidModelInputError
+
+from predict.scoring import predict_routed_rows, predict_rows
+
+
+def fake_batch_prediction(*, input_data, cache=None, version=None):
+    """Fail on unseen labels, drop rows without an area"""
+    if (input_data['Neighborhood'] == 'unseen').any():
+        raise InvalidModelInputError('unseen label')
+    valid_rows = (input_data['GrLivArea'] > 0).values
+    return {'predictions': np.ones(valid_rows.sum()),
+            'valid_rows': valid_rows, 'version': version}
+
+
+@patch('predict.scoring.make_cached_prediction', fake_batch_prediction)
+class ScoringTests(SimpleTestCase):
+
+    def test_invalid_rows_are_none(self):
+        """Test that rows dropped by the model get no prediction"""
+        rows = [{'Neighborhood': 'a', 'GrLivArea': 1},
+                {'Neighborhood': 'a', 'GrLivArea': 0}]
+
+        self.assertEqual(predict_rows(rows, 'candidate'), [1.0, None])
+
+    def test_unprocessable_row_is_isolated(self):
+        """Test that one failing row does not fail the whole batch"""
+        rows = [{'Neighborhood': 'a', 'GrLivArea': 1},
+                {'Neighborhood': 'unseen', 'GrLivArea': 1}]
+
+        self.assertEqual(predict_rows(rows, 'candidate'), [1.0, None])
+
+    @patch('predict.scoring.predict_rows')
+    def test_routed_rows_are_scored_by_version(self, predict_rows):
+        """Test a batch is scored with one call per version, in order"""
+        predict_rows.side_effect = lambda rows, version: [
+            (row['GrLivArea'], version) for row in rows]
+        items = [({'GrLivArea': 1}, 'a'), ({'GrLivArea': 2}, 'b'),
+                 ({'GrLivArea': 3}, 'a')]
+
+        self.assertEqual(predict_routed_rows(items),
+                         [(1, 'a'), (2, 'b'), (3, 'a')])
+        self.assertEqual(predict_rows.call_count, 2)
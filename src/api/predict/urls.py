@@ -0,0 +1,14 @@
+from django.urls import path
+
+from predict import views
+
+
+app_name = 'predict'
+
+urlpatterns = [
+    path('', views.PredictView.as_view(), name='predict'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('models/', views.ModelListView.as_view(), name='models'),
+    path('models/<str:name>/', views.ModelPredictView.as_view(),
+         name='model-predict'),
+]
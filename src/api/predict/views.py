@@ -0,0 +1,111 @@
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from regression_model.processing.data_management import version_router
+from regression_model.processing.instrumentation import pipeline_metrics
+
+from predict.batching import PredictionBatcher
+from predict.plugins import (
+    ModelBusy, ModelTimeout, ModelUnavailable, check_records,
+    model_registry)
+from predict.scoring import (
+    get_prediction_cache, parse_records, predict_routed_rows)
+
+
+_logger = logging.getLogger(__name__)
+
+batcher = PredictionBatcher(
+    predict_routed_rows,
+    max_batch_size=settings.PREDICT_MAX_BATCH_SIZE,
+    max_latency=settings.PREDICT_MAX_LATENCY_MS / 1000)
+
+
+class PredictView(APIView):
+    """Predict house prices with the regression model"""
+    authentication_classes = [JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Accept one house record, or a list of them"""
+        rows, error = parse_records(request.data)
+        if error:
+            return Response({'detail': error}, status=400)
+
+        # every row of a request is scored with the same version, the
+        # batches combining requests are split by version
+        version = version_router.choose_version()
+        try:
+            predictions = batcher.predict(
+                [(row, version) for row in rows],
+                timeout=settings.PREDICT_TIMEOUT)
+        except FutureTimeoutError:
+            return Response({
+                'detail': f'The model did not answer in '
+                          f'{settings.PREDICT_TIMEOUT} seconds'}, status=504)
+        except Exception:
+            _logger.exception('Prediction failed')
+            return Response({'detail': 'Prediction failed'}, status=500)
+        return Response({'predictions': predictions, 'version': version})
+
+
+class ModelListView(APIView):
+    """List the models served, with their version and input schema"""
+    authentication_classes = [JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'models': [
+            server.describe() for server in model_registry.servers.values()
+        ]})
+
+
+class ModelPredictView(APIView):
+    """Predict with any of the models served"""
+    authentication_classes = [JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, name, *args, **kwargs):
+        """Accept one input record of the model, or a list of them"""
+        server = model_registry.get(name)
+        if server is None:
+            return Response({'detail': f'Unknown model: {name}'},
+                            status=404)
+        rows, error = check_records(request.data,
+                                    server.plugin.input_schema)
+        if error:
+            return Response({'detail': error}, status=400)
+
+        try:
+            result = server.predict(
+                rows, queue_timeout=settings.PREDICT_MODEL_QUEUE_TIMEOUT,
+                timeout=settings.PREDICT_TIMEOUT)
+        except ModelBusy as e:
+            return Response({'detail': str(e)}, status=503,
+                            headers={'Retry-After': '1'})
+        except ModelUnavailable as e:
+            _logger.error(str(e))
+            return Response({'detail': str(e)}, status=503,
+                            headers={'Retry-After': '1'})
+        except ModelTimeout as e:
+            return Response({'detail': str(e)}, status=504)
+        return Response({'predictions': result['predictions'],
+                         'model': name,
+                         'version': result['version']})
+
+
+class MetricsView(APIView):
+    """Serving metrics of this process, in the Prometheus text format"""
+    # scraped by Prometheus, which can not renew JWT tokens
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        text = (pipeline_metrics.to_prometheus()
+                + get_prediction_cache().to_prometheus())
+        return HttpResponse(text, content_type='text/plain; version=0.0.4')
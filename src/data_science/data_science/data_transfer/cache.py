@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'data_science', 'measurements')
+
+
+class MeasurementsCache:
+    """
+    Local on-disk cache of the measurements of dataseries, by dataseries id.
+    The measurements of a dataseries are kept in a Parquet file, next to a
+    JSON file with the time range they cover completely: from the earliest
+    start requested to the last timestamp fetched. The least recently used
+    dataseries are removed once the files take more than max_bytes.
+    Every entry is written on its own, so several processes, e.g.
+    notebook sessions, can share a directory.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=2 * 1024 ** 3):
+        """
+        Initialization function.
+            :param self: self
+            :param directory=DEFAULT_DIRECTORY: folder of the cached files
+            :param max_bytes=2 * 1024 ** 3: max size of the cached files
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, id_, extension='.parquet'):
+        return os.path.join(self.directory, f'{id_}{extension}')
+
+    def _replace(self, path, write):
+        """
+        Write a file aside and move it in place, readers never see a
+        partial file.
+            :param self: self
+            :param path: path of the file
+            :param write: function writing to a path
+        """
+        temporary_path = (f'{path}.{os.getpid()}.'
+                          f'{threading.get_ident()}.tmp')
+        try:
+            write(temporary_path)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _read_entry(self, id_):
+        """
+        Time range and last access of a cached dataseries, None if missing.
+            :param self: self
+            :param id_: dataseries id
+        """
+        try:
+            with open(self._path(id_, '.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_entry(self, id_, entry):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(entry, f)
+        self._replace(self._path(id_, '.json'), write)
+
+    def get(self, id_):
+        """
+        Cached measurements of a dataseries, None if there are none.
+        Returns the dataframe, the start it covers, None if it is the first
+        measurement, and the last timestamp fetched.
+            :param self: self
+            :param id_: dataseries id
+        """
+        entry = self._read_entry(id_)
+        if entry is None:
+            return None
+        try:
+            df = pd.read_parquet(self._path(id_))
+        except (OSError, ValueError):
+            # removed or corrupt, downloaded again
+            self.remove(id_)
+            return None
+        entry['accessed'] = time.time()
+        self._write_entry(id_, entry)
+        start = entry['start']
+        if start is not None:
+            start = pd.Timestamp(start)
+        return df, start, pd.Timestamp(entry['last_timestamp'])
+
+    def put(self, id_, df, start=None):
+        """
+        Cache the measurements of a dataseries, replacing the cached ones.
+            :param self: self
+            :param id_: dataseries id
+            :param df: measurements, with datetime timestamps in time order
+            :param start=None: start of the time range covered, None if
+                               it is the first measurement
+        """
+        if len(df) == 0:
+            return
+        self._replace(self._path(id_),
+                      lambda path: df.to_parquet(path, index=False))
+        self._write_entry(id_, {
+            'start': None if start is None
+            else pd.Timestamp(start).isoformat(),
+            'last_timestamp': df['timestamp'].iloc[-1].isoformat(),
+            'accessed': time.time()})
+        self._evict(keep=id_)
+
+    def _entries(self):
+        """
+        Size and last access of every cached dataseries, of any process.
+            :param self: self
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.parquet'):
+                continue
+            id_ = name[:-len('.parquet')]
+            try:
+                stat = os.stat(self._path(id_))
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                continue
+            entry = self._read_entry(id_)
+            accessed = stat.st_mtime if entry is None else entry['accessed']
+            entries.append((accessed, id_, stat.st_size))
+        return entries
+
+    def _evict(self, keep):
+        """
+        Remove the least recently used dataseries, down to max_bytes.
+            :param self: self
+            :param keep: dataseries id never removed, the one just cached
+        """
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, _, entry_size in entries)
+        for _, id_, entry_size in entries:
+            if size <= self.max_bytes:
+                break
+            if id_ == keep:
+                continue
+            self.remove(id_)
+            size -= entry_size
+
+    def cached_ids(self):
+        """
+        Ids of the cached dataseries, least recently used first.
+            :param self: self
+        """
+        return [id_ for _, id_, _ in sorted(self._entries())]
+
+    def remove(self, id_):
+        """
+        Remove the cached measurements of a dataseries.
+            :param self: self
+            :param id_: dataseries id
+        """
+        for path in (self._path(id_), self._path(id_, '.json')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """
+        Remove all the cached measurements.
+            :param self: self
+        """
+        for id_ in self.cached_ids():
+            self.remove(id_)
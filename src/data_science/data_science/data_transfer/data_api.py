@@ -1,14 +1,36 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import pandas as pd
 from ipywidgets import FloatProgress
-import math
+import time
+import gzip
+from concurrent.futures import (
+    FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait)
 
 from data_science.tools.objects import attr_in_object, \
     assign_attr_from_dictionary
 import data_science.tools.transformations as tr
 
 
+# columns of a dataframe of measurements, as Measurement.get_empty_df
+MEASUREMENT_COLUMNS = ['frequency', 'secondary_value', 'timestamp', 'value']
+# column of the cached measurements with the timestamps sent by the data_api
+ISO_TIMESTAMP_COLUMN = 'timestamp_iso'
+
+
+class UploadError(Exception):
+    """
+    Measurements were not stored, failed_rows has the (start, stop)
+    positions of the rows that were not.
+    """
+
+    def __init__(self, message, failed_rows):
+        super().__init__(message)
+        self.failed_rows = failed_rows
+
+
 class APIBaseClass:
     """
     Class with basic API interacting functionality.
@@ -72,8 +94,8 @@ class APIBaseClass:
         class_name = type(self).__name__.lower()
         self._verify_attr_completness(verify_id=False)
         path = self.data_api.api_url + self._subpath
-        r = requests.post(path, headers=self.data_api.auth_header,
-                          json=self._generate_attr_to_dictionary())
+        r = self.data_api.request(
+            'post', path, json=self._generate_attr_to_dictionary())
         json_data = self._fetch_json_from_url(r, 201)
         self._assign_attributes(json_data[class_name])
         if self.id is None:
@@ -88,8 +110,8 @@ class APIBaseClass:
         """
         self._verify_attr_completness()
         path = self.data_api.api_url + self._subpath + self.id
-        r = requests.put(path, headers=self.data_api.auth_header,
-                         json=self._generate_attr_to_dictionary())
+        r = self.data_api.request(
+            'put', path, json=self._generate_attr_to_dictionary())
         _ = self._fetch_json_from_url(r, 200)
 
     def download_attributes(self):
@@ -101,7 +123,7 @@ class APIBaseClass:
         if self.id is None:
             raise AttributeError('A ' + class_name + ' id has to be provided.')
         path = self.data_api.api_url + self._subpath + self.id
-        r = requests.get(path, headers=self.data_api.auth_header)
+        r = self.data_api.request('get', path)
         json_data = self._fetch_json_from_url(r, 200)
         # extract the data from the respond
         self._assign_attributes(json_data[class_name])
@@ -112,6 +134,9 @@ class Dataseries(APIBaseClass):
     Class representing a dataseries.
     """
     _subpath = '/dataseries/'
+    # query parameters of the time range of the measurements
+    _from_time_param = 'from_time'
+    _to_time_param = 'to_time'
 
     def __init__(self, dataset_object, kind=None, pump_location=None,
                  name=None, units=None, precision=None,
@@ -159,6 +184,9 @@ class Dataseries(APIBaseClass):
                                     'dataset', 'numeric_identifier']
         self.data_to_measurement = ['value', 'secondary_value', 'frequency']
         self.MEASUREMENTS_PER_POST = 500
+        self.MIN_MEASUREMENTS_PER_POST = 50
+        self.MAX_MEASUREMENTS_PER_POST = 20000
+        self.UPLOAD_TARGET_SECONDS = 1.0
         self.df = pd.DataFrame()
 
     def _set_dataset(self, dataset_object):
@@ -202,8 +230,7 @@ class Dataseries(APIBaseClass):
         if self.id is None:
             raise ValueError('A dataset id has to be provided.')
         path = self.data_api.api_url + __class__._subpath + self.id
-        r = requests.post(path, headers=self.data_api.auth_header,
-                          json=json_data)
+        r = self.data_api.request('post', path, json=json_data)
         _ = self._fetch_json_from_url(r, 201)
 
     def upload_measurent(self, measurement):
@@ -216,35 +243,113 @@ class Dataseries(APIBaseClass):
             raise TypeError('A measurement has to be provided.')
         self._post_measurement(measurement.get_dictionary())
 
+    def _measurements_df_to_json(self, measurements_df):
+        """
+        Serialize a df of measurements to a JSON list, column by column.
+        Measurements without a value are skipped, and null fields left out.
+            :param self: self
+            :param measurements_df: dataframe with the measurements
+        """
+        df = measurements_df[measurements_df['value'].notnull()]
+        columns = list(df.columns)
+        values = []
+        for column in columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                series = tr.datetimes_to_isos(series)
+            # None for the nulls, python types for the rest
+            values.append(series.astype(object)
+                          .where(series.notnull(), None).tolist())
+        records = [{column: value
+                    for column, value in zip(columns, row)
+                    if value is not None}
+                   for row in zip(*values)]
+        return json.dumps(records).encode('utf-8')
+
     def _upload_batch_measurents_df(self, measurements_df):
         """
         Send a df of measurements to the data_api.
             :param self: self
             :param measurements_df: dataframe with the measurements
         """
-        data = []
-        columns = measurements_df.columns
-        for _, row in measurements_df.iterrows():
-            measurement = Measurement(None)
-            for column in columns:
-                setattr(measurement, column, row[column])
-            if measurement.value is not None:
-                data.append(measurement.get_dictionary())
-        self._post_measurement(data)
+        if self.id is None:
+            raise ValueError('A dataset id has to be provided.')
+        path = self.data_api.api_url + __class__._subpath + self.id
+        r = self.data_api.send_json(
+            'post', path, self._measurements_df_to_json(measurements_df))
+        _ = self._fetch_json_from_url(r, 201)
+
+    def _timed_upload(self, measurements_df):
+        """
+        Send a df of measurements, returns the seconds it took.
+            :param self: self
+            :param measurements_df: dataframe with the measurements
+        """
+        start = time.perf_counter()
+        self._upload_batch_measurents_df(measurements_df)
+        return time.perf_counter() - start
+
+    def _next_batch_size(self, batch_size, rows, seconds):
+        """
+        Batch size sending in UPLOAD_TARGET_SECONDS at the observed rate,
+        at most halved or doubled at once.
+            :param self: self
+            :param batch_size: current batch size
+            :param rows: rows of the last batch sent
+            :param seconds: seconds the last batch took
+        """
+        target = int(rows * self.UPLOAD_TARGET_SECONDS / max(seconds, 1e-3))
+        target = min(max(target, batch_size // 2), batch_size * 2)
+        return min(max(target, self.MIN_MEASUREMENTS_PER_POST),
+                   self.MAX_MEASUREMENTS_PER_POST)
 
-    def upload_measurents_df(self, measurements_df):
+    def upload_measurents_df(self, measurements_df, max_workers=None):
         """
-        Send a batch of measurements one by one to the data_api.
+        Send a df of measurements to the data_api, in concurrent batches.
+        The batch size adapts to the observed latency of the server. Once a
+        batch fails no more are sent, and an UploadError reports the rows
+        that were not stored.
             :param self: self
             :param measurements_df: dataframe with the measurements
+            :param max_workers=None: batches in flight at once,
+                                     max_workers of the data_api by default
         """
+        max_workers = max_workers or self.data_api.max_workers
         length = measurements_df.shape[0]
-        number_of_batches = math.ceil(length / self.MEASUREMENTS_PER_POST)
-        for batch in range(number_of_batches):
-            measurements = measurements_df[
-                (batch) * self.MEASUREMENTS_PER_POST:
-                (batch + 1) * self.MEASUREMENTS_PER_POST]
-            self._upload_batch_measurents_df(measurements)
+        batch_size = self.MEASUREMENTS_PER_POST
+        position = 0
+        pending = {}
+        failed_rows = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while (position < length and not errors) or pending:
+                while position < length and not errors and \
+                        len(pending) < max_workers:
+                    measurements = measurements_df[
+                        position:position + batch_size]
+                    future = pool.submit(self._timed_upload, measurements)
+                    pending[future] = (position,
+                                       position + len(measurements))
+                    position += len(measurements)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, stop = pending.pop(future)
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        failed_rows.append((start, stop))
+                        errors.append(e)
+                        continue
+                    batch_size = self._next_batch_size(
+                        batch_size, stop - start, seconds)
+        if errors:
+            if position < length:
+                # never sent
+                failed_rows.append((position, length))
+            failed_rows.sort()
+            raise UploadError(
+                f'Measurements were not stored, rows: {failed_rows}. '
+                f'First error: {errors[0]}', failed_rows) from errors[0]
 
     def _get_measurements(self, path=None, from_time=None,
                           to_time=None):
@@ -257,31 +362,33 @@ class Dataseries(APIBaseClass):
         """
         if self.id is None:
             raise ValueError('A dataset id has to be provided.')
+        params = None
         if path is None:
             path = self.data_api.api_url + __class__._subpath + self.id + \
                 '/measurements'
+            # the next links carry the query of the first page
+            params = {}
+            if from_time is not None:
+                params[self._from_time_param] = tr.datetime_to_iso(from_time)
+            if to_time is not None:
+                params[self._to_time_param] = tr.datetime_to_iso(to_time)
         else:
             path = self.data_api.api_url + path
-        r = requests.get(path, headers=self.data_api.auth_header)
+        r = self.data_api.request('get', path, params=params)
         json_data = self._fetch_json_from_url(r, 200)
         # extract the measurements and "next" link from the respond
         next_link = self._find_next(json_data['links'])
         return json_data['measurements'], next_link
 
-    def get_measurements_df(self, from_time=None, to_time=None,
-                            timestamp_to_datetime=False):
+    def _iter_measurement_pages(self, from_time=None, to_time=None):
         """
-        Download measurements from the data_api, returns a dataframe
+        Download the measurements page by page, following the next links.
             :param self: self
-            :param path=None: path to the data_api
             :param from_time=None: starting from
-            :param timestamp_to_datetime=False: convert to datetime if True
+            :param to_time=None: until
         """
         if self.id is None:
             raise ValueError('A dataset id has to be provided.')
-        # create an empty dataframe
-        df = Measurement(0).get_empty_df()
-        # get the measurements
         next_link = None
         first = True
         while (next_link is not None) or first:
@@ -289,13 +396,198 @@ class Dataseries(APIBaseClass):
             measurements, next_link = self._get_measurements(next_link,
                                                              from_time,
                                                              to_time)
-            for measurement in measurements:
-                if timestamp_to_datetime:
-                    measurement['timestamp'] = \
-                        tr.iso_to_datetime(measurement['timestamp'])
-                df.loc[len(df)] = measurement
+            yield measurements
+
+    def _measurements_to_df(self, columns, timestamp_to_datetime):
+        """
+        Build a dataframe of measurements from its columns, in one go.
+            :param self: self
+            :param columns: dictionary with a list of values per column
+            :param timestamp_to_datetime: convert to datetime if True
+        """
+        df = pd.DataFrame(columns, columns=MEASUREMENT_COLUMNS)
+        if timestamp_to_datetime and len(df) > 0:
+            df['timestamp'] = tr.isos_to_datetimes(df['timestamp'])
+        return df
+
+    def iter_measurements_df(self, from_time=None, to_time=None,
+                             timestamp_to_datetime=False):
+        """
+        Download measurements from the data_api, yields a dataframe per page
+            :param self: self
+            :param from_time=None: starting from
+            :param to_time=None: until
+            :param timestamp_to_datetime=False: convert to datetime if True
+        """
+        for measurements in self._iter_measurement_pages(from_time,
+                                                         to_time):
+            columns = {column: [measurement.get(column)
+                                for measurement in measurements]
+                       for column in MEASUREMENT_COLUMNS}
+            yield self._measurements_to_df(columns, timestamp_to_datetime)
+
+    def _download_columns(self, from_time=None, to_time=None):
+        """
+        Download measurements, returns a dictionary with a list per column
+            :param self: self
+            :param from_time=None: starting from
+            :param to_time=None: until
+        """
+        columns = {column: [] for column in MEASUREMENT_COLUMNS}
+        for measurements in self._iter_measurement_pages(from_time,
+                                                         to_time):
+            for column, values in columns.items():
+                values.extend(measurement.get(column)
+                              for measurement in measurements)
+        return columns
+
+    def get_measurements_df(self, from_time=None, to_time=None,
+                            timestamp_to_datetime=False, windows=1):
+        """
+        Download measurements from the data_api, returns a dataframe.
+        With a cache in the data_api, only the measurements before and after
+        the cached ones are downloaded.
+            :param self: self
+            :param from_time=None: starting from
+            :param to_time=None: until
+            :param timestamp_to_datetime=False: convert to datetime if True
+            :param windows=1: number of time windows between from_time and
+                              to_time downloaded concurrently
+        """
+        cache = self.data_api.cache
+        if cache is None or self.id is None:
+            return self._download_measurements_df(
+                from_time, to_time, timestamp_to_datetime, windows)
+        df = self._cached_measurements_df(cache, from_time, to_time, windows)
+        iso_timestamps = df.pop(ISO_TIMESTAMP_COLUMN)
+        if not timestamp_to_datetime:
+            # the strings of the data_api, as without a cache
+            df['timestamp'] = iso_timestamps
+        return df
+
+    def _download_cached_df(self, from_time, to_time, windows):
+        """
+        Download measurements to cache, with datetime timestamps and the
+        strings of the data_api in ISO_TIMESTAMP_COLUMN.
+            :param self: self
+            :param from_time: starting from
+            :param to_time: until
+            :param windows: number of time windows downloaded concurrently
+        """
+        df = self._download_measurements_df(from_time, to_time, False,
+                                            windows)
+        df[ISO_TIMESTAMP_COLUMN] = df['timestamp']
+        if len(df) > 0:
+            df['timestamp'] = tr.isos_to_datetimes(df['timestamp'])
         return df
 
+    def _cached_measurements_df(self, cache, from_time, to_time, windows):
+        """
+        Measurements from the cache, completed with the ones before the
+        cached start and after the last timestamp fetched, as returned by
+        _download_cached_df.
+            :param self: self
+            :param cache: a MeasurementsCache
+            :param from_time: starting from
+            :param to_time: until
+            :param windows: number of time windows downloaded concurrently
+        """
+        cached = cache.get(self.id)
+        if cached is None:
+            df = self._download_cached_df(from_time, to_time, windows)
+            cache.put(self.id, df, start=from_time)
+            return self._time_range(df, from_time, to_time)
+
+        df, start, last_timestamp = cached
+        updated = False
+        head_missing = start is not None
+        if head_missing and from_time is not None:
+            head_missing = pd.Timestamp(from_time) < start
+        if head_missing:
+            if to_time is not None and pd.Timestamp(to_time) < start:
+                # nothing of the time range is cached, nor cached after
+                return self._download_cached_df(from_time, to_time, windows)
+            # the measurements missing before the cached ones
+            head = self._download_cached_df(from_time, start, windows)
+            df = pd.concat([head[head['timestamp'] < start], df],
+                           ignore_index=True)
+            start = from_time
+            updated = True
+        if to_time is None or pd.Timestamp(to_time) > last_timestamp:
+            # the measurements at the last timestamp fetched are downloaded
+            # again, with the ones stored since
+            tail = self._download_cached_df(last_timestamp, to_time, windows)
+            if len(tail) > 0:
+                df = pd.concat([df[df['timestamp'] < last_timestamp], tail],
+                               ignore_index=True)
+                updated = True
+        if updated:
+            cache.put(self.id, df, start=start)
+        return self._time_range(df, from_time, to_time)
+
+    def _time_range(self, df, from_time, to_time):
+        """
+        Measurements of a dataframe in time order within a time range.
+            :param self: self
+            :param df: measurements, with datetime timestamps
+            :param from_time: starting from
+            :param to_time: until
+        """
+        if len(df) == 0:
+            return df
+        timestamps = df['timestamp']
+        first = 0 if from_time is None else timestamps.searchsorted(
+            pd.Timestamp(from_time), side='left')
+        last = len(df) if to_time is None else timestamps.searchsorted(
+            pd.Timestamp(to_time), side='right')
+        return df[first:last].reset_index(drop=True)
+
+    def _download_measurements_df(self, from_time, to_time,
+                                  timestamp_to_datetime, windows):
+        """
+        Download measurements from the data_api, returns a dataframe.
+            :param self: self
+            :param from_time: starting from
+            :param to_time: until
+            :param timestamp_to_datetime: convert to datetime if True
+            :param windows: number of time windows downloaded concurrently
+        """
+        if windows <= 1 or from_time is None or to_time is None:
+            columns = self._download_columns(from_time, to_time)
+            # the dataframe is built and the timestamps parsed once
+            return self._measurements_to_df(columns, timestamp_to_datetime)
+
+        bounds = pd.date_range(pd.Timestamp(from_time),
+                               pd.Timestamp(to_time), periods=windows + 1)
+        with ThreadPoolExecutor(
+                max_workers=min(windows, self.data_api.max_workers)) as pool:
+            parts = list(pool.map(self._download_columns,
+                                  bounds[:-1], bounds[1:]))
+        # the windows but the last one are half-open, the measurements at
+        # the bound of two windows are kept in the later one only
+        parts[:-1] = [self._columns_before(part, bound)
+                      for part, bound in zip(parts[:-1], bounds[1:-1])]
+        # windows are merged in time order
+        columns = {column: [value for part in parts
+                            for value in part[column]]
+                   for column in MEASUREMENT_COLUMNS}
+        return self._measurements_to_df(columns, timestamp_to_datetime)
+
+    def _columns_before(self, columns, time):
+        """
+        Keep the downloaded measurements timestamped before a time.
+            :param self: self
+            :param columns: dictionary with a list of values per column
+            :param time: the first time left out
+        """
+        if not columns['timestamp']:
+            return columns
+        times = tr.isos_to_datetimes(columns['timestamp'])
+        keep = (times < pd.Timestamp(time)).tolist()
+        return {column: [value for value, kept in zip(values, keep)
+                         if kept]
+                for column, values in columns.items()}
+
     def _find_next(self, links):
         """
         Find the next link in the json object.
@@ -405,7 +697,7 @@ class Dataset(APIBaseClass):
         """
         path = self.data_api.api_url + __class__._subpath + self.id + \
             '/dataseries/'
-        r = requests.get(path, headers=self.data_api.auth_header)
+        r = self.data_api.request('get', path)
         json_data = self._fetch_json_from_url(r, 200)
         # extract the dataseries data from the respond
         self.dataseries_ids = {}
@@ -413,50 +705,84 @@ class Dataset(APIBaseClass):
             self.dataseries_ids[dataseries['name']] = dataseries['id']
         return self.dataseries_ids
 
+    def _download_dataseries(self, id_, from_time, to_time,
+                             timestamp_to_datetime):
+        """
+        Download the attributes and the measurements of a dataseries.
+            :param self: self
+            :param id_: dataseries id
+            :param from_time: starting from
+            :param to_time: until
+            :param timestamp_to_datetime: convert to datetime if True
+        """
+        ds = Dataseries(self, id_=id_)
+        ds.download_attributes()
+        df = ds.get_measurements_df(
+            from_time=from_time, to_time=to_time,
+            timestamp_to_datetime=timestamp_to_datetime)
+        return ds.name, df
+
     def get_all_measurements_df(self, include_frequency=False,
                                 include_secondary_value=False,
                                 from_time=None, to_time=None,
                                 timestamp_to_datetime=False,
-                                running_in_notebook=False):
+                                running_in_notebook=False,
+                                max_workers=None, tidy=False):
         """
         Download all the measurements from the dataseries.
             :param self: self
             :param include_frequency=False: frequency too if True
             :param include_secondary_value=False: secondary_value too if True
             :param timestamp_to_datetime=False: convert to datetime if True
-        """
-        df = pd.DataFrame()
+            :param max_workers=None: dataseries downloaded concurrently,
+                                     max_workers of the data_api by default
+            :param tidy=False: if True, one row per measurement, with a
+                               dataseries column, sorted by timestamp.
+                               Otherwise the columns of every dataseries
+                               side by side
+        """
+        ids = list(self.dataseries_ids.values())
         # display a progress bar
-        f = FloatProgress(min=0, max=len(self.dataseries_ids))
+        f = FloatProgress(min=0, max=len(ids))
         if running_in_notebook:
             # display(f)
             pass
-        for _, id_ in self.dataseries_ids.items():
-            ds = Dataseries(self, id_=id_)
-            ds.download_attributes()
-            df_temp = ds.get_measurements_df(
-                from_time=from_time,
-                to_time=to_time, timestamp_to_datetime=timestamp_to_datetime)
-            # verify the size of the dataframe and resize dt if necessary
-            if df_temp.shape[0] > df.shape[0]:
-                diff = df_temp.shape[0] - df.shape[0]
-                empty_df = pd.DataFrame(None,
-                                        index=list(range(diff)),
-                                        columns=df.columns)
-                df = df.append(empty_df)
-                df = df.reset_index(drop=True)
-            # insert current dataseries measurements to df
-            df[ds.name] = df_temp['value']
-            df[ds.name + '_ts'] = df_temp['timestamp']
-            if include_frequency:
-                df[ds.name + '_fq'] = df_temp['frequency']
-            if include_secondary_value:
-                df[ds.name + '_sv'] = df_temp['secondary_value']
-            # update the progress bar
-            f.value += 1
-            if not running_in_notebook:
-                print(f.value, ' of ', f.max)
-        return df
+        results = [None] * len(ids)
+        with ThreadPoolExecutor(
+                max_workers=max_workers or self.data_api.max_workers) as pool:
+            futures = {
+                pool.submit(self._download_dataseries, id_, from_time,
+                            to_time, timestamp_to_datetime): position
+                for position, id_ in enumerate(ids)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                # update the progress bar
+                f.value += 1
+                if not running_in_notebook:
+                    print(f.value, ' of ', f.max)
+
+        fields = {'value': '', 'timestamp': '_ts'}
+        if include_frequency:
+            fields['frequency'] = '_fq'
+        if include_secondary_value:
+            fields['secondary_value'] = '_sv'
+
+        if tidy:
+            frames = [df[list(fields)].assign(dataseries=name)
+                      for name, df in results]
+            if not frames:
+                return pd.DataFrame(columns=['dataseries'] + list(fields))
+            df = pd.concat(frames, ignore_index=True)
+            df = df[['dataseries'] + list(fields)]
+            return df.sort_values('timestamp', kind='mergesort') \
+                .reset_index(drop=True)
+
+        # the series are aligned on their position, the shorter ones
+        # padded with NaN, and the frame is built once
+        columns = {name + suffix: df[field]
+                   for name, df in results
+                   for field, suffix in fields.items()}
+        return pd.DataFrame(columns, columns=list(columns))
 
     def dump_attributes_to_dictionary(self):
         # ToDo: Probably add some more attributes
@@ -469,20 +795,109 @@ class DataApi(APIBaseClass):
     """
     _subpath = 'users/access_token/'
 
-    def __init__(self, user, password, api_url, name='data_api'):
+    def __init__(self, user, password, api_url, name='data_api',
+                 timeout=30, retries=3, backoff_factor=0.5, max_workers=8,
+                 cache=None, compress_requests=False):
         """
         Initialization function.
             :param self: self
             :param user: user name
             :param password: user password
             :param api_url: api url
+            :param timeout=30: seconds to wait for the server to answer
+            :param retries=3: retries of the failed idempotent requests
+            :param backoff_factor=0.5: seconds to wait before the second
+                                       retry, doubled at every retry
+            :param max_workers=8: max concurrent requests, the size of the
+                                  connection pool too
+            :param cache=None: a MeasurementsCache for the downloaded
+                               measurements, none by default
+            :param compress_requests=False: gzip the request bodies, for
+                                            servers decompressing them
         """
         super().__init__()
         self.api_url = api_url
         self.user = user
         self.password = password
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.cache = cache
+        self.compress_requests = compress_requests
+        self.session = self._create_session(retries, backoff_factor)
         self._headers()
 
+    def _create_session(self, retries, backoff_factor):
+        """
+        Create a session keeping the connections alive between requests.
+            :param self: self
+            :param retries: retries of the failed idempotent requests
+            :param backoff_factor: backoff between the retries
+        """
+        session = requests.Session()
+        # POST is not retried, a measurement could be stored twice. Once
+        # the retries are exhausted the last response is returned, and its
+        # status code reported as for any other error
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.max_workers,
+                              max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def send_json(self, method, path, body):
+        """
+        Send a JSON body, gzip compressed if compress_requests is set and
+        the server did not refuse it.
+            :param self: self
+            :param method: http method, 'post', 'put', etc.
+            :param path: url
+            :param body: JSON encoded body, bytes
+        """
+        headers = dict(self.auth_header)
+        headers['Content-Type'] = 'application/json'
+        if self.compress_requests:
+            r = self.request(
+                method, path, data=gzip.compress(body, compresslevel=5),
+                headers=dict(headers, **{'Content-Encoding': 'gzip'}))
+            # nothing was stored: send this one and the next ones
+            # uncompressed
+            if not self._refused_compression(r):
+                return r
+            self.compress_requests = False
+        return self.request(method, path, data=body, headers=headers)
+
+    def _refused_compression(self, r):
+        """
+        Whether a server answered it can not read a gzip body: unsupported
+        media type, or a bad request saying it could not decode it.
+            :param self: self
+            :param r: response to a gzip body
+        """
+        if r.status_code == 415:
+            return True
+        if r.status_code != 400:
+            return False
+        text = r.text.lower()
+        return any(word in text
+                   for word in ('decod', 'gzip', 'compress', 'encoding'))
+
+    def request(self, method, path, authenticate=True, **kwargs):
+        """
+        Send a request through the pooled session.
+            :param self: self
+            :param method: http method, 'get', 'post', etc.
+            :param path: url
+            :param authenticate=True: send the authorization header if True
+            :param **kwargs: arguments of requests.Session.request
+        """
+        if authenticate:
+            kwargs.setdefault('headers', self.auth_header)
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, path, **kwargs)
+
     def _payload_token(self):
         """
         Return a dictionary to generate a token.
@@ -505,7 +920,8 @@ class DataApi(APIBaseClass):
             :param self: self
         """
         path = self.api_url + __class__._subpath
-        r = requests.post(path, json=self._payload_token())
+        r = self.request('post', path, authenticate=False,
+                         json=self._payload_token())
         return self._fetch_json_from_url(r, 200, field_to_fetch='token')
 
 
@@ -1,5 +1,7 @@
 import datetime
 
+import pandas as pd
+
 
 def iso_to_datetime(isotime):
     """
@@ -17,6 +19,32 @@ def iso_to_datetime(isotime):
     return time
 
 
+def isos_to_datetimes(isotimes):
+    """
+    Transform isotimes to datetimes, in one vectorized call.
+        :param isotimes: sequence of isotimes, e.g. a pandas Series
+    """
+    times = pd.to_datetime(pd.Series(isotimes), utc=True)
+    # naive UTC datetimes, as iso_to_datetime
+    return times.dt.tz_localize(None)
+
+
+def datetime_to_iso(time):
+    """
+    Transform a naive UTC datetime, or a string, to isotime.
+        :param time: datetime, pandas Timestamp or date string
+    """
+    return pd.Timestamp(time).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def datetimes_to_isos(times):
+    """
+    Transform naive UTC datetimes to isotimes, in one vectorized call.
+        :param times: pandas Series of datetimes
+    """
+    return times.dt.strftime('%Y-%m-%dT%H:%M:%S.%f').str[:-3] + 'Z'
+
+
 def string_to_datetime(str_time, str_format=r'%Y-%m-%d %H:%M:%S'):
     """
     docstring here
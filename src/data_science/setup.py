@@ -63,7 +63,8 @@ setup(
     packages=find_packages(exclude=('tests',)),
     package_data={NAME: ['VERSION']},
     install_requires=list_reqs(),
-    extras_require={},
+    # the measurements cache writes Parquet files
+    extras_require={'cache': ['pyarrow>=0.11.1']},
     include_package_data=True,
     license='MIT',
     classifiers=[
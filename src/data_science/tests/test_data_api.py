@@ -0,0 +1,485 @@
+import gzip
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from data_science.data_transfer.cache import MeasurementsCache
+from data_science.data_transfer.data_api import (
+    DataApi, Dataset, Dataseries, MEASUREMENT_COLUMNS, UploadError)
+
+
+def make_measurements(start, count):
+    """Measurements of one page, a second apart"""
+    return [{'value': float(i), 'frequency': 50.0,
+             'timestamp': pd.Timestamp(1546300800 + i, unit='s').strftime(
+                 '%Y-%m-%dT%H:%M:%S.000Z')}
+            for i in range(start, start + count)]
+
+
+def make_data_api():
+    with patch.object(DataApi, 'get_token', return_value='token'):
+        return DataApi('user', 'password', 'http://data_api')
+
+
+class FakePages:
+    """Serve measurements in pages linked by next links"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __call__(self, path=None, from_time=None, to_time=None):
+        page = 0 if path is None else int(path)
+        next_link = str(page + 1) if page + 1 < len(self.pages) else None
+        return self.pages[page], next_link
+
+
+class MeasurementsDownloadTest(unittest.TestCase):
+    """Test that measurements are downloaded into dataframes"""
+
+    def setUp(self):
+        self.dataset = Dataset(make_data_api(), id_='dataset')
+        self.dataseries = Dataseries(self.dataset, id_='dataseries')
+        self.pages = [make_measurements(0, 3), make_measurements(3, 2)]
+        self.pages[1][0].pop('frequency')
+
+    def test_get_measurements_df(self):
+        with patch.object(self.dataseries, '_get_measurements',
+                          FakePages(self.pages)):
+            df = self.dataseries.get_measurements_df(
+                timestamp_to_datetime=True)
+
+        self.assertEqual(list(df.columns), MEASUREMENT_COLUMNS)
+        self.assertEqual(df['value'].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+        self.assertTrue(pd.isnull(df['frequency'][3]))
+        self.assertEqual(df['timestamp'][4],
+                         pd.Timestamp('2019-01-01 00:00:04'))
+
+    def test_iter_measurements_df_yields_pages(self):
+        with patch.object(self.dataseries, '_get_measurements',
+                          FakePages(self.pages)):
+            pages = list(self.dataseries.iter_measurements_df())
+
+        self.assertEqual([len(page) for page in pages], [3, 2])
+        self.assertEqual(pages[1]['timestamp'][0],
+                         '2019-01-01T00:00:03.000Z')
+
+    def test_empty_series(self):
+        with patch.object(self.dataseries, '_get_measurements',
+                          FakePages([[]])):
+            df = self.dataseries.get_measurements_df(
+                timestamp_to_datetime=True)
+
+        self.assertEqual(len(df), 0)
+        self.assertEqual(list(df.columns), MEASUREMENT_COLUMNS)
+
+
+class FakeServer:
+    """Serve the measurements of a time range, in linked pages"""
+
+    def __init__(self, measurements, page_size=100):
+        self.measurements = measurements
+        self.page_size = page_size
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, method, path, params=None, **kwargs):
+        url = urllib.parse.urlparse(path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        query.update(params or {})
+        with self.lock:
+            self.requests.append(query)
+        offset = int(query.get('offset', 0))
+        start = query.get('from_time', '')
+        end = query.get('to_time', 'Z')
+        selected = [m for m in self.measurements
+                    if start <= m['timestamp'] <= end]
+        page = selected[offset:offset + self.page_size]
+        links = [{'rel': 'self', 'href': url.path}]
+        if offset + self.page_size < len(selected):
+            next_query = urllib.parse.urlencode(
+                dict(query, offset=offset + self.page_size))
+            links.append({'rel': 'next',
+                          'href': f'{url.path}?{next_query}'})
+        return Mock(status_code=200, text=json.dumps(
+            {'measurements': page, 'links': links}))
+
+
+class WindowedDownloadTest(unittest.TestCase):
+    """Test that time windows are downloaded concurrently and merged"""
+
+    def setUp(self):
+        self.data_api = make_data_api()
+        self.dataseries = Dataseries(Dataset(self.data_api, id_='dataset'),
+                                     id_='dataseries')
+        self.server = FakeServer(make_measurements(0, 1000))
+
+    def test_time_range_is_sent(self):
+        with patch.object(self.data_api, 'request', self.server):
+            df = self.dataseries.get_measurements_df(
+                from_time='2019-01-01 00:00:10',
+                to_time='2019-01-01 00:00:19')
+
+        self.assertEqual(df['value'].tolist(), list(range(10, 20)))
+        self.assertEqual(self.server.requests[0]['from_time'],
+                         '2019-01-01T00:00:10.000Z')
+
+    def test_windows_are_merged_in_order(self):
+        with patch.object(self.data_api, 'request', self.server):
+            df = self.dataseries.get_measurements_df(
+                from_time='2019-01-01 00:00:00',
+                to_time='2019-01-01 00:16:39', windows=4)
+
+        # the bound of two windows is in both, and only once in the result
+        self.assertEqual(df['value'].tolist(), list(range(1000)))
+        first_pages = [query for query in self.server.requests
+                       if 'offset' not in query]
+        self.assertEqual(len(first_pages), 4)
+
+    def test_measurements_sharing_a_timestamp_are_kept(self):
+        measurements = make_measurements(0, 1001)
+        # a second measurement at a window bound, and one inside a window
+        for i in (250, 300):
+            measurements.append(dict(measurements[i], value=i * 10.0))
+        measurements.sort(key=lambda m: m['timestamp'])
+        server = FakeServer(measurements)
+        with patch.object(self.data_api, 'request', server):
+            df = self.dataseries.get_measurements_df(
+                from_time='2019-01-01 00:00:00',
+                to_time='2019-01-01 00:16:40', windows=4)
+
+        self.assertEqual(df['value'].tolist(),
+                         [m['value'] for m in measurements])
+
+    def test_session_pools_connections(self):
+        adapter = self.data_api.session.get_adapter('http://data_api')
+        self.assertEqual(adapter._pool_maxsize, self.data_api.max_workers)
+        self.assertEqual(adapter.max_retries.total, 3)
+
+    def test_status_is_reported_once_retries_are_exhausted(self):
+        class Unavailable(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = b'{}'
+                self.send_response(503)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.HTTPServer(('127.0.0.1', 0), Unavailable)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with patch.object(DataApi, 'get_token', return_value='token'):
+            data_api = DataApi('user', 'password',
+                               f'http://127.0.0.1:{server.server_port}/',
+                               retries=1, backoff_factor=0)
+        dataseries = Dataseries(Dataset(data_api, id_='dataset'),
+                                id_='dataseries')
+
+        with self.assertRaisesRegex(Exception, 'Status code: 503'):
+            dataseries.get_measurements_df()
+
+
+def fake_download_attributes(dataseries):
+    dataseries.name = 'series_' + dataseries.id
+
+
+def fake_measurements_df(dataseries, from_time=None, to_time=None,
+                         timestamp_to_datetime=False):
+    """Series 'a' has 3 measurements, 'b' has 2, a second later"""
+    offset = {'a': 0, 'b': 1}[dataseries.id]
+    count = {'a': 3, 'b': 2}[dataseries.id]
+    columns = {column: [m.get(column) for m in
+                        make_measurements(offset, count)]
+               for column in MEASUREMENT_COLUMNS}
+    return pd.DataFrame(columns, columns=MEASUREMENT_COLUMNS)
+
+
+@patch.object(Dataseries, 'download_attributes', fake_download_attributes)
+@patch.object(Dataseries, 'get_measurements_df', fake_measurements_df)
+class AllMeasurementsDownloadTest(unittest.TestCase):
+    """Test that the dataseries of a dataset are assembled in one frame"""
+
+    def setUp(self):
+        self.dataset = Dataset(make_data_api(), id_='dataset')
+        self.dataset.dataseries_ids = {'series_a': 'a', 'series_b': 'b'}
+
+    def test_wide_frame(self):
+        df = self.dataset.get_all_measurements_df(include_frequency=True,
+                                                  max_workers=2)
+
+        self.assertEqual(list(df.columns),
+                         ['series_a', 'series_a_ts', 'series_a_fq',
+                          'series_b', 'series_b_ts', 'series_b_fq'])
+        self.assertEqual(df['series_a'].tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(df['series_b'][:2].tolist(), [1.0, 2.0])
+        self.assertTrue(pd.isnull(df['series_b'][2]))
+
+    def test_tidy_frame(self):
+        df = self.dataset.get_all_measurements_df(tidy=True)
+
+        self.assertEqual(list(df.columns),
+                         ['dataseries', 'value', 'timestamp'])
+        self.assertEqual(len(df), 5)
+        self.assertTrue(df['timestamp'].is_monotonic_increasing)
+        self.assertEqual(df['dataseries'].tolist(),
+                         ['series_a', 'series_a', 'series_b', 'series_a',
+                          'series_b'])
+
+
+class FakeUploadServer:
+    """Store the uploaded measurements, refusing gzip bodies if asked"""
+
+    def __init__(self, gzip_status=None, gzip_text='{}', fail_row=None):
+        # status code and body answered to the gzip bodies, if not accepted
+        self.gzip_status = gzip_status
+        self.gzip_text = gzip_text
+        # value of a measurement failing its batch
+        self.fail_row = fail_row
+        self.gzip_requests = 0
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, method, path, data=None, headers=None, **kwargs):
+        if headers.get('Content-Encoding') == 'gzip':
+            with self.lock:
+                self.gzip_requests += 1
+            if self.gzip_status is not None:
+                return Mock(status_code=self.gzip_status,
+                            text=self.gzip_text)
+            data = gzip.decompress(data)
+        batch = json.loads(data.decode('utf-8'))
+        if any(m['value'] == self.fail_row for m in batch):
+            return Mock(status_code=500, text='{}')
+        with self.lock:
+            self.batches.append(batch)
+        return Mock(status_code=201, text='{}')
+
+
+class MeasurementsUploadTest(unittest.TestCase):
+    """Test that measurements are uploaded in compressed concurrent batches"""
+
+    def setUp(self):
+        self.data_api = make_data_api()
+        self.dataseries = Dataseries(Dataset(self.data_api, id_='dataset'),
+                                     id_='dataseries')
+        self.df = pd.DataFrame({
+            'timestamp': pd.date_range('2019-01-01', periods=1000, freq='s'),
+            'value': [float(i) for i in range(1000)],
+            'frequency': 50.0})
+
+    def uploaded(self, server):
+        measurements = [m for batch in server.batches for m in batch]
+        return sorted(measurements, key=lambda m: m['timestamp'])
+
+    def test_upload_measurements_df(self):
+        self.df.loc[3, 'value'] = None
+        self.df.loc[4, 'frequency'] = None
+        server = FakeUploadServer()
+        with patch.object(self.data_api, 'request', server):
+            self.dataseries.upload_measurents_df(self.df, max_workers=4)
+
+        measurements = self.uploaded(server)
+        self.assertEqual(len(measurements), 999)
+        self.assertEqual(measurements[0], {
+            'timestamp': '2019-01-01T00:00:00.000Z', 'value': 0.0,
+            'frequency': 50.0})
+        self.assertEqual(measurements[3], {
+            'timestamp': '2019-01-01T00:00:04.000Z', 'value': 4.0})
+
+    def test_uncompressed_by_default(self):
+        server = FakeUploadServer(gzip_status=400)
+        with patch.object(self.data_api, 'request', server):
+            self.dataseries.upload_measurents_df(self.df)
+
+        self.assertEqual(len(self.uploaded(server)), 1000)
+        self.assertEqual(server.gzip_requests, 0)
+
+    def test_compressed_bodies(self):
+        self.data_api.compress_requests = True
+        server = FakeUploadServer()
+        with patch.object(self.data_api, 'request', server):
+            self.dataseries.upload_measurents_df(self.df)
+
+        self.assertEqual(len(self.uploaded(server)), 1000)
+        self.assertGreater(server.gzip_requests, 0)
+        self.assertTrue(self.data_api.compress_requests)
+
+    def test_falls_back_to_uncompressed(self):
+        for status_code, text in ((415, '{}'), (
+                400, '{"error": "could not decode the request body"}')):
+            self.data_api.compress_requests = True
+            server = FakeUploadServer(gzip_status=status_code,
+                                      gzip_text=text)
+            with patch.object(self.data_api, 'request', server):
+                self.dataseries.upload_measurents_df(self.df)
+
+            self.assertEqual(len(self.uploaded(server)), 1000)
+            self.assertFalse(self.data_api.compress_requests)
+
+    def test_invalid_measurements_are_not_sent_twice(self):
+        self.data_api.compress_requests = True
+        server = FakeUploadServer(
+            gzip_status=400, gzip_text='{"error": "invalid timestamp"}')
+        with patch.object(self.data_api, 'request', server):
+            with self.assertRaises(UploadError):
+                self.dataseries.upload_measurents_df(self.df,
+                                                     max_workers=1)
+
+        self.assertEqual(server.gzip_requests, 1)
+        self.assertEqual(server.batches, [])
+        self.assertTrue(self.data_api.compress_requests)
+
+    def test_failed_rows_are_reported(self):
+        server = FakeUploadServer(fail_row=500.0)
+        with patch.object(self.data_api, 'request', server):
+            with self.assertRaises(UploadError) as raised:
+                self.dataseries.upload_measurents_df(self.df, max_workers=4)
+
+        failed = [position for start, stop in raised.exception.failed_rows
+                  for position in range(start, stop)]
+        self.assertIn(500, failed)
+        stored = [m['value'] for m in self.uploaded(server)]
+        self.assertEqual(sorted(stored + [float(i) for i in failed]),
+                         self.df['value'].tolist())
+
+    def test_batch_size_adapts_to_latency(self):
+        self.dataseries.UPLOAD_TARGET_SECONDS = 1.0
+        # fast batches double the size, up to the max
+        self.assertEqual(self.dataseries._next_batch_size(500, 500, 0.01),
+                         1000)
+        self.assertEqual(self.dataseries._next_batch_size(15000, 15000, 0.1),
+                         self.dataseries.MAX_MEASUREMENTS_PER_POST)
+        # slow batches halve it, down to the min
+        self.assertEqual(self.dataseries._next_batch_size(500, 500, 4.0), 250)
+        self.assertEqual(self.dataseries._next_batch_size(60, 60, 10.0),
+                         self.dataseries.MIN_MEASUREMENTS_PER_POST)
+        self.assertEqual(self.dataseries._next_batch_size(500, 500, 1.25),
+                         400)
+
+
+class CachedDownloadTest(unittest.TestCase):
+    """Test that cached measurements are served locally, and completed"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_api = make_data_api()
+        self.data_api.cache = MeasurementsCache(self.directory.name)
+        self.dataset = Dataset(self.data_api, id_='dataset')
+        self.server = FakeServer(make_measurements(0, 1000))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_measurements_df(self, from_time, to_time, id_='dataseries'):
+        dataseries = Dataseries(self.dataset, id_=id_)
+        with patch.object(self.data_api, 'request', self.server):
+            return dataseries.get_measurements_df(from_time=from_time,
+                                                  to_time=to_time)
+
+    def test_repeated_download_is_served_locally(self):
+        first = self.get_measurements_df('2019-01-01 00:00:00',
+                                         '2019-01-01 00:01:39')
+        requests = len(self.server.requests)
+        second = self.get_measurements_df('2019-01-01 00:00:10',
+                                          '2019-01-01 00:00:19')
+
+        self.assertEqual(len(self.server.requests), requests)
+        self.assertEqual(second['value'].tolist(), list(range(10, 20)))
+        # the same timestamps as downloaded
+        pd.testing.assert_frame_equal(second, first[10:20].reset_index(
+            drop=True))
+
+    def test_only_the_tail_is_downloaded(self):
+        self.get_measurements_df('2019-01-01 00:00:00',
+                                 '2019-01-01 00:01:39')
+        self.server.requests.clear()
+        df = self.get_measurements_df('2019-01-01 00:01:00',
+                                      '2019-01-01 00:03:19')
+
+        self.assertEqual(df['value'].tolist(), list(range(60, 200)))
+        self.assertEqual(self.server.requests[0]['from_time'],
+                         '2019-01-01T00:01:39.000Z')
+
+    def test_only_the_head_is_downloaded(self):
+        self.get_measurements_df('2019-01-01 00:00:50',
+                                 '2019-01-01 00:01:39')
+        self.server.requests.clear()
+        df = self.get_measurements_df('2019-01-01 00:00:00',
+                                      '2019-01-01 00:00:59')
+
+        self.assertEqual(df['value'].tolist(), list(range(60)))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]['to_time'],
+                         '2019-01-01T00:00:50.000Z')
+        # the cached measurements after the head are kept
+        self.server.requests.clear()
+        df = self.get_measurements_df('2019-01-01 00:00:00',
+                                      '2019-01-01 00:01:39')
+        self.assertEqual(df['value'].tolist(), list(range(100)))
+        self.assertEqual(self.server.requests, [])
+
+    def test_cached_timestamps_are_the_downloaded_ones(self):
+        measurements = make_measurements(0, 100)
+        for measurement in measurements:
+            # without milliseconds
+            measurement['timestamp'] = measurement['timestamp'][:19] + 'Z'
+        self.server = FakeServer(measurements)
+        downloaded = self.get_measurements_df(None, None)
+        cached = self.get_measurements_df(None, None)
+        self.data_api.cache = None
+        uncached = self.get_measurements_df(None, None)
+
+        pd.testing.assert_frame_equal(downloaded, uncached)
+        pd.testing.assert_frame_equal(cached, uncached)
+        self.assertEqual(cached['timestamp'][0], '2019-01-01T00:00:00Z')
+
+    def cached_files(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = self.data_api.cache
+        self.get_measurements_df(None, '2019-01-01 00:01:39', id_='a')
+        self.get_measurements_df(None, '2019-01-01 00:01:39', id_='b')
+        # room for two dataseries
+        cache.max_bytes = sum(
+            os.path.getsize(os.path.join(self.directory.name, name))
+            for name in ['a.parquet', 'b.parquet']) + 100
+        self.get_measurements_df(None, '2019-01-01 00:00:09', id_='a')
+        self.get_measurements_df(None, '2019-01-01 00:01:39', id_='c')
+
+        self.assertEqual(cache.cached_ids(), ['a', 'c'])
+        self.assertEqual(self.cached_files(),
+                         ['a.json', 'a.parquet', 'c.json', 'c.parquet'])
+
+    def test_sessions_share_a_directory(self):
+        other_session = make_data_api()
+        other_session.cache = MeasurementsCache(self.directory.name)
+        other_dataset = Dataset(other_session, id_='dataset')
+
+        self.get_measurements_df(None, '2019-01-01 00:01:39', id_='a')
+        with patch.object(other_session, 'request', self.server):
+            Dataseries(other_dataset, id_='b').get_measurements_df(
+                to_time='2019-01-01 00:01:39')
+        self.get_measurements_df(None, '2019-01-01 00:01:39', id_='c')
+
+        # the entries of both sessions are kept, and served to both
+        self.assertEqual(self.data_api.cache.cached_ids(), ['a', 'b', 'c'])
+        self.server.requests.clear()
+        df = self.get_measurements_df(None, '2019-01-01 00:00:09', id_='b')
+        self.assertEqual(df['value'].tolist(), list(range(10)))
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,9 @@ import sys
 import unittest
 
 from .tools.test_transformations import TransformationsTest
+from .test_data_api import (
+    AllMeasurementsDownloadTest, CachedDownloadTest, MeasurementsDownloadTest,
+    MeasurementsUploadTest, WindowedDownloadTest)
 
 
 if __name__ == '__main__':
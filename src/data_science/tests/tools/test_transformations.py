@@ -1,5 +1,11 @@
+import datetime
 import unittest
-from data_science.tools.transformations import per_hour_to_per_second
+
+import pandas as pd
+
+from data_science.tools.transformations import (
+    datetime_to_iso, datetimes_to_isos, iso_to_datetime, isos_to_datetimes,
+    per_hour_to_per_second)
 
 
 class TransformationsTest(unittest.TestCase):
@@ -7,3 +13,24 @@ class TransformationsTest(unittest.TestCase):
 
     def test_per_hour_to_per_second(self):
         self.assertEqual(per_hour_to_per_second(3600), 1)
+
+    def test_isos_to_datetimes(self):
+        isotimes = ['2019-01-01T00:00:00.250Z', '2019-01-01T10:30:00Z']
+        times = isos_to_datetimes(isotimes)
+        self.assertEqual(list(times),
+                         [iso_to_datetime(isotime) for isotime in isotimes])
+        self.assertIsNone(times.dt.tz)
+
+    def test_datetime_to_iso(self):
+        time = datetime.datetime(2019, 1, 1, 10, 30, 0, 250000)
+        self.assertEqual(datetime_to_iso(time), '2019-01-01T10:30:00.250Z')
+        self.assertEqual(datetime_to_iso('2019-01-01 10:30'),
+                         '2019-01-01T10:30:00.000Z')
+
+    def test_datetimes_to_isos(self):
+        times = pd.Series([datetime.datetime(2019, 1, 1),
+                           datetime.datetime(2019, 1, 1, 0, 0, 1, 500000)])
+        isotimes = datetimes_to_isos(times)
+        self.assertEqual(list(isotimes), ['2019-01-01T00:00:00.000Z',
+                                          '2019-01-01T00:00:01.500Z'])
+        self.assertEqual(list(isos_to_datetimes(isotimes)), list(times))
@@ -0,0 +1,16 @@
+import logging
+import os
+
+from neural_network_model.config import config
+from neural_network_model.config import logging_config
+
+
+# Configure logger for use in package
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(logging_config.get_async_handler())
+logger.propagate = False
+
+
+with open(os.path.join(config.PACKAGE_ROOT, 'VERSION')) as version_file:
+    __version__ = version_file.read().strip()
@@ -0,0 +1,36 @@
+import os
+import pathlib
+
+import neural_network_model
+
+
+PACKAGE_ROOT = pathlib.Path(neural_network_model.__file__).resolve().parent
+TRAINED_MODEL_DIR = PACKAGE_ROOT / 'trained_models'
+DATASET_DIR = PACKAGE_ROOT / 'datasets'
+
+# data, one folder of images per class
+DATA_FOLDER = DATASET_DIR / 'v2-plant-seedlings-dataset'
+TEST_DATA_FOLDER = DATASET_DIR / 'test_data'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# images are resized to IMAGE_SIZE x IMAGE_SIZE, 3 channels
+IMAGE_SIZE = 150
+
+# training
+MODEL_NAME = 'cnn_model'
+PIPELINE_NAME = 'cnn_pipe'
+CLASSES_NAME = 'classes'
+TEST_SIZE = 0.2
+BATCH_SIZE = 10
+EPOCHS = int(os.environ.get('EPOCHS', 8))
+
+# images per network call, every batch has this size, the last one
+# is padded, so the network always runs on the same shape
+INFERENCE_BATCH_SIZE = 32
+# threads decoding and resizing images, and batches decoded ahead of
+# the one the network is running on
+DECODE_WORKERS = os.cpu_count() or 1
+PREFETCH_BATCHES = 2
+
+# number of model versions kept in TRAINED_MODEL_DIR
+MODEL_VERSIONS_TO_KEEP = 2
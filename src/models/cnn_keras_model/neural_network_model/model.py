@@ -0,0 +1,45 @@
+from keras.layers import Conv2D, Dense, Dropout, Flatten, MaxPooling2D
+from keras.models import Sequential
+from keras.optimizers import Adam
+
+from neural_network_model.config import config
+
+import typing as t
+
+
+def cnn_model(*, n_classes: int,
+              image_size: int = config.IMAGE_SIZE,
+              kernel_size: t.Tuple[int, int] = (3, 3),
+              pool_size: t.Tuple[int, int] = (2, 2),
+              first_filters: int = 32,
+              second_filters: int = 64,
+              third_filters: int = 128,
+              dropout_conv: float = 0.3,
+              dropout_dense: float = 0.3) -> Sequential:
+    """Convolutional network classifying square color images."""
+
+    model = Sequential()
+    model.add(Conv2D(first_filters, kernel_size, activation='relu',
+                     input_shape=(image_size, image_size, 3)))
+    model.add(Conv2D(first_filters, kernel_size, activation='relu'))
+    model.add(MaxPooling2D(pool_size=pool_size))
+    model.add(Dropout(dropout_conv))
+
+    model.add(Conv2D(second_filters, kernel_size, activation='relu'))
+    model.add(Conv2D(second_filters, kernel_size, activation='relu'))
+    model.add(MaxPooling2D(pool_size=pool_size))
+    model.add(Dropout(dropout_conv))
+
+    model.add(Conv2D(third_filters, kernel_size, activation='relu'))
+    model.add(Conv2D(third_filters, kernel_size, activation='relu'))
+    model.add(MaxPooling2D(pool_size=pool_size))
+    model.add(Dropout(dropout_conv))
+
+    model.add(Flatten())
+    model.add(Dense(256, activation='relu'))
+    model.add(Dropout(dropout_dense))
+    model.add(Dense(n_classes, activation='softmax'))
+
+    model.compile(Adam(lr=0.0001), loss='categorical_crossentropy',
+                  metrics=['accuracy'])
+    return model
@@ -0,0 +1,56 @@
+"""Model plugin, serving the model next to other model packages.
+
+Registered under the 'deployment_framework.models' entry point group,
+where the API discovers it. Records have a base64 encoded image.
+"""
+
+import base64
+import binascii
+
+from neural_network_model.predict import make_prediction, warmup
+from neural_network_model.processing.data_management import load_model
+from neural_network_model import __version__ as _version
+
+import typing as t
+
+
+class NeuralNetworkModelPlugin:
+
+    name = 'neural_network_model'
+    version = _version
+    input_schema = {
+        'type': 'object',
+        'required': ['image'],
+        'properties': {
+            'image': {'type': 'string', 'contentEncoding': 'base64'},
+        },
+    }
+
+    def load(self) -> None:
+        load_model(version=_version)
+
+    def warmup(self) -> None:
+        warmup()
+
+    def predict_batch(self, rows: t.List[dict]) -> dict:
+        """Classify records in one call, None for the invalid ones.
+
+        Returns:
+            One class per record and the model version.
+        """
+
+        images = []
+        for row in rows:
+            try:
+                images.append(base64.b64decode(row['image'], validate=True))
+            except (binascii.Error, TypeError, ValueError):
+                # not an image either, the row is masked as invalid
+                images.append(b'')
+        result = make_prediction(input_data=images)
+        predictions = iter(result.get('predictions'))
+        return {'predictions': [next(predictions) if valid else None
+                                for valid in result.get('valid_rows')],
+                'version': result.get('version')}
+
+
+plugin = NeuralNetworkModelPlugin()
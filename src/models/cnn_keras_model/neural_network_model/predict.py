@@ -0,0 +1,92 @@
+import pathlib
+import time
+
+import numpy as np
+
+from neural_network_model.config import config
+from neural_network_model.processing.data_management import load_model
+from neural_network_model.processing.images import Image, iter_batches
+from neural_network_model import __version__ as _version
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+
+def warmup() -> None:
+    """Load the model and run it once ahead of the first prediction.
+
+    The first call of a network builds its prediction function, call
+    this once at server startup so no request pays for it.
+    """
+
+    model, _ = load_model(version=_version)
+    model.predict_on_batch(np.zeros(
+        (config.INFERENCE_BATCH_SIZE, config.IMAGE_SIZE, config.IMAGE_SIZE,
+         3), dtype=np.float32))
+
+
+def iter_predictions(*, input_data: t.Iterable[Image],
+                     batch_size: int = config.INFERENCE_BATCH_SIZE,
+                     workers: int = config.DECODE_WORKERS
+                     ) -> t.Iterator[t.Tuple[np.ndarray, np.ndarray]]:
+    """Predict a stream of images, batch by batch.
+
+    Yields:
+        The class probabilities of every image of a batch, and a mask
+        of the images that could be decoded, the probabilities of the
+        others are NaN.
+    """
+
+    model, _ = load_model(version=_version)
+    for batch in iter_batches(input_data, batch_size=batch_size,
+                              workers=workers):
+        # the padding rows keep the shape of the network input fixed
+        probabilities = model.predict_on_batch(batch.images)[:batch.size]
+        valid = np.ones(batch.size, dtype=bool)
+        valid[[position - batch.start for position in batch.invalid]] = False
+        probabilities[~valid] = np.nan
+        yield probabilities, valid
+
+
+def make_prediction(*, input_data: t.Union[Image, t.Iterable[Image]],
+                    batch_size: int = config.INFERENCE_BATCH_SIZE) -> dict:
+    """Classify images with the saved network.
+
+    Args:
+        input_data: An image or a sequence of them. Each is an image
+            file, its encoded bytes or a decoded BGR array.
+        batch_size: Images per network call.
+
+    Returns:
+        The class of each valid image, their class probabilities, a
+        boolean mask of the input images that were valid, as well as
+        the model version.
+    """
+
+    single = isinstance(input_data, (str, bytes, pathlib.PurePath))
+    if single or getattr(input_data, 'ndim', None) == 3:
+        input_data = [input_data]
+
+    start = time.perf_counter()
+    _, classes = load_model(version=_version)
+    results = list(iter_predictions(input_data=input_data,
+                                    batch_size=batch_size))
+    if not results:
+        results = [(np.empty((0, len(classes)), dtype=np.float32),
+                    np.empty(0, dtype=bool))]
+    probabilities = np.concatenate([batch[0] for batch in results])
+    valid_rows = np.concatenate([batch[1] for batch in results])
+    probabilities = probabilities[valid_rows]
+    predictions = [classes[index] for index in probabilities.argmax(axis=1)]
+
+    elapsed = time.perf_counter() - start
+    _logger.info(
+        'Made predictions with model version: %s Images predicted: %d '
+        'Images rejected: %d Latency: %.1f ms', _version, len(predictions),
+        int((~valid_rows).sum()), elapsed * 1000)
+
+    return {'predictions': predictions, 'probabilities': probabilities,
+            'valid_rows': valid_rows, 'version': _version}
@@ -0,0 +1,89 @@
+import functools
+import json
+import pathlib
+
+from neural_network_model.config import config
+from neural_network_model import __version__ as _version
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+
+def load_image_paths(*, data_folder: pathlib.Path = config.DATA_FOLDER
+                     ) -> t.Tuple[t.List[pathlib.Path], t.List[str]]:
+    """List the images of a dataset, with one folder per class.
+
+    Returns:
+        The image files and the class of each one, its folder name.
+    """
+
+    images = []
+    targets = []
+    for class_folder in sorted(data_folder.iterdir()):
+        if not class_folder.is_dir():
+            continue
+        for image in sorted(class_folder.iterdir()):
+            if image.suffix.lower() in config.IMAGE_EXTENSIONS:
+                images.append(image)
+                targets.append(class_folder.name)
+    return images, targets
+
+
+def _model_file(version: str) -> pathlib.Path:
+    return config.TRAINED_MODEL_DIR / f'{config.MODEL_NAME}_v{version}.h5'
+
+
+def _classes_file(version: str) -> pathlib.Path:
+    return config.TRAINED_MODEL_DIR / f'{config.CLASSES_NAME}_v{version}.json'
+
+
+def saved_versions() -> t.List[str]:
+    """Versions with a saved model, oldest first."""
+
+    prefix = f'{config.MODEL_NAME}_v'
+    models = sorted(config.TRAINED_MODEL_DIR.glob(f'{prefix}*.h5'),
+                    key=lambda path: path.stat().st_mtime)
+    return [path.stem[len(prefix):] for path in models]
+
+
+def remove_old_models(*, versions_to_keep: int = (
+        config.MODEL_VERSIONS_TO_KEEP)) -> None:
+    """Remove all but the latest saved versions and the current one."""
+
+    versions = saved_versions()
+    keep = set(versions[-versions_to_keep:]) | {_version}
+    for version in versions:
+        if version not in keep:
+            _model_file(version).unlink()
+            if _classes_file(version).exists():
+                _classes_file(version).unlink()
+
+
+def save_model(*, model, classes: t.List[str]) -> None:
+    """Save a trained network and its class labels, for this version.
+
+    The network is saved as HDF5 and the labels, in the order of the
+    network outputs, as JSON.
+    """
+
+    model.save(str(_model_file(_version)))
+    with open(_classes_file(_version), 'w') as classes_file:
+        json.dump(list(classes), classes_file)
+    remove_old_models()
+    _logger.info(f'saved model version: {_version}')
+
+
+@functools.lru_cache(maxsize=config.MODEL_VERSIONS_TO_KEEP)
+def load_model(*, version: str = _version) -> t.Tuple[t.Any, t.List[str]]:
+    """Load a saved network and its class labels, once per version."""
+
+    from keras.models import load_model as load_keras_model
+
+    model = load_keras_model(str(_model_file(version)))
+    with open(_classes_file(version)) as classes_file:
+        classes = json.load(classes_file)
+    _logger.info(f'loaded model version: {version}')
+    return model, classes
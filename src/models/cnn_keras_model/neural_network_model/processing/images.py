@@ -0,0 +1,129 @@
+import collections
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from neural_network_model.config import config
+from neural_network_model.processing.errors import InvalidModelInputError
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+# an image file, its encoded bytes or a decoded BGR array
+Image = t.Union[str, pathlib.Path, bytes, np.ndarray]
+
+
+def read_image(image: Image, image_size: int = config.IMAGE_SIZE,
+               out: t.Optional[np.ndarray] = None) -> np.ndarray:
+    """Decode and resize an image to a float32 array scaled to [0, 1].
+
+    Args:
+        image: Image file, encoded image bytes or decoded BGR array.
+        image_size: Side of the square output.
+        out: Array of shape (image_size, image_size, 3) to write to.
+    """
+
+    try:
+        if isinstance(image, np.ndarray):
+            decoded = image
+        elif isinstance(image, bytes):
+            decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8),
+                                   cv2.IMREAD_COLOR)
+        else:
+            decoded = cv2.imread(str(image), cv2.IMREAD_COLOR)
+    except cv2.error:
+        decoded = None
+    if decoded is None or decoded.ndim != 3 or decoded.shape[2] != 3:
+        raise InvalidModelInputError(
+            f'Can not decode a color image from: {str(image)[:100]}')
+
+    if decoded.shape[:2] != (image_size, image_size):
+        # shrinking averages pixel areas, as a camera would
+        interpolation = (cv2.INTER_AREA if decoded.shape[0] > image_size
+                         else cv2.INTER_LINEAR)
+        decoded = cv2.resize(decoded, (image_size, image_size),
+                             interpolation=interpolation)
+
+    if out is None:
+        out = np.empty((image_size, image_size, 3), dtype=np.float32)
+    np.multiply(decoded, np.float32(1 / 255), out=out)
+    return out
+
+
+class Batch(t.NamedTuple):
+    # first input position and number of images in the batch, the
+    # rows after them are padding
+    start: int
+    size: int
+    images: np.ndarray
+    # input positions in the batch that could not be decoded
+    invalid: t.List[int]
+
+
+def _read_batch(images: t.List[Image], start: int, batch_size: int,
+                image_size: int, executor: ThreadPoolExecutor
+                ) -> t.Callable[[], Batch]:
+    """Decode a batch in the pool, returns a function waiting for it."""
+
+    array = np.zeros((batch_size, image_size, image_size, 3),
+                     dtype=np.float32)
+
+    def read(position: int) -> bool:
+        try:
+            read_image(images[position], image_size, out=array[position])
+        except InvalidModelInputError:
+            _logger.warning(f'Skipping image {start + position}, '
+                            f'it can not be decoded')
+            array[position] = 0
+            return False
+        return True
+
+    futures = [executor.submit(read, position)
+               for position in range(len(images))]
+
+    def result() -> Batch:
+        invalid = [start + position
+                   for position, future in enumerate(futures)
+                   if not future.result()]
+        return Batch(start, len(images), array, invalid)
+
+    return result
+
+
+def iter_batches(images: t.Iterable[Image], *,
+                 batch_size: int = config.INFERENCE_BATCH_SIZE,
+                 image_size: int = config.IMAGE_SIZE,
+                 workers: int = config.DECODE_WORKERS,
+                 prefetch: int = config.PREFETCH_BATCHES
+                 ) -> t.Iterator[Batch]:
+    """Decode and resize images in a thread pool, in fixed size batches.
+
+    Up to prefetch batches are decoded while the caller runs the network
+    on the current one, so the network does not wait for the decoding.
+    OpenCV releases the GIL, the threads decode in parallel. Images are
+    read from the input lazily, it can be a stream of any length.
+
+    Yields:
+        Batches in input order, every one with batch_size rows.
+    """
+
+    images = iter(images)
+    pending = collections.deque()
+    start = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) <= prefetch:
+                chunk = [image for _, image in zip(range(batch_size), images)]
+                if not chunk:
+                    break
+                pending.append(_read_batch(chunk, start, batch_size,
+                                           image_size, executor))
+                start += len(chunk)
+            if not pending:
+                return
+            yield pending.popleft()()
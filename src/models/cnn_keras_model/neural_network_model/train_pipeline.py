@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from neural_network_model import model as m
+from neural_network_model.config import config
+from neural_network_model.processing import data_management as dm
+from neural_network_model.processing.images import iter_batches
+from neural_network_model import __version__ as _version
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+
+def training_batches(images: t.List, targets: t.List[str],
+                     classes: t.List[str], *,
+                     batch_size: int = config.BATCH_SIZE,
+                     shuffle: bool = True
+                     ) -> t.Iterator[t.Tuple[np.ndarray, np.ndarray]]:
+    """Decoded images and one hot targets, looping over the dataset.
+
+    The images are decoded by the same prefetching pool as at inference,
+    so the whole dataset is never held in memory.
+    """
+
+    one_hot = np.eye(len(classes), dtype=np.float32)
+    labels = np.array([classes.index(target) for target in targets])
+    order = list(range(len(images)))
+    while True:
+        if shuffle:
+            random.shuffle(order)
+        for batch in iter_batches([images[i] for i in order],
+                                  batch_size=batch_size):
+            rows = order[batch.start:batch.start + batch.size]
+            yield batch.images[:batch.size], one_hot[labels[rows]]
+
+
+def run_training(*, save_result: bool = True) -> None:
+    """Train the network on the images of config.DATA_FOLDER."""
+
+    images, targets = dm.load_image_paths(data_folder=config.DATA_FOLDER)
+    X_train, X_test, y_train, y_test = train_test_split(
+        images, targets, test_size=config.TEST_SIZE, random_state=101,
+        stratify=targets)
+    classes = sorted(set(targets))
+
+    model = m.cnn_model(n_classes=len(classes))
+    model.fit_generator(
+        training_batches(X_train, y_train, classes),
+        steps_per_epoch=int(np.ceil(len(X_train) / config.BATCH_SIZE)),
+        epochs=config.EPOCHS,
+        validation_data=training_batches(X_test, y_test, classes,
+                                         shuffle=False),
+        validation_steps=int(np.ceil(len(X_test) / config.BATCH_SIZE)))
+
+    if save_result:
+        _logger.info(f'saving model version: {_version}')
+        dm.save_model(model=model, classes=classes)
+
+
+if __name__ == '__main__':
+    run_training(save_result=True)
@@ -64,6 +64,11 @@ setup(
     package_data={'neural_network_model': ['VERSION']},
     install_requires=list_reqs(),
     extras_require={},
+    entry_points={
+        'deployment_framework.models': [
+            'neural_network_model=neural_network_model.plugin:plugin',
+        ],
+    },
     include_package_data=True,
     license='MIT',
     classifiers=[
@@ -0,0 +1,76 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from neural_network_model.processing import images
+from neural_network_model.processing.errors import InvalidModelInputError
+from neural_network_model.processing.images import iter_batches, read_image
+
+
+def _image(value: int, size: int = 20) -> np.ndarray:
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+
+def test_read_image_decodes_and_resizes(tmp_path):
+    image_file = tmp_path / 'image.png'
+    cv2.imwrite(str(image_file), _image(255, size=40))
+    encoded = cv2.imencode('.png', _image(51, size=10))[1].tobytes()
+
+    from_file = read_image(image_file, image_size=20)
+    from_bytes = read_image(encoded, image_size=20)
+
+    assert from_file.shape == (20, 20, 3)
+    assert from_file.dtype == np.float32
+    assert np.allclose(from_file, 1.0)
+    assert np.allclose(from_bytes, 0.2)
+
+
+def test_read_image_rejects_invalid_input(tmp_path):
+    with pytest.raises(InvalidModelInputError):
+        read_image(b'not an image', image_size=20)
+    with pytest.raises(InvalidModelInputError):
+        read_image(b'', image_size=20)
+    with pytest.raises(InvalidModelInputError):
+        read_image(tmp_path / 'missing.png', image_size=20)
+
+
+def test_batches_keep_order_and_fixed_size():
+    inputs = [_image(value) for value in range(10)]
+    inputs[4] = b'not an image'
+
+    batches = list(iter_batches(inputs, batch_size=4, image_size=20,
+                                workers=3, prefetch=1))
+
+    assert [batch.start for batch in batches] == [0, 4, 8]
+    assert [batch.size for batch in batches] == [4, 4, 2]
+    assert all(batch.images.shape == (4, 20, 20, 3) for batch in batches)
+    assert batches[1].invalid == [4]
+    decoded = np.concatenate([batch.images[:batch.size, 0, 0, 0]
+                              for batch in batches])
+    expected = np.arange(10, dtype=np.float32) / 255
+    expected[4] = 0
+    assert np.allclose(decoded, expected)
+    # the padding rows are zeros
+    assert not batches[2].images[2:].any()
+
+
+def test_batches_prefetch_a_bounded_number_ahead(monkeypatch):
+    """Only prefetch batches are decoded ahead of the consumer"""
+    decoded = []
+    lock = threading.Lock()
+    original = images.read_image
+
+    def read_image_counting(image, image_size, out=None):
+        with lock:
+            decoded.append(image)
+        return original(image, image_size, out=out)
+
+    monkeypatch.setattr(images, 'read_image', read_image_counting)
+    batches = iter_batches((_image(0) for _ in range(100)), batch_size=5,
+                           image_size=20, workers=2, prefetch=2)
+
+    next(batches)
+    assert len(decoded) <= 5 * 3
+    batches.close()
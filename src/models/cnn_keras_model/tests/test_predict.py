@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import pytest
+
+from neural_network_model.config import config
+from neural_network_model.predict import make_prediction
+from neural_network_model.processing import data_management
+
+
+CLASSES = ['Black-grass', 'Charlock']
+
+
+@pytest.fixture
+def saved_model(tmp_path, monkeypatch):
+    """Save a tiny untrained network as the model of this version"""
+    keras_layers = pytest.importorskip('keras.layers')
+    keras_models = pytest.importorskip('keras.models')
+
+    model = keras_models.Sequential()
+    model.add(keras_layers.MaxPooling2D(
+        pool_size=(50, 50),
+        input_shape=(config.IMAGE_SIZE, config.IMAGE_SIZE, 3)))
+    model.add(keras_layers.Flatten())
+    model.add(keras_layers.Dense(len(CLASSES), activation='softmax'))
+
+    monkeypatch.setattr(config, 'TRAINED_MODEL_DIR', tmp_path)
+    data_management.load_model.cache_clear()
+    data_management.save_model(model=model, classes=CLASSES)
+    yield model
+    data_management.load_model.cache_clear()
+
+
+@pytest.fixture
+def image_files(tmp_path):
+    files = []
+    for value in (0, 128, 255):
+        image_file = tmp_path / f'{value}.png'
+        cv2.imwrite(str(image_file), np.full((40, 60, 3), value,
+                                             dtype=np.uint8))
+        files.append(image_file)
+    return files
+
+
+def test_make_prediction_shapes(saved_model, image_files):
+    """Test every valid image gets a class and its probabilities"""
+    subject = make_prediction(input_data=image_files + [b'not an image'])
+
+    assert subject.get('version') is not None
+    assert subject.get('valid_rows').tolist() == [True, True, True, False]
+    assert subject.get('probabilities').shape == (3, len(CLASSES))
+    np.testing.assert_allclose(subject.get('probabilities').sum(axis=1),
+                               1.0, rtol=1e-5)
+    assert all(prediction in CLASSES
+               for prediction in subject.get('predictions'))
+
+
+def test_make_prediction_batch_size_does_not_change_predictions(
+        saved_model, image_files):
+    batched = make_prediction(input_data=image_files * 2, batch_size=2)
+    single = [make_prediction(input_data=image_file)
+              for image_file in image_files]
+
+    assert batched.get('predictions') == [
+        result.get('predictions')[0] for result in single] * 2
+    np.testing.assert_allclose(
+        batched.get('probabilities'),
+        np.concatenate([result.get('probabilities')
+                        for result in single] * 2), rtol=1e-5)
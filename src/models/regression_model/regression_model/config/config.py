@@ -63,6 +63,65 @@ CATEGORICAL_NA_NOT_ALLOWED = [
 
 PIPELINE_NAME = 'lasso_regression'
 PIPELINE_SAVE_FILE = f'{PIPELINE_NAME}_output_v'
+FROZEN_PIPELINE_SAVE_FILE = f'{PIPELINE_NAME}_frozen_v'
+# directory with a JSON manifest and memory mapped arrays
+ARTIFACT_SAVE_DIR = f'{PIPELINE_NAME}_artifact_v'
+
+# number of pipeline versions kept loaded in memory
+PIPELINE_CACHE_SIZE = 2
+
+# number of pipeline versions kept in TRAINED_MODEL_DIR
+PIPELINE_VERSIONS_TO_KEEP = 2
+
+# version scoring a share of the predictions, next to the current one
+CANDIDATE_MODEL_VERSION = None
+CANDIDATE_TRAFFIC_SHARE = 0.0
+# score the candidate in the background on the current version batches
+SHADOW_SCORING = False
+# shadow batches waiting to be scored, further batches are skipped
+SHADOW_MAX_PENDING = 8
+
+# in-memory prediction cache, max number of rows and seconds to keep them
+PREDICTION_CACHE_SIZE = 100000
+PREDICTION_CACHE_TTL = 24 * 60 * 60
+
+# compact dtypes to load the training and testing datasets with
+DATASET_DTYPES = {
+    feature: 'category' if feature in CATEGORICAL_VARS else 'float32'
+    for feature in FEATURES
+}
+DATASET_DTYPES[TARGET] = 'float64'
+
+# dtypes to read the features of large input files with
+FEATURE_DTYPES = {
+    feature: 'object' if feature in CATEGORICAL_VARS else 'float64'
+    for feature in FEATURES
+}
+
+# rows per chunk when scoring files
+SCORE_CHUNK_SIZE = 100000
+
+# hyperparameter tuning grid, folds and parallel jobs
+TUNING_ALPHAS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05]
+TUNING_RARE_LABEL_TOLS = [0.005, 0.01, 0.02, 0.05]
+TUNING_CV_FOLDS = 5
+TUNING_N_JOBS = -1
+
+# passes over the new rows when updating the online model
+ONLINE_MODEL_EPOCHS = 5
+
+# share of the make_prediction calls logged, and rows of the input digest
+PREDICTION_LOG_SAMPLE_RATE = 1.0
+PREDICTION_LOG_DIGEST_ROWS = 10000
+
+# share of the prediction calls timed step by step, 0 disables it
+PIPELINE_METRICS_SAMPLE_RATE = 0.0
+# histogram buckets of the step wall time, rows and output bytes
+PIPELINE_METRICS_TIME_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                                 0.1, 0.5, 1.0, 5.0]
+PIPELINE_METRICS_ROWS_BUCKETS = [1, 10, 100, 1000, 10000, 100000, 1000000]
+PIPELINE_METRICS_BYTES_BUCKETS = [2 ** 10, 2 ** 14, 2 ** 17, 2 ** 20,
+                                  2 ** 24, 2 ** 27, 2 ** 30]
 
 # used for differential testing
 ACCEPTABLE_MODEL_DIFFERENCE = 0.05
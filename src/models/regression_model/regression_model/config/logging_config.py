@@ -1,5 +1,10 @@
+import atexit
 import logging
+import os
+import queue
+import threading
 # from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener
 import sys
 
 # from regression_model.config import config
@@ -18,3 +23,66 @@ def get_console_handler():
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(FORMATTER)
     return console_handler
+
+
+class _Listener(QueueListener):
+
+    def enqueue_sentinel(self) -> None:
+        # waits for room, the records before it are still written
+        self.queue.put(self._sentinel)
+
+
+class AsyncHandler(QueueHandler):
+    """Hands records to a background thread writing them to handlers.
+
+    Records are formatted in the background thread, so logging costs
+    the caller a queue put only. When the queue is full records are
+    dropped and counted, logging never blocks the caller.
+    """
+
+    def __init__(self, *handlers: logging.Handler,
+                 max_size: int = 10000) -> None:
+        super().__init__(queue.Queue(max_size))
+        self.handlers = handlers
+        self.max_size = max_size
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush_queue)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            # threads do not survive a fork, start one per process
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_size)
+            self._listener = _Listener(
+                self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue stays in process, the record is formatted later
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush_queue(self) -> None:
+        """Write the queued records and stop the background thread."""
+
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+def get_async_handler():
+    return AsyncHandler(get_console_handler())
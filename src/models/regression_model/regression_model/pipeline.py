@@ -1,4 +1,5 @@
-from sklearn.linear_model import Lasso
+from sklearn.base import clone
+from sklearn.linear_model import Lasso, SGDRegressor
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import MinMaxScaler
 
@@ -22,12 +23,10 @@ price_pipe = Pipeline(
             pp.TemporalVariableEstimator(
                 variables=config.TEMPORAL_VARS,
                 reference_variable=config.DROP_FEATURES)),
-        ('rare_label_encoder',
-            pp.RareLabelCategoricalEncoder(
+        ('categorical_encoder',
+            pp.RareLabelOrdinalEncoder(
                 tol=0.01,
                 variables=config.CATEGORICAL_VARS)),
-        ('categorical_encoder',
-            pp.CategoricalEncoder(variables=config.CATEGORICAL_VARS)),
         ('log_transformer',
             features.LogTransformer(variables=config.NUMERICALS_LOG_VARS)),
         ('drop_features',
@@ -36,3 +35,14 @@ price_pipe = Pipeline(
         ('Linear_model', Lasso(alpha=0.005, random_state=0))
     ]
 )
+
+# same steps, with a linear model that can be updated with new rows
+online_price_pipe = Pipeline(
+    [
+        *[(name, clone(step)) for name, step in price_pipe.steps[:-1]],
+        ('Linear_model',
+            SGDRegressor(penalty='l1', alpha=0.005,
+                         learning_rate='adaptive', eta0=0.01,
+                         random_state=0))
+    ]
+)
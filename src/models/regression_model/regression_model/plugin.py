@@ -0,0 +1,70 @@
+"""Model plugin, serving the model next to other model packages.
+
+A plugin is an object with a name, a version, the JSON schema of one
+input record, and load, warmup and predict_batch methods, predict_batch
+returning the predictions and the model version that made them. Packages
+register theirs under the 'deployment_framework.models' entry point
+group, where the API discovers them.
+"""
+
+import pandas as pd
+
+from regression_model.config import config
+from regression_model.predict import make_cached_prediction, warmup
+from regression_model.processing.data_management import (
+    pipeline_registry, version_router)
+from regression_model.processing.errors import InvalidModelInputError
+from regression_model import __version__ as _version
+
+import typing as t
+
+
+class RegressionModelPlugin:
+
+    name = 'regression_model'
+    version = _version
+    input_schema = {
+        'type': 'object',
+        'required': list(config.FEATURES),
+        'properties': {
+            feature: {'type': ['string', 'null']
+                      if feature in config.CATEGORICAL_VARS
+                      else ['number', 'null']}
+            for feature in config.FEATURES
+        },
+    }
+
+    def load(self) -> None:
+        pipeline_registry.get(_version)
+
+    def warmup(self) -> None:
+        warmup()
+
+    def predict_batch(self, rows: t.List[dict]) -> dict:
+        """Predict records in one call, None for the invalid ones.
+
+        Returns:
+            One prediction per record and the model version routed to,
+            the package one or the candidate.
+        """
+
+        version = version_router.choose_version()
+        return {'predictions': self._predict_rows(rows, version),
+                'version': version}
+
+    def _predict_rows(self, rows: t.List[dict], version: str
+                      ) -> t.List[t.Optional[float]]:
+        try:
+            result = make_cached_prediction(input_data=pd.DataFrame(rows),
+                                            version=version)
+        except (InvalidModelInputError, ValueError, TypeError):
+            if len(rows) == 1:
+                return [None]
+            # a single unprocessable row fails the whole call, isolate it
+            return [self._predict_rows([row], version)[0] for row in rows]
+        predictions = iter(result.get('predictions'))
+        return [float(next(predictions)) if valid else None
+                for valid in result.get('valid_rows')]
+
+
+plugin = RegressionModelPlugin()
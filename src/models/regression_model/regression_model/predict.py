@@ -1,25 +1,154 @@
 import numpy as np
 import pandas as pd
 
-from regression_model.processing.data_management import load_pipeline
+from regression_model.processing.data_management import (
+    pipeline_registry, version_router)
 from regression_model.config import config
-from regression_model.processing.validation import validate_inputs
+from regression_model.processing.cache import PredictionCache
+from regression_model.processing.errors import InvalidModelInputError
+from regression_model.processing.frozen import FrozenPipeline
+from regression_model.processing.instrumentation import (
+    InstrumentedPipeline, pipeline_metrics)
+from regression_model.processing.validation import (
+    get_validation_mask, validate_inputs)
+from regression_model.processing.vectorized import (
+    ColumnarPipeline, get_columns)
 from regression_model import __version__ as _version
 
+import collections
+import functools
+import hashlib
 import logging
+import os
+import random
+import threading
+import time
 import typing as t
+from concurrent.futures import ThreadPoolExecutor, wait
 
 
 _logger = logging.getLogger(__name__)
 
-pipeline_file_name = f'{config.PIPELINE_SAVE_FILE}{_version}.pkl'
-_price_pipe = load_pipeline(file_name=pipeline_file_name)
+prediction_cache = PredictionCache()
+
+_log_random = random.Random()
+
+
+@functools.lru_cache(maxsize=config.PIPELINE_CACHE_SIZE)
+def _get_columnar_pipe(version: str) -> ColumnarPipeline:
+    return ColumnarPipeline(pipeline_registry.get(version))
+
+
+@functools.lru_cache(maxsize=config.PIPELINE_CACHE_SIZE)
+def _get_instrumented_pipe(version: str) -> InstrumentedPipeline:
+    return InstrumentedPipeline(pipeline_registry.get(version))
+
+
+@functools.lru_cache(maxsize=config.PIPELINE_CACHE_SIZE)
+def _get_frozen_pipe(version: str) -> FrozenPipeline:
+    return FrozenPipeline.from_pipeline(pipeline_registry.get(version),
+                                        version=version)
+
+
+class ShadowScorer:
+    """Scores the candidate version on current version batches.
+
+    Runs in a background thread, so the prediction calls do not wait
+    for it. Batches are skipped when max_pending are already waiting.
+    """
+
+    def __init__(self, *, max_pending: int = config.SHADOW_MAX_PENDING
+                 ) -> None:
+        self.max_pending = max_pending
+        self._executor = None
+        self._pid = None
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def submit(self, columns: t.Dict[str, np.ndarray], n_rows: int,
+               current: np.ndarray) -> None:
+        with self._lock:
+            # threads do not survive a fork, start one per process
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1)
+                self._pid = os.getpid()
+                self._futures = set()
+            if len(self._futures) >= self.max_pending:
+                version_router.record_skipped()
+                return
+            future = self._executor.submit(self._score, columns, n_rows,
+                                           current)
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _score(self, columns: t.Dict[str, np.ndarray], n_rows: int,
+               current: np.ndarray) -> None:
+        version = version_router.candidate_version
+        try:
+            candidate = _get_columnar_pipe(version).predict(columns, n_rows)
+            np.exp(candidate, out=candidate)
+        except Exception:
+            _logger.exception(
+                f'Shadow scoring failed with model version: {version}')
+            return
+        version_router.record_shadow(current, candidate)
+
+    def wait(self, timeout: t.Optional[float] = None) -> None:
+        """Wait for the pending shadow batches."""
+
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+
+shadow_scorer = ShadowScorer()
+
+
+def warmup() -> None:
+    """Load the model ahead of the first prediction.
+
+    The pipeline is otherwise loaded on first use. Call this once at
+    server startup, before forking workers, so they share it.
+    """
+
+    versions = [_version]
+    if version_router.candidate_version is not None:
+        versions.append(version_router.candidate_version)
+    for version in versions:
+        _get_columnar_pipe(version)
+    _get_instrumented_pipe(_version)
+    _get_frozen_pipe(_version)
+    pipeline_registry.warmup(versions=versions)
+
+
+def _log_sampled() -> bool:
+    rate = config.PREDICTION_LOG_SAMPLE_RATE
+    return rate >= 1 or _log_random.random() < rate
+
+
+def _input_digest(data: pd.DataFrame) -> str:
+    """Digest of the shape and the first rows of an input."""
+
+    digest = hashlib.blake2b(str(data.shape).encode(), digest_size=8)
+    head = data.iloc[:config.PREDICTION_LOG_DIGEST_ROWS]
+    digest.update(
+        pd.util.hash_pandas_object(head, index=False).values.tobytes())
+    return digest.hexdigest()
 
 
 def make_prediction(*, input_data: t.Union[pd.DataFrame, dict],
                     ) -> dict:
     """Make a prediction using a saved model pipeline.
 
+    Always scores with the model of the package version, the reference
+    the other entry points are checked against. Routing to a candidate
+    version and shadow scoring are done by the serving entry points,
+    ``make_batch_prediction`` and ``make_cached_prediction``.
+
     Args:
         input_data: Array of model prediction inputs.
 
@@ -27,18 +156,212 @@ def make_prediction(*, input_data: t.Union[pd.DataFrame, dict],
         Predictions for each input row, as well as the model version.
     """
 
+    start = time.perf_counter()
+    sampled = pipeline_metrics.sample()
     data = pd.DataFrame(input_data)
     validated_data = validate_inputs(input_data=data)
+    if sampled:
+        pipeline_metrics.observe(
+            'validate_inputs', seconds=time.perf_counter() - start,
+            rows_in=len(data), rows_out=len(validated_data),
+            output_bytes=int(validated_data.memory_usage(index=False).sum()))
 
-    prediction = _price_pipe.predict(validated_data[config.FEATURES])
+    # the one copy of the inputs, the pipeline steps transform it in place
+    features = validated_data.reindex(columns=config.FEATURES)
+    price_pipe = _get_instrumented_pipe(_version)
+    prediction = price_pipe.predict(features, sampled=sampled)
 
     output = np.exp(prediction)
 
     results = {'predictions': output, 'version': _version}
 
-    _logger.info(
-        f'Making predictions with model version: {_version} '
-        f'Inputs: {validated_data} '
-        f'Predictions: {results}')
+    if _logger.isEnabledFor(logging.INFO) and _log_sampled():
+        fields = {'model_version': _version, 'rows': len(output),
+                  'rows_rejected': len(data) - len(output),
+                  'input_digest': _input_digest(data),
+                  'latency_ms': (time.perf_counter() - start) * 1000}
+        _logger.info(
+            'Made predictions with model version: %(model_version)s '
+            'Rows predicted: %(rows)d Rows rejected: %(rows_rejected)d '
+            'Input digest: %(input_digest)s '
+            'Latency: %(latency_ms).1f ms', fields,
+            extra={'prediction': fields})
 
     return results
+
+
+def _measure_columnar(columnar_pipe, columns: t.Dict[str, np.ndarray],
+                      n_rows: int) -> np.ndarray:
+    """Score with the columnar scorer, timing its transform and model."""
+
+    start = time.perf_counter()
+    X = columnar_pipe.transform(columns, n_rows)
+    transformed = time.perf_counter()
+    pipeline_metrics.observe(
+        'columnar_transform', seconds=transformed - start,
+        rows_in=n_rows, rows_out=len(X), output_bytes=X.nbytes)
+    prediction = columnar_pipe.score(X)
+    pipeline_metrics.observe(
+        'Linear_model', seconds=time.perf_counter() - transformed,
+        rows_in=len(X), rows_out=len(prediction),
+        output_bytes=prediction.nbytes)
+    return prediction
+
+
+def _predict_chunk(chunk, version: str
+                   ) -> t.Tuple[np.ndarray, np.ndarray, dict]:
+    if isinstance(chunk, list):
+        chunk = pd.DataFrame(chunk)
+    columns, n_rows = get_columns(chunk)
+    sampled = pipeline_metrics.sample()
+    start = time.perf_counter()
+
+    mask, rejected = get_validation_mask(columns)
+    if not mask.all():
+        columns = {feature: values[mask]
+                   for feature, values in columns.items()}
+    if sampled:
+        pipeline_metrics.observe(
+            'validate_inputs', seconds=time.perf_counter() - start,
+            rows_in=n_rows, rows_out=int(mask.sum()),
+            output_bytes=sum(values.nbytes for values in columns.values()))
+    n_rows = int(mask.sum())
+
+    columnar_pipe = _get_columnar_pipe(version)
+    if sampled:
+        prediction = _measure_columnar(columnar_pipe, columns, n_rows)
+    else:
+        prediction = columnar_pipe.predict(columns, n_rows)
+    np.exp(prediction, out=prediction)
+    if version_router.shadows(version):
+        shadow_scorer.submit(columns, n_rows, prediction)
+    return prediction, mask, rejected
+
+
+def make_batch_prediction(*, input_data: t.Union[
+        pd.DataFrame, np.ndarray, dict, t.Iterable],
+        version: t.Optional[str] = None) -> dict:
+    """Make predictions for a large batch with the columnar scorer.
+
+    Gives the same predictions as ``make_prediction``, but the whole
+    transform chain runs over the raw input columns, so no intermediate
+    DataFrame is built.
+
+    Args:
+        input_data: A DataFrame, a NumPy structured array, a dict of
+            columns, or an iterator yielding any of these as chunks.
+        version: Model version to score with, chosen by the version
+            router by default.
+
+    Returns:
+        Predictions for each valid input row as a NumPy array, a
+        boolean mask of the input rows that were valid, the number of
+        rows rejected by each validation check, as well as the model
+        version.
+    """
+
+    version = version or version_router.choose_version()
+    if isinstance(input_data, (pd.DataFrame, np.ndarray, dict, list)):
+        output, valid_rows, rejected = _predict_chunk(input_data, version)
+    else:
+        chunks = [_predict_chunk(chunk, version) for chunk in input_data]
+        output = np.concatenate(
+            [chunk[0] for chunk in chunks] or [np.empty(0)])
+        valid_rows = np.concatenate(
+            [chunk[1] for chunk in chunks] or [np.empty(0, dtype=bool)])
+        rejected = collections.Counter()
+        for chunk in chunks:
+            rejected.update(chunk[2])
+        rejected = dict(rejected)
+
+    _logger.info(
+        'Making batch predictions with model version: %s '
+        'Rows predicted: %d Rows rejected: %s', version, len(output),
+        rejected)
+
+    return {'predictions': output, 'valid_rows': valid_rows,
+            'rejected_rows': rejected, 'version': version}
+
+
+def make_cached_prediction(*, input_data: t.Union[pd.DataFrame, dict],
+                           cache: t.Optional[PredictionCache] = None,
+                           version: t.Optional[str] = None) -> dict:
+    """Make predictions, only scoring the rows missing from a cache.
+
+    Rows are looked up by their feature values and the model version,
+    the cache misses are scored together with ``make_batch_prediction``.
+
+    Args:
+        input_data: Array of model prediction inputs.
+        cache: Prediction cache, the in-memory one of the module by
+            default.
+        version: Model version to score with, chosen by the version
+            router by default.
+
+    Returns:
+        Predictions for each valid input row as a NumPy array, a
+        boolean mask of the input rows that were valid, as well as the
+        model version.
+    """
+
+    cache = cache if cache is not None else prediction_cache
+    version = version or version_router.choose_version()
+    data = pd.DataFrame(input_data)
+    keys = cache.keys(data, version=version)
+    found = cache.get_many(keys)
+
+    # score each distinct missing row once
+    missing = {}
+    for position, key in enumerate(keys):
+        if key not in found and key not in missing:
+            missing[key] = position
+    if missing:
+        result = make_batch_prediction(
+            input_data=data.iloc[list(missing.values())], version=version)
+        scored = np.full(len(missing), np.nan)
+        scored[result.get('valid_rows')] = result.get('predictions')
+        # invalid rows are cached too, as NaN
+        new_entries = dict(zip(missing, scored.tolist()))
+        cache.set_many(new_entries)
+        found.update(new_entries)
+
+    output = np.array([found[key] for key in keys], dtype=np.float64)
+    valid_rows = ~np.isnan(output)
+
+    return {'predictions': output[valid_rows], 'valid_rows': valid_rows,
+            'version': version}
+
+
+def make_frozen_prediction(*, input_data: t.Union[dict, t.List[dict]],
+                           ) -> dict:
+    """Make predictions for single records with the frozen pipeline.
+
+    Meant for low latency scoring of one or a few records, skipping
+    pandas altogether. Records that can not be scored are dropped, as
+    in ``make_prediction``, but only the features with a non zero model
+    weight are validated.
+
+    Args:
+        input_data: One input record, or a list of them.
+
+    Returns:
+        Predictions for each valid input record, as well as the model
+        version.
+    """
+
+    if isinstance(input_data, dict):
+        input_data = [input_data]
+
+    frozen_pipe = _get_frozen_pipe(_version)
+    output = []
+    for record in input_data:
+        try:
+            output.append(frozen_pipe.predict_record(record))
+        except InvalidModelInputError:
+            continue
+
+    _logger.info(
+        'Making frozen predictions with model version: %s '
+        'Rows predicted: %d', _version, len(output))
+
+    return {'predictions': output, 'version': _version}
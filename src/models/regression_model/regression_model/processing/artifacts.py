@@ -0,0 +1,133 @@
+import json
+import pathlib
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Lasso, SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+
+from regression_model.processing import features
+from regression_model.processing import preprocessors as pp
+from regression_model.processing.errors import InvalidArtifactError
+
+
+MANIFEST_FILE = 'manifest.json'
+
+# the only classes an artifact can build, nothing else is imported
+STEP_TYPES = {
+    step_type.__name__: step_type
+    for step_type in (pp.CategoricalImputer, pp.NumericalImputer,
+                      pp.TemporalVariableEstimator,
+                      pp.RareLabelCategoricalEncoder, pp.CategoricalEncoder,
+                      pp.RareLabelOrdinalEncoder, pp.DropUnecessaryFeatures,
+                      features.LogTransformer, MinMaxScaler, Lasso,
+                      SGDRegressor)
+}
+
+
+def _encode(value, name: str, arrays: dict):
+    """Make a fitted value JSON serializable, numeric arrays aside."""
+
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'biuf':
+            file_name = f'{name}.npy'
+            arrays[file_name] = value
+            return {'__npy__': file_name}
+        return {'__array__': value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Series):
+        return {'__series__': {'index': value.index.tolist(),
+                               'values': value.values.tolist()}}
+    if isinstance(value, dict):
+        if value and all(isinstance(v, pd.CategoricalDtype)
+                         for v in value.values()):
+            return {'__categories__': {
+                k: v.categories.tolist() for k, v in value.items()}}
+        return {k: _encode(v, f'{name}.{k}', arrays)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, name, arrays) for v in value]
+    return value
+
+
+def _decode(value, directory: pathlib.Path):
+    if isinstance(value, dict):
+        if '__npy__' in value:
+            # a file name inside the artifact, never a path out of it
+            file_name = pathlib.Path(value['__npy__']).name
+            return np.load(str(directory / file_name), mmap_mode='r',
+                           allow_pickle=False)
+        if '__array__' in value:
+            return np.array(value['__array__'], dtype=object)
+        if '__series__' in value:
+            return pd.Series(value['__series__']['values'],
+                             index=value['__series__']['index'],
+                             dtype=np.float64)
+        if '__categories__' in value:
+            return {k: pd.CategoricalDtype(categories=v)
+                    for k, v in value['__categories__'].items()}
+        return {k: _decode(v, directory) for k, v in value.items()}
+    return value
+
+
+def save_artifact(pipeline: Pipeline, directory: pathlib.Path,
+                  version: str) -> None:
+    """Save a fitted pipeline as a JSON manifest and .npy arrays.
+
+    The manifest has the class, parameters and fitted state of every
+    step, the numeric arrays are saved next to it, to be memory mapped.
+    """
+
+    directory.mkdir(parents=True, exist_ok=True)
+    arrays = {}
+    steps = []
+    for name, step in pipeline.steps:
+        step_type = type(step).__name__
+        if step_type not in STEP_TYPES:
+            raise InvalidArtifactError(
+                f'Unsupported step type: {step_type}')
+        # fitted state is kept in public attributes ending with '_'
+        fitted = {attribute: value
+                  for attribute, value in vars(step).items()
+                  if attribute.endswith('_') and attribute[0] != '_'}
+        steps.append({
+            'name': name,
+            'type': step_type,
+            'params': _encode(step.get_params(deep=False), name, arrays),
+            'fitted': _encode(fitted, name, arrays),
+        })
+
+    for file_name, array in arrays.items():
+        np.save(str(directory / file_name), np.ascontiguousarray(array),
+                allow_pickle=False)
+    with open(directory / MANIFEST_FILE, 'w') as manifest_file:
+        json.dump({'version': version, 'steps': steps}, manifest_file)
+
+
+def load_artifact(directory: pathlib.Path) -> Pipeline:
+    """Build a fitted pipeline from a saved artifact.
+
+    Numeric arrays are memory mapped read only, so processes loading
+    the same artifact share their pages through the OS page cache.
+    """
+
+    with open(directory / MANIFEST_FILE) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    steps = []
+    for step in manifest['steps']:
+        if step['type'] not in STEP_TYPES:
+            raise InvalidArtifactError(
+                f"Unsupported step type: {step['type']}")
+        estimator = STEP_TYPES[step['type']](
+            **_decode(step['params'], directory))
+        for attribute, value in _decode(step['fitted'], directory).items():
+            setattr(estimator, attribute, value)
+        steps.append((step['name'], estimator))
+    return Pipeline(steps)
+
+
+def is_artifact(path: pathlib.Path) -> bool:
+    return (path / MANIFEST_FILE).is_file()
@@ -0,0 +1,188 @@
+import collections
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from regression_model.config import config
+
+import typing as t
+
+
+# marks missing categorical values, distinct from any label such as 'None'
+_NULL_LABEL = '\x00null'
+
+
+def _canonical_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """Normalize the feature values so that equal rows hash equally."""
+
+    canonical = {}
+    for feature in config.FEATURES:
+        values = data[feature]
+        if feature in config.CATEGORICAL_VARS:
+            labels = values.astype(object)
+            canonical[feature] = labels.where(
+                labels.isnull(), labels.astype(str)).fillna(_NULL_LABEL)
+        else:
+            numbers = pd.to_numeric(values).values.astype(np.float64)
+            # the same NaN and zero bit patterns whatever their origin
+            canonical[feature] = np.where(np.isnan(numbers), np.nan,
+                                          numbers + 0.0)
+    return pd.DataFrame(canonical, columns=config.FEATURES,
+                        index=data.index)
+
+
+def row_keys(data: pd.DataFrame, version: str) -> t.List[str]:
+    """Return a cache key per row, from its features and a model version.
+
+    Rows with the same feature values get the same key whatever the
+    dtypes they came with, e.g. 5, 5.0 and '5', or None and NaN.
+    """
+
+    canonical = _canonical_frame(data)
+    first = pd.util.hash_pandas_object(
+        canonical, index=False, hash_key='regression_model').values
+    second = pd.util.hash_pandas_object(
+        canonical, index=False, hash_key='price_prediction').values
+    return [f'{config.PIPELINE_NAME}:{version}:{a:016x}{b:016x}'
+            for a, b in zip(first, second)]
+
+
+class LRUCache:
+    """Bounded in-memory cache, least recently used entries go first."""
+
+    def __init__(self, *, max_size: int = config.PREDICTION_CACHE_SIZE,
+                 ttl: t.Optional[float] = config.PREDICTION_CACHE_TTL
+                 ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: t.Iterable[str]) -> dict:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires is not None and expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, data: dict) -> None:
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in data.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DjangoCache:
+    """Cache backed by a configured Django cache, shared between workers.
+
+    Django is only imported when the backend is created, it is not a
+    dependency of the package.
+    """
+
+    def __init__(self, *, alias: str = 'default',
+                 ttl: t.Optional[float] = config.PREDICTION_CACHE_TTL
+                 ) -> None:
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get_many(self, keys: t.Iterable[str]) -> dict:
+        return self.cache.get_many(list(keys))
+
+    def set_many(self, data: dict) -> None:
+        self.cache.set_many(data, timeout=self.ttl)
+
+    def clear(self) -> None:
+        # keys embed the model version, entries of other versions are
+        # never read again and expire with the cache timeout
+        pass
+
+
+class PredictionCache:
+    """Prediction cache keyed on canonicalized feature rows.
+
+    Keeps the hit rate. Versions served side by side share the cache,
+    every entry is dropped when more than max_versions are in use.
+    """
+
+    def __init__(self, backend=None,
+                 max_versions: int = config.PIPELINE_CACHE_SIZE) -> None:
+        self.backend = backend if backend is not None else LRUCache()
+        self.max_versions = max_versions
+        self.versions = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def keys(self, data: pd.DataFrame, version: str) -> t.List[str]:
+        """Return the keys of the rows, for a model version."""
+
+        with self._lock:
+            if version not in self.versions:
+                self.versions.append(version)
+            if len(self.versions) > self.max_versions:
+                self.backend.clear()
+                self.versions = [version]
+        return row_keys(data, version)
+
+    def get_many(self, keys: t.List[str]) -> dict:
+        found = self.backend.get_many(set(keys))
+        hits = sum(1 for key in keys if key in found)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def set_many(self, data: dict) -> None:
+        self.backend.set_many(data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'versions': list(self.versions)}
+
+    def to_prometheus(self) -> str:
+        """Render the hits, misses and hit rate in the Prometheus format."""
+
+        name = f'{config.PIPELINE_NAME}_prediction_cache'
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        lines = [
+            f'# HELP {name}_hits_total Rows found in the cache.',
+            f'# TYPE {name}_hits_total counter',
+            f'{name}_hits_total {hits}',
+            f'# HELP {name}_misses_total Rows missing from the cache.',
+            f'# TYPE {name}_misses_total counter',
+            f'{name}_misses_total {misses}',
+            f'# HELP {name}_hit_rate Share of the rows found in the cache.',
+            f'# TYPE {name}_hit_rate gauge',
+            f'{name}_hit_rate {hits / total if total else 0.0}',
+        ]
+        return '\n'.join(lines) + '\n'
@@ -1,8 +1,23 @@
+import collections
+import csv
+import gc
+import json
+import os
+import pathlib
+import random
+import shutil
+import threading
+import weakref
+
+import numpy as np
 import pandas as pd
 from sklearn.externals import joblib
 from sklearn.pipeline import Pipeline
 
 from regression_model.config import config
+from regression_model.processing.artifacts import (
+    is_artifact, load_artifact, save_artifact)
+from regression_model.processing.frozen import FrozenPipeline
 from regression_model import __version__ as _version
 
 import logging
@@ -11,10 +26,65 @@ import typing as t
 
 _logger = logging.getLogger(__name__)
 
+# Parquet metadata entry with the source of a cached dataset
+_DATASET_CACHE_KEY = b'regression_model.source'
+
+
+def _dataset_cache_key(csv_path: pathlib.Path, columns: t.List[str],
+                       dtypes: dict) -> str:
+    stat = csv_path.stat()
+    return json.dumps({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                       'columns': columns, 'dtypes': dtypes},
+                      sort_keys=True)
 
-def load_dataset(*, file_name: str
+
+def load_dataset(*, file_name: str,
+                 columns: t.Optional[t.List[str]] = None
                  ) -> pd.DataFrame:
-    _data = pd.read_csv(f'{config.DATASET_DIR}/{file_name}')
+    """Load a dataset with the dtypes in config.DATASET_DTYPES.
+
+    All the columns are read, unless columns are given. When pyarrow
+    is installed, the parsed columns are cached in a Parquet file next
+    to the CSV, used for as long as the CSV is not modified. The cache
+    is skipped where it can not be written, e.g. a read-only install.
+    """
+
+    csv_path = config.DATASET_DIR / file_name
+    if columns is None:
+        with open(csv_path, newline='') as csv_file:
+            columns = next(csv.reader(csv_file))
+    dtypes = {column: config.DATASET_DTYPES[column] for column in columns
+              if column in config.DATASET_DTYPES}
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+
+    cache_path = csv_path.with_suffix('.parquet')
+    cache_key = _dataset_cache_key(csv_path, columns, dtypes)
+    if pq is not None and cache_path.exists():
+        metadata = pq.read_schema(str(cache_path)).metadata or {}
+        if metadata.get(_DATASET_CACHE_KEY) == cache_key.encode():
+            return pq.read_table(str(cache_path)).to_pandas()
+
+    _data = pd.read_csv(csv_path, usecols=columns, dtype=dtypes)[columns]
+
+    if pq is not None:
+        table = pa.Table.from_pandas(_data, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **table.schema.metadata, _DATASET_CACHE_KEY: cache_key})
+        # written aside and moved, readers never see a partial file
+        temporary_path = cache_path.with_name(
+            f'.{cache_path.name}.{os.getpid()}')
+        try:
+            pq.write_table(table, str(temporary_path))
+            os.replace(str(temporary_path), str(cache_path))
+        except OSError as error:
+            _logger.warning(f'dataset cache not written: {error}')
+            if temporary_path.exists():
+                temporary_path.unlink()
     return _data
 
 
@@ -25,37 +95,289 @@ def save_pipeline(*, pipeline_to_persist) -> None:
     saved models. This ensures that when the package is
     published, there is only one trained model that can be
     called, and we know exactly how it was built.
+
+    A frozen scoring artifact of the same pipeline is saved
+    next to it, as well as a pickle free artifact, loaded by default.
     """
 
     # Prepare versioned save file name
     save_file_name = f'{config.PIPELINE_SAVE_FILE}{_version}.pkl'
     save_path = config.TRAINED_MODEL_DIR / save_file_name
+    frozen_file_name = f'{config.FROZEN_PIPELINE_SAVE_FILE}{_version}.json'
+    artifact_dir_name = f'{config.ARTIFACT_SAVE_DIR}{_version}'
 
-    remove_old_pipelines(files_to_keep=[save_file_name])
+    remove_old_pipelines(files_to_keep=[save_file_name, frozen_file_name,
+                                        artifact_dir_name])
     joblib.dump(pipeline_to_persist, save_path)
     _logger.info(f'saved pipeline: {save_file_name}')
 
+    save_artifact(pipeline_to_persist,
+                  config.TRAINED_MODEL_DIR / artifact_dir_name,
+                  version=_version)
+    _logger.info(f'saved pipeline artifact: {artifact_dir_name}')
+
+    save_frozen_pipeline(pipeline_to_persist=pipeline_to_persist,
+                         file_name=frozen_file_name)
+
+
+def save_frozen_pipeline(*, pipeline_to_persist, file_name: str) -> None:
+    """Persist the frozen scoring function of a fitted pipeline."""
+
+    frozen = FrozenPipeline.from_pipeline(pipeline_to_persist,
+                                          version=_version)
+    save_path = config.TRAINED_MODEL_DIR / file_name
+    with open(save_path, 'w') as frozen_file:
+        json.dump(frozen.to_dict(), frozen_file)
+    _logger.info(f'saved frozen pipeline: {file_name}')
+
 
 def load_pipeline(*, file_name: str
                   ) -> Pipeline:
-    """Load a persisted pipeline."""
+    """Load a persisted pipeline.
+
+    Either a pickle or an artifact directory, whose arrays are memory
+    mapped instead of unpickled.
+    """
 
     file_path = config.TRAINED_MODEL_DIR / file_name
+    if is_artifact(file_path):
+        return load_artifact(file_path)
     trained_model = joblib.load(filename=file_path)
     return trained_model
 
 
-def remove_old_pipelines(*, files_to_keep: t.List[str]) -> None:
+def load_frozen_pipeline(*, file_name: str
+                         ) -> FrozenPipeline:
+    """Load a persisted frozen pipeline."""
+
+    file_path = config.TRAINED_MODEL_DIR / file_name
+    with open(file_path) as frozen_file:
+        return FrozenPipeline.from_dict(json.load(frozen_file))
+
+
+def disable_copies(pipeline: Pipeline) -> Pipeline:
+    """Let every step that can, transform its input in place.
+
+    Only for serving, where the input of the pipeline is a buffer owned
+    by the prediction call.
+    """
+
+    for _, step in pipeline.steps:
+        if hasattr(step, 'copy'):
+            step.copy = False
+    return pipeline
+
+
+class PipelineRegistry:
+    """Lazily loaded, in-process LRU of pipelines keyed by version.
+
+    Nothing is unpickled until a version is first requested. The
+    pipelines are loaded for serving, their steps transform the input
+    in place. To share one loaded pipeline between the workers of a
+    pre-fork server (gunicorn ``--preload``, uWSGI without
+    ``lazy-apps``), call ``warmup`` in the master process before it
+    forks: the loaded objects are then moved out of the garbage
+    collector's reach, so the workers keep reading the master's memory
+    pages instead of copying them on write.
+    """
+
+    def __init__(self, *, max_size: int = config.PIPELINE_CACHE_SIZE
+                 ) -> None:
+        self.max_size = max_size
+        self._pipelines = collections.OrderedDict()
+        self._lock = threading.RLock()
+        _registries.add(self)
+
+    def _after_fork(self) -> None:
+        # the lock may have been held by another thread of the parent
+        self._lock = threading.RLock()
+
+    def get(self, version: str = _version) -> Pipeline:
+        """Return the pipeline for a version, loading it on first use."""
+
+        with self._lock:
+            if version in self._pipelines:
+                self._pipelines.move_to_end(version)
+                return self._pipelines[version]
+
+            file_name = f'{config.ARTIFACT_SAVE_DIR}{version}'
+            if not is_artifact(config.TRAINED_MODEL_DIR / file_name):
+                file_name = f'{config.PIPELINE_SAVE_FILE}{version}.pkl'
+            pipeline = disable_copies(load_pipeline(file_name=file_name))
+            _logger.info(f'loaded pipeline: {file_name}')
+
+            self._pipelines[version] = pipeline
+            while len(self._pipelines) > self.max_size:
+                self._pipelines.popitem(last=False)
+            return pipeline
+
+    def warmup(self, versions: t.Optional[t.List[str]] = None) -> None:
+        """Load pipelines ahead of the first prediction.
+
+        Meant to be called once at server startup, before forking
+        the workers.
+        """
+
+        for version in versions or [_version]:
+            self.get(version)
+
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+    def loaded_versions(self) -> t.List[str]:
+        with self._lock:
+            return list(self._pipelines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pipelines.clear()
+
+
+# live registries, their locks are reset in forked children by one
+# callback registered for the whole process
+_registries = weakref.WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    for registry in list(_registries):
+        registry._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+pipeline_registry = PipelineRegistry()
+
+
+class VersionRouter:
+    """Route predictions between the current version and a candidate.
+
+    A share of the prediction calls is scored with the candidate
+    version. In shadow mode the candidate also scores the batches of
+    the current version, off the request path, and the differences
+    between both are recorded against ACCEPTABLE_MODEL_DIFFERENCE.
+    """
+
+    def __init__(self, *, current_version: str = _version,
+                 candidate_version: t.Optional[str] = (
+                     config.CANDIDATE_MODEL_VERSION),
+                 candidate_share: float = config.CANDIDATE_TRAFFIC_SHARE,
+                 shadow: bool = config.SHADOW_SCORING) -> None:
+        self.current_version = current_version
+        self.candidate_version = candidate_version
+        self.candidate_share = candidate_share
+        self.shadow = shadow
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def choose_version(self) -> str:
+        """Version to score the next prediction call with."""
+
+        if self.candidate_version is None:
+            return self.current_version
+        if self._random.random() < self.candidate_share:
+            return self.candidate_version
+        return self.current_version
+
+    def shadows(self, version: str) -> bool:
+        """Whether calls scored with a version are shadowed."""
+
+        if not self.shadow or self.candidate_version is None:
+            return False
+        return version == self.current_version
+
+    def record_shadow(self, current: np.ndarray,
+                      candidate: np.ndarray) -> None:
+        """Record the differences of the candidate predictions."""
+
+        difference = np.abs(candidate - current) / np.abs(current)
+        over = int((difference > config.ACCEPTABLE_MODEL_DIFFERENCE).sum())
+        with self._lock:
+            self._stats['rows'] += len(difference)
+            self._stats['rows_over_threshold'] += over
+            self._stats['total_difference'] += float(difference.sum())
+            if len(difference):
+                self._stats['max_difference'] = max(
+                    self._stats['max_difference'], float(difference.max()))
+        if over:
+            _logger.warning(
+                f'Candidate model version: {self.candidate_version} '
+                f'differs by more than {config.ACCEPTABLE_MODEL_DIFFERENCE} '
+                f'on {over} of {len(difference)} rows')
+
+    def record_skipped(self) -> None:
+        with self._lock:
+            self._stats['batches_skipped'] += 1
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {'rows': 0, 'rows_over_threshold': 0,
+                           'total_difference': 0.0, 'max_difference': 0.0,
+                           'batches_skipped': 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats.pop('total_difference')
+        stats['mean_difference'] = total / max(stats['rows'], 1)
+        stats['candidate_version'] = self.candidate_version
+        return stats
+
+
+version_router = VersionRouter()
+
+
+def _saved_version(file_name: str) -> t.Optional[str]:
+    """Return the model version of a file in TRAINED_MODEL_DIR, if any."""
+
+    for prefix, suffix in ((config.PIPELINE_SAVE_FILE, '.pkl'),
+                           (config.FROZEN_PIPELINE_SAVE_FILE, '.json'),
+                           (config.ARTIFACT_SAVE_DIR, '')):
+        if file_name.startswith(prefix) and file_name.endswith(suffix):
+            return file_name[len(prefix):len(file_name) - len(suffix)]
+    return None
+
+
+def saved_versions() -> t.List[str]:
+    """Versions of the saved pipelines, the most recently saved first."""
+
+    saved = {}
+    for model_file in config.TRAINED_MODEL_DIR.iterdir():
+        version = _saved_version(model_file.name)
+        if version is not None:
+            saved[version] = max(saved.get(version, 0),
+                                 model_file.stat().st_mtime)
+    return sorted(saved, key=saved.get, reverse=True)
+
+
+def remove_old_pipelines(*, files_to_keep: t.List[str],
+                         versions_to_keep: int = (
+                             config.PIPELINE_VERSIONS_TO_KEEP)) -> None:
     """
     Remove old model pipelines.
 
     This is to ensure there is a simple one-to-one
     mapping between the package version and the model
     version to be imported and used by other applications.
-    However, we do also include the immediate previous
-    pipeline version for differential testing purposes.
+    However, we do also keep the previous pipeline versions,
+    up to versions_to_keep including the new one, for
+    differential testing and side by side serving.
     """
+    kept_versions = {_saved_version(name) for name in files_to_keep}
+    kept_versions.discard(None)
+    for version in saved_versions():
+        if len(kept_versions) >= versions_to_keep:
+            break
+        kept_versions.add(version)
+
     do_not_delete = files_to_keep + ['__init__.py']
     for model_file in config.TRAINED_MODEL_DIR.iterdir():
-        if model_file.name not in do_not_delete:
+        if model_file.name in do_not_delete:
+            continue
+        if _saved_version(model_file.name) in kept_versions:
+            continue
+        if model_file.is_dir():
+            shutil.rmtree(model_file)
+        else:
             model_file.unlink()
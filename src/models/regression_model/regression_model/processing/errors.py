@@ -4,3 +4,7 @@ class BaseError(Exception):
 
 class InvalidModelInputError(BaseError):
     """Model input contains an error."""
+
+
+class InvalidArtifactError(BaseError):
+    """Saved model artifact can not be loaded."""
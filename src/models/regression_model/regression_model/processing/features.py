@@ -7,27 +7,35 @@ from regression_model.processing.errors import InvalidModelInputError
 class LogTransformer(BaseEstimator, TransformerMixin):
     """Logarithm transformer."""
 
-    def __init__(self, variables=None):
+    # pipelines pickled before the copy argument existed copy their input
+    copy = True
+
+    def __init__(self, variables=None, copy=True):
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
+        self.copy = copy
 
     def fit(self, X, y=None):
         # to accomodate the pipeline
         return self
 
     def transform(self, X):
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
 
         # check that the values are non-negative for log transform
-        if not (X[self.variables] > 0).all().all():
-            vars_ = self.variables[(X[self.variables] <= 0).any()]
+        vars_ = [feature for feature in self.variables
+                 if not (X[feature].values > 0).all()]
+        if vars_:
             raise InvalidModelInputError(
                 f"Variables contain zero or negative values, "
                 f"can't apply log for vars: {vars_}")
 
         for feature in self.variables:
-            X[feature] = np.log(X[feature])
+            # in double precision, whatever the dtype of the input
+            values = X[feature].values.astype(np.float64, copy=False)
+            X[feature] = np.log(values)
 
         return X
@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from regression_model.config import config
+from regression_model.processing.errors import InvalidModelInputError
+from regression_model.processing.vectorized import ColumnarPipeline
+
+import typing as t
+
+
+def _is_null(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _optional_float(value) -> t.Optional[float]:
+    if value is None:
+        return None
+    return float(value)
+
+
+def _to_contribution(value: float, weight: float) -> t.Optional[float]:
+    if np.isnan(value):
+        return None
+    return float(value * weight)
+
+
+class FrozenPipeline:
+    """Precomputed scoring function for a fitted price pipeline.
+
+    The MinMax scale and offset are folded into the Lasso coefficients,
+    each categorical encoder becomes a lookup table of its contribution
+    to the score, and features with a zero Lasso weight are dropped, so
+    they are neither parsed nor validated when scoring.
+    """
+
+    def __init__(self, *, intercept: float, numerical: dict,
+                 categorical: dict, version: str) -> None:
+        self.intercept = intercept
+        self.numerical = numerical
+        self.categorical = categorical
+        self.version = version
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline,
+                      version: str) -> 'FrozenPipeline':
+        """Freeze a fitted price pipeline."""
+
+        columnar = ColumnarPipeline(pipeline)
+        weights = columnar.coef * columnar.scale
+        intercept = columnar.intercept + float(
+            np.dot(columnar.coef, columnar.offset))
+
+        numerical = {}
+        categorical = {}
+        for feature, weight in zip(columnar.features, weights):
+            if weight == 0:
+                continue
+
+            if feature in columnar.lookups:
+                labels, codes, unknown, missing = columnar.lookups[feature]
+                if feature in config.CATEGORICAL_NA_NOT_ALLOWED:
+                    missing = np.nan
+                categorical[feature] = {
+                    'contributions': {
+                        label: _to_contribution(code, weight)
+                        for label, code in zip(labels, codes)},
+                    'unknown': _to_contribution(unknown, weight),
+                    'missing': _to_contribution(missing, weight),
+                }
+            else:
+                numerical[feature] = {
+                    'weight': float(weight),
+                    'fill': _optional_float(
+                        columnar.fill_values.get(feature)),
+                    'reference': columnar.temporal_vars.get(feature),
+                    'log': feature in columnar.log_vars,
+                }
+
+        return cls(intercept=intercept, numerical=numerical,
+                   categorical=categorical, version=version)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'FrozenPipeline':
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {'intercept': self.intercept,
+                'numerical': self.numerical,
+                'categorical': self.categorical,
+                'version': self.version}
+
+    def _parse_number(self, record: t.Mapping, feature: str,
+                      fill: t.Optional[float] = None) -> float:
+        value = record[feature]
+        if _is_null(value):
+            if fill is None:
+                raise InvalidModelInputError(
+                    f'Missing value for variable: {feature}')
+            return fill
+        return float(value)
+
+    def predict_record(self, record: t.Mapping) -> float:
+        """Score one input record, returns the predicted price."""
+
+        score = self.intercept
+
+        for feature, step in self.numerical.items():
+            value = self._parse_number(record, feature, step['fill'])
+            if step['reference'] is not None:
+                value = self._parse_number(
+                    record, step['reference']) - value
+            if step['log']:
+                if value <= 0:
+                    raise InvalidModelInputError(
+                        f"Variables contain zero or negative values, "
+                        f"can't apply log for vars: {feature}")
+                value = math.log(value)
+            score += step['weight'] * value
+
+        for feature, step in self.categorical.items():
+            label = record[feature]
+            if _is_null(label):
+                contribution = step['missing']
+            else:
+                contribution = step['contributions'].get(
+                    label, step['unknown'])
+            if contribution is None:
+                raise InvalidModelInputError(
+                    f'Categorical encoder can not encode '
+                    f'{label} for variable: {feature}')
+            score += contribution
+
+        return math.exp(score)
+
+    def predict(self, records: t.Iterable[t.Mapping]) -> t.List[float]:
+        """Score a sequence of input records."""
+
+        return [self.predict_record(record) for record in records]
@@ -0,0 +1,193 @@
+import bisect
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from regression_model.config import config
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, as in Prometheus."""
+
+    def __init__(self, buckets: t.List[float]) -> None:
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding a quantile."""
+
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+def _nbytes(X) -> int:
+    if isinstance(X, pd.DataFrame):
+        return int(X.memory_usage(index=False, deep=False).sum())
+    return int(np.asarray(X).nbytes)
+
+
+class PipelineMetrics:
+    """Wall time, rows in and out and output bytes of every step.
+
+    Only a sample of the calls is measured, with a sample rate of zero
+    nothing is measured and the overhead is a single comparison.
+    """
+
+    METRICS = {
+        'seconds': ('Wall time of each step',
+                    config.PIPELINE_METRICS_TIME_BUCKETS),
+        'rows_in': ('Rows in the input of each step',
+                    config.PIPELINE_METRICS_ROWS_BUCKETS),
+        'rows_out': ('Rows in the output of each step',
+                     config.PIPELINE_METRICS_ROWS_BUCKETS),
+        'output_bytes': ('Bytes of the output of each step',
+                         config.PIPELINE_METRICS_BYTES_BUCKETS),
+    }
+
+    def __init__(self, *, sample_rate: float = (
+            config.PIPELINE_METRICS_SAMPLE_RATE)) -> None:
+        self.sample_rate = sample_rate
+        self._histograms = {}
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def sample(self) -> bool:
+        """Whether to measure the next call."""
+
+        if self.sample_rate <= 0:
+            return False
+        return self._random.random() < self.sample_rate
+
+    def observe(self, step: str, *, seconds: float, rows_in: int,
+                rows_out: int, output_bytes: int) -> None:
+        values = {'seconds': seconds, 'rows_in': rows_in,
+                  'rows_out': rows_out, 'output_bytes': output_bytes}
+        with self._lock:
+            for metric, value in values.items():
+                key = (metric, step)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(
+                        self.METRICS[metric][1])
+                self._histograms[key].observe(value)
+
+    def summary(self) -> dict:
+        """Count, mean and p50/p99 bucket of every metric by step."""
+
+        summary = {}
+        with self._lock:
+            for (metric, step), histogram in self._histograms.items():
+                summary.setdefault(step, {})[metric] = {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                }
+        return summary
+
+    def log_summary(self) -> None:
+        for step, metrics in self.summary().items():
+            seconds = metrics['seconds']
+            _logger.info(
+                f"Step: {step} calls: {seconds['count']} "
+                f"mean: {seconds['mean'] * 1000:.3f} ms "
+                f"p99 below: {seconds['p99'] * 1000:.3f} ms "
+                f"mean rows in: {metrics['rows_in']['mean']:.0f}")
+
+    def to_prometheus(self) -> str:
+        """Render the histograms in the Prometheus text format."""
+
+        lines = []
+        with self._lock:
+            for metric, (description, _) in self.METRICS.items():
+                name = f'{config.PIPELINE_NAME}_step_{metric}'
+                lines.append(f'# HELP {name} {description}.')
+                lines.append(f'# TYPE {name} histogram')
+                for (key, step), histogram in sorted(
+                        self._histograms.items()):
+                    if key != metric:
+                        continue
+                    cumulative = 0
+                    bounds = histogram.buckets + [float('inf')]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append(f'{name}_bucket{{step="{step}",'
+                                     f'le="{le}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{step="{step}"}} '
+                                 f'{histogram.sum}')
+                    lines.append(f'{name}_count{{step="{step}"}} '
+                                 f'{histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+class InstrumentedPipeline:
+    """Fitted pipeline measuring every step of a sample of the calls.
+
+    Anything but predict is read from the wrapped pipeline.
+    """
+
+    def __init__(self, pipeline: Pipeline,
+                 metrics: PipelineMetrics = pipeline_metrics) -> None:
+        self.pipeline = pipeline
+        self.metrics = metrics
+
+    def __getattr__(self, name: str):
+        return getattr(self.pipeline, name)
+
+    def predict(self, X, sampled: t.Optional[bool] = None) -> np.ndarray:
+        """Predict, measuring the steps if the call is sampled.
+
+        Args:
+            X: Pipeline input.
+            sampled: Measure this call, sampled by the metrics when
+                not given.
+        """
+
+        if sampled is None:
+            sampled = self.metrics.sample()
+        if not sampled:
+            return self.pipeline.predict(X)
+
+        *transformers, (model_name, model) = self.pipeline.steps
+        for name, step in transformers:
+            X = self._measure(name, step.transform, X)
+        return self._measure(model_name, model.predict, X)
+
+    def _measure(self, name: str, function: t.Callable, X):
+        start = time.perf_counter()
+        output = function(X)
+        self.metrics.observe(name, seconds=time.perf_counter() - start,
+                             rows_in=len(X), rows_out=len(output),
+                             output_bytes=_nbytes(output))
+        return output
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_categorical_dtype
 from sklearn.base import BaseEstimator, TransformerMixin
 
 from regression_model.processing.errors import InvalidModelInputError
@@ -8,11 +9,15 @@ from regression_model.processing.errors import InvalidModelInputError
 class CategoricalImputer(BaseEstimator, TransformerMixin):
     """Categorical data missing value imputer."""
 
-    def __init__(self, variables=None) -> None:
+    # pipelines pickled before the copy argument existed copy their input
+    copy = True
+
+    def __init__(self, variables=None, copy=True) -> None:
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
+        self.copy = copy
 
     def fit(self, X: pd.DataFrame, y: pd.Series = None
             ) -> 'CategoricalImputer':
@@ -23,9 +28,14 @@ class CategoricalImputer(BaseEstimator, TransformerMixin):
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
         """Apply the transforms to the dataframe."""
 
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
         for feature in self.variables:
-            X[feature] = X[feature].fillna('Missing')
+            column = X[feature]
+            if is_categorical_dtype(column):
+                if 'Missing' not in column.cat.categories:
+                    column = column.cat.add_categories('Missing')
+            X[feature] = column.fillna('Missing')
 
         return X
 
@@ -33,45 +43,72 @@ class CategoricalImputer(BaseEstimator, TransformerMixin):
 class NumericalImputer(BaseEstimator, TransformerMixin):
     """Numerical missing value imputer."""
 
-    def __init__(self, variables=None):
+    copy = True
+
+    def __init__(self, variables=None, copy=True):
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
+        self.copy = copy
 
     def fit(self, X, y=None):
+        # persist the value counts, to update them with new rows
+        self.value_counts_ = {feature: pd.Series(dtype=np.float64)
+                              for feature in self.variables}
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        if not hasattr(self, 'value_counts_'):
+            return self.fit(X, y)
+
         # persist mode in a dictionary
         self.imputer_dict_ = {}
         for feature in self.variables:
-            self.imputer_dict_[feature] = X[feature].mode()[0]
+            counts = self.value_counts_[feature].add(
+                X[feature].value_counts(), fill_value=0)
+            self.value_counts_[feature] = counts
+            # the smallest of the most frequent values, as Series.mode
+            self.imputer_dict_[feature] = counts.index[
+                counts.values == counts.values.max()].min()
         return self
 
     def transform(self, X):
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
         for feature in self.variables:
-            X[feature].fillna(self.imputer_dict_[feature], inplace=True)
+            values = X[feature].values
+            X[feature] = np.where(pd.isnull(values),
+                                  self.imputer_dict_[feature], values)
         return X
 
 
 class TemporalVariableEstimator(BaseEstimator, TransformerMixin):
     """Temporal variable calculator."""
 
-    def __init__(self, variables=None, reference_variable=None):
+    copy = True
+
+    def __init__(self, variables=None, reference_variable=None, copy=True):
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
 
+        # get_params reads the init arguments by name
+        self.reference_variable = reference_variable
         self.reference_variables = reference_variable
+        self.copy = copy
 
     def fit(self, X, y=None):
         # we need this step to fit the sklearn pipeline
         return self
 
     def transform(self, X):
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
+        reference = X[self.reference_variables].values
         for feature in self.variables:
-            X[feature] = X[self.reference_variables] - X[feature]
+            X[feature] = reference - X[feature].values
 
         return X
 
@@ -79,12 +116,15 @@ class TemporalVariableEstimator(BaseEstimator, TransformerMixin):
 class RareLabelCategoricalEncoder(BaseEstimator, TransformerMixin):
     """Rare label categorical encoder"""
 
-    def __init__(self, tol=0.05, variables=None):
+    copy = True
+
+    def __init__(self, tol=0.05, variables=None, copy=True):
         self.tol = tol
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
+        self.copy = copy
 
     def fit(self, X, y=None):
         # persist frequent labels in dictionary
@@ -99,10 +139,13 @@ class RareLabelCategoricalEncoder(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
         for feature in self.variables:
-            X[feature] = np.where(X[feature].isin(
-                self.encoder_dict_[feature]), X[feature], 'Rare')
+            values = X[feature].values
+            frequent = pd.Index(self.encoder_dict_[feature])
+            X[feature] = np.where(frequent.get_indexer(values) >= 0,
+                                  values, 'Rare')
 
         return X
 
@@ -110,11 +153,14 @@ class RareLabelCategoricalEncoder(BaseEstimator, TransformerMixin):
 class CategoricalEncoder(BaseEstimator, TransformerMixin):
     """String to numbers categorical encoder."""
 
-    def __init__(self, variables=None):
+    copy = True
+
+    def __init__(self, variables=None, copy=True):
         if not isinstance(variables, list):
             self.variables = [variables]
         else:
             self.variables = variables
+        self.copy = copy
 
     def fit(self, X, y):
         temp = pd.concat([X, y], axis=1)
@@ -132,33 +178,156 @@ class CategoricalEncoder(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         # encode labels
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
+        vars_ = []
         for feature in self.variables:
-            X[feature] = X[feature].map(self.encoder_dict_[feature])
+            encodings = self.encoder_dict_[feature]
+            positions = pd.Index(list(encodings.keys())).get_indexer(
+                X[feature].values)
+            # check if transformer introduces NaN
+            if (positions < 0).any():
+                vars_.append(feature)
+                continue
+            codes = np.array(list(encodings.values()))
+            X[feature] = codes[positions]
+
+        if vars_:
+            raise InvalidModelInputError(
+                f'Categorical encoder has introduced NaN when '
+                f'transforming categorical variables: {vars_}')
 
-        # check if transformer introduces NaN
-        if X[self.variables].isnull().any().any():
-            null_counts = X[self.variables].isnull().any()
-            vars_ = {key: value for (key, value) in null_counts.items()
-                     if value is True}
+        return X
+
+
+class RareLabelOrdinalEncoder(BaseEstimator, TransformerMixin):
+    """Rare label and string to numbers categorical encoder in one step.
+
+    Gives the same codes as RareLabelCategoricalEncoder followed by
+    CategoricalEncoder. The labels of every variable are kept in a
+    CategoricalDtype ordered by their code, with 'Rare' and 'Missing'
+    as labels like any other, so encoding a column is one hash table
+    lookup giving int8 codes, for up to 127 labels.
+    """
+
+    copy = True
+
+    def __init__(self, tol=0.05, variables=None, copy=True):
+        self.tol = tol
+        if not isinstance(variables, list):
+            self.variables = [variables]
+        else:
+            self.variables = variables
+        self.copy = copy
+
+    def fit(self, X, y):
+        # persist the label counts and target sums, to update them with
+        # new rows, missing labels apart
+        self.n_samples_seen_ = 0
+        self.encoder_dict_ = {}
+        self.label_counts_ = {}
+        self.target_sums_ = {}
+        self.missing_counts_ = {}
+        self.missing_sums_ = {}
+        for var in self.variables:
+            self.label_counts_[var] = pd.Series(dtype=np.float64)
+            self.target_sums_[var] = pd.Series(dtype=np.float64)
+            self.missing_counts_[var] = 0
+            self.missing_sums_[var] = 0.0
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        if not hasattr(self, 'n_samples_seen_'):
+            return self.fit(X, y)
+
+        target = np.asarray(y, dtype=np.float64)
+        self.n_samples_seen_ += len(X)
+        for var in self.variables:
+            values = np.asarray(X[var].values, dtype=object)
+            nulls = pd.isnull(values)
+            self.missing_counts_[var] += int(nulls.sum())
+            self.missing_sums_[var] += float(target[nulls].sum())
+
+            groups = pd.Series(target[~nulls]).groupby(values[~nulls])
+            self.label_counts_[var] = self.label_counts_[var].add(
+                groups.count(), fill_value=0)
+            self.target_sums_[var] = self.target_sums_[var].add(
+                groups.sum(), fill_value=0)
+
+        self._set_encodings()
+        return self
+
+    def _set_encodings(self):
+        # persist the codes and the label types, the codes given by
+        # the first fit are kept by partial_fit, labels grouped anew
+        # get the next codes, so a model fitted on them stays valid
+        self.categories_ = {}
+
+        for var in self.variables:
+            counts = self.label_counts_[var]
+            # frequent labels, the other ones are grouped as 'Rare'
+            t = counts / np.float(self.n_samples_seen_)
+            labels = np.where(t.values >= self.tol, t.index, 'Rare')
+            group_counts = counts.groupby(labels).sum()
+            sums = self.target_sums_[var].reindex(counts.index)
+            group_sums = sums.groupby(labels).sum()
+            if self.missing_counts_[var]:
+                group_counts = group_counts.add(pd.Series(
+                    {'Rare': self.missing_counts_[var]}), fill_value=0)
+                group_sums = group_sums.add(pd.Series(
+                    {'Rare': self.missing_sums_[var]}), fill_value=0)
+
+            t = (group_sums / group_counts).sort_values(
+                ascending=True).index
+            encodings = self.encoder_dict_.setdefault(var, {})
+            for label in t:
+                if label not in encodings:
+                    encodings[label] = len(encodings)
+            self.categories_[var] = pd.CategoricalDtype(
+                categories=list(encodings))
+
+    def transform(self, X):
+        if self.copy:
+            X = X.copy()
+        vars_ = []
+        for feature in self.variables:
+            # labels outside the categories get the code -1
+            codes = pd.Categorical(
+                X[feature].values, dtype=self.categories_[feature]).codes
+            unknown = codes < 0
+            if unknown.any():
+                if 'Rare' not in self.encoder_dict_[feature]:
+                    vars_.append(feature)
+                    continue
+                codes = codes.copy()
+                codes[unknown] = self.encoder_dict_[feature]['Rare']
+            X[feature] = codes
+
+        if vars_:
             raise InvalidModelInputError(
                 f'Categorical encoder has introduced NaN when '
-                f'transforming categorical variables: {vars_.keys()}')
+                f'transforming categorical variables: {vars_}')
 
         return X
 
 
 class DropUnecessaryFeatures(BaseEstimator, TransformerMixin):
 
-    def __init__(self, variables_to_drop=None):
+    copy = True
+
+    def __init__(self, variables_to_drop=None, copy=True):
+        # get_params reads the init arguments by name
+        self.variables_to_drop = variables_to_drop
         self.variables = variables_to_drop
+        self.copy = copy
 
     def fit(self, X, y=None):
         return self
 
     def transform(self, X):
-        # encode labels
-        X = X.copy()
-        X = X.drop(self.variables, axis=1)
+        # drop returns a new dataframe unless it is done in place
+        if self.copy:
+            return X.drop(self.variables, axis=1)
+        X.drop(self.variables, axis=1, inplace=True)
 
         return X
@@ -1,28 +1,65 @@
+import numpy as np
+import pandas as pd
+
 from regression_model.config import config
 
-import pandas as pd
+import typing as t
 
 
-def validate_inputs(input_data: pd.DataFrame) -> pd.DataFrame:
-    """Check model inputs for unprocessable values."""
+def _column(input_data: t.Mapping, feature: str) -> np.ndarray:
+    values = input_data[feature]
+    if isinstance(values, pd.Series):
+        return values.values
+    return np.asarray(values)
+
+
+def get_validation_mask(input_data: t.Mapping
+                        ) -> t.Tuple[np.ndarray, t.Dict[str, int]]:
+    """Find the processable rows in a single pass over the checked columns.
 
-    validated_data = input_data.copy()
+    Args:
+        input_data: A DataFrame, or a mapping of column names to arrays.
 
-    # check for numerical variables with NA not seen during training
-    if input_data[config.NUMERICAL_NA_NOT_ALLOWED].isnull().any().any():
-        validated_data = validated_data.dropna(
-            axis=0, subset=config.NUMERICAL_NA_NOT_ALLOWED)
+    Returns:
+        A boolean mask of the rows that pass every check, and the number
+        of rows rejected by each check. A row failing several checks is
+        counted once per check.
+    """
 
-    # check for categorical variables with NA not seen during training
-    if input_data[config.CATEGORICAL_NA_NOT_ALLOWED].isnull().any().any():
-        validated_data = validated_data.dropna(
-            axis=0, subset=config.CATEGORICAL_NA_NOT_ALLOWED)
+    n_rows = len(_column(input_data, config.FEATURES[0]))
+    mask = np.ones(n_rows, dtype=bool)
+    rejected = {}
+
+    # numerical and categorical variables with NA not seen during training
+    for rule, variables in (
+            ('numerical_na', config.NUMERICAL_NA_NOT_ALLOWED),
+            ('categorical_na', config.CATEGORICAL_NA_NOT_ALLOWED)):
+        failed = np.zeros(n_rows, dtype=bool)
+        for feature in variables:
+            failed |= pd.isnull(_column(input_data, feature))
+        rejected[rule] = int(np.count_nonzero(failed))
+        mask &= ~failed
+
+    # values <= 0 for the log transformed variables, NA is imputed later
+    failed = np.zeros(n_rows, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for feature in config.NUMERICALS_LOG_VARS:
+            values = _column(input_data, feature).astype(np.float64)
+            failed |= values <= 0
+    rejected['non_positive_log'] = int(np.count_nonzero(failed))
+    mask &= ~failed
+
+    return mask, rejected
+
+
+def validate_inputs(input_data: pd.DataFrame) -> pd.DataFrame:
+    """Check model inputs for unprocessable values.
 
-    # check for values <= 0 for the log transformed variables
-    if (input_data[config.NUMERICALS_LOG_VARS] <= 0).any().any():
-        vars_with_neg_values = config.NUMERICALS_LOG_VARS[
-            (input_data[config.NUMERICALS_LOG_VARS] <= 0).any()]
-        validated_data = validated_data[
-            validated_data[vars_with_neg_values] > 0]
+    Rows failing a check are dropped. The input itself is returned,
+    without a copy, when every row is valid.
+    """
 
-    return validated_data
+    mask, _ = get_validation_mask(input_data)
+    if mask.all():
+        return input_data
+    return input_data[mask]
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from regression_model.config import config
+from regression_model.processing.errors import InvalidModelInputError
+
+import typing as t
+
+
+def _as_list(variables) -> t.List[str]:
+    if not isinstance(variables, list):
+        return [variables]
+    return variables
+
+
+class ColumnarPipeline:
+    """Column-wise scorer built from a fitted price pipeline.
+
+    The fitted state of every step (imputer modes, frequent labels,
+    label encodings, scaler and model coefficients) is read once, so
+    that a batch can be scored by writing each raw input column
+    straight into one preallocated feature matrix, instead of copying
+    a DataFrame at every step of the sklearn pipeline.
+    """
+
+    def __init__(self, pipeline: Pipeline) -> None:
+        steps = pipeline.named_steps
+
+        drop_vars = _as_list(steps['drop_features'].variables)
+        self.features = [feature for feature in config.FEATURES
+                         if feature not in drop_vars]
+
+        categorical_imputer = steps['categorical_imputer']
+        numerical_imputer = steps['numerical_inputer']
+        temporal = steps['temporal_variable']
+        encoder = steps['categorical_encoder']
+        if 'rare_label_encoder' in steps:
+            rare_variables = steps['rare_label_encoder'].variables
+        else:
+            # fused rare label and ordinal encoder
+            rare_variables = encoder.variables
+
+        self.fill_values = dict(numerical_imputer.imputer_dict_)
+        self.temporal_vars = {
+            feature: temporal.reference_variables
+            for feature in temporal.variables}
+        self.log_vars = list(steps['log_transformer'].variables)
+
+        # label -> encoded value lookup tables, one per categorical column
+        self.lookups = {}
+        for feature in encoder.variables:
+            encodings = encoder.encoder_dict_[feature]
+            labels = pd.Index(list(encodings.keys()))
+            codes = np.array(list(encodings.values()), dtype=np.float64)
+            if feature in rare_variables:
+                # labels outside the frequent ones are encoded as 'Rare'
+                unknown = encodings.get('Rare', np.nan)
+            else:
+                unknown = np.nan
+            if feature in categorical_imputer.variables:
+                missing = encodings.get('Missing', unknown)
+            else:
+                missing = unknown
+            self.lookups[feature] = (labels, codes, unknown, missing)
+
+        scaler = steps['scaler']
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.offset = np.asarray(scaler.min_, dtype=np.float64)
+
+        model = steps['Linear_model']
+        self.coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        # a float for Lasso, an array of one for SGDRegressor
+        self.intercept = float(np.ravel(model.intercept_)[0])
+
+    def _encode(self, feature: str, values: np.ndarray,
+                out: np.ndarray) -> None:
+        labels, codes, unknown, missing = self.lookups[feature]
+        positions = labels.get_indexer(values)
+        found = positions >= 0
+        out[found] = codes[positions[found]]
+        if not found.all():
+            not_found = ~found
+            nulls = pd.isnull(values)
+            out[not_found & nulls] = missing
+            out[not_found & ~nulls] = unknown
+            if np.isnan(out[not_found]).any():
+                raise InvalidModelInputError(
+                    f'Categorical encoder has introduced NaN when '
+                    f'transforming categorical variables: {feature}')
+
+    def transform(self, columns: t.Dict[str, np.ndarray],
+                  n_rows: int) -> np.ndarray:
+        """Build the scaled feature matrix from raw column arrays."""
+
+        X = np.empty((n_rows, len(self.features)), dtype=np.float64,
+                     order='F')
+
+        for j, feature in enumerate(self.features):
+            out = X[:, j]
+            if feature in self.lookups:
+                self._encode(feature, columns[feature], out)
+                continue
+
+            out[:] = columns[feature]
+            if feature in self.fill_values:
+                out[np.isnan(out)] = self.fill_values[feature]
+            if feature in self.temporal_vars:
+                np.subtract(columns[self.temporal_vars[feature]], out,
+                            out=out)
+            if feature in self.log_vars:
+                if not (out > 0).all():
+                    raise InvalidModelInputError(
+                        f"Variables contain zero or negative values, "
+                        f"can't apply log for vars: {feature}")
+                np.log(out, out=out)
+
+        X *= self.scale
+        X += self.offset
+        return X
+
+    def predict(self, columns: t.Dict[str, np.ndarray],
+                n_rows: int) -> np.ndarray:
+        """Score raw column arrays, returns the log target."""
+
+        return self.score(self.transform(columns, n_rows))
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Score a transformed feature matrix, returns the log target."""
+
+        prediction = X.dot(self.coef)
+        prediction += self.intercept
+        return prediction
+
+
+def get_columns(data) -> t.Tuple[t.Dict[str, np.ndarray], int]:
+    """Extract the model feature columns from a batch without copies.
+
+    Accepts a DataFrame, a NumPy structured array or a mapping of
+    column names to sequences.
+    """
+
+    if isinstance(data, pd.DataFrame):
+        columns = {feature: data[feature].values
+                   for feature in config.FEATURES}
+    elif isinstance(data, np.ndarray) and data.dtype.names is not None:
+        columns = {feature: data[feature] for feature in config.FEATURES}
+    elif isinstance(data, dict):
+        columns = {feature: np.asarray(data[feature])
+                   for feature in config.FEATURES}
+    else:
+        raise TypeError(
+            f'Unsupported batch type: {type(data).__name__}')
+
+    n_rows = len(columns[config.FEATURES[0]])
+    return columns, n_rows
@@ -0,0 +1,228 @@
+"""Score large CSV or Parquet files in chunks.
+
+Only the model features (and optionally an id column) are read, one
+chunk at a time, and the predictions of every chunk are appended to the
+output file, so memory stays bounded whatever the size of the input:
+
+    python -m regression_model.score properties.csv predictions.parquet \
+        --id-column Id --workers 4
+"""
+
+import argparse
+import collections
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from regression_model.config import config
+from regression_model.predict import make_batch_prediction, warmup
+from regression_model.processing.errors import InvalidModelInputError
+from regression_model import __version__ as _version
+
+import logging
+import typing as t
+
+
+_logger = logging.getLogger(__name__)
+
+PREDICTION_COLUMN = 'prediction'
+
+
+def _is_parquet(file_name: t.Union[str, pathlib.Path]) -> bool:
+    return pathlib.Path(file_name).suffix.lower() in ('.parquet', '.pq')
+
+
+def read_chunks(*, file_name: t.Union[str, pathlib.Path],
+                chunk_size: int = config.SCORE_CHUNK_SIZE,
+                id_column: t.Optional[str] = None
+                ) -> t.Iterator[pd.DataFrame]:
+    """Read the model features of a CSV or Parquet file in chunks.
+
+    Parquet files are read a row group at a time, memory is bounded by
+    the size of their row groups.
+    """
+
+    columns = list(config.FEATURES)
+    dtypes = dict(config.FEATURE_DTYPES)
+    if id_column is not None:
+        columns.append(id_column)
+
+    if _is_parquet(file_name):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(str(file_name))
+        for index in range(parquet_file.num_row_groups):
+            row_group = parquet_file.read_row_group(
+                index, columns=columns).to_pandas().astype(dtypes)
+            for start in range(0, len(row_group), chunk_size):
+                yield row_group.iloc[start:start + chunk_size]
+    else:
+        yield from pd.read_csv(file_name, usecols=columns, dtype=dtypes,
+                               chunksize=chunk_size)
+
+
+def score_chunk(chunk: pd.DataFrame, version: str = _version
+                ) -> np.ndarray:
+    """Predict a chunk, rows failing validation are scored as NaN.
+
+    Rows that pass validation but can not be encoded, e.g. with an
+    unseen label, are scored as NaN too.
+    """
+
+    try:
+        result = make_batch_prediction(input_data=chunk, version=version)
+    except (InvalidModelInputError, ValueError, TypeError):
+        if len(chunk) == 1:
+            return np.full(1, np.nan)
+        # a single unprocessable row fails the whole call, isolate it
+        middle = len(chunk) // 2
+        return np.concatenate([score_chunk(chunk.iloc[:middle], version),
+                               score_chunk(chunk.iloc[middle:], version)])
+    output = np.full(len(chunk), np.nan)
+    output[result.get('valid_rows')] = result.get('predictions')
+    return output
+
+
+class _CSVWriter:
+
+    def __init__(self, file_name: t.Union[str, pathlib.Path]) -> None:
+        self.file = open(file_name, 'w', newline='')
+        self.header = True
+
+    def write(self, frame: pd.DataFrame) -> None:
+        frame.to_csv(self.file, index=False, header=self.header)
+        self.header = False
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ParquetWriter:
+
+    def __init__(self, file_name: t.Union[str, pathlib.Path]) -> None:
+        self.file_name = str(file_name)
+        self.writer = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.file_name, table.schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _scored_chunks(chunks: t.Iterable[pd.DataFrame], workers: int,
+                   version: str
+                   ) -> t.Iterator[t.Tuple[pd.DataFrame, np.ndarray]]:
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, score_chunk(chunk, version)
+        return
+
+    # at most two chunks per worker are in flight, results keep the
+    # order of the input
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=warmup) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(score_chunk, chunk,
+                                                   version)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def score_file(*, input_file: t.Union[str, pathlib.Path],
+               output_file: t.Union[str, pathlib.Path],
+               chunk_size: int = config.SCORE_CHUNK_SIZE,
+               workers: int = 1,
+               id_column: t.Optional[str] = None,
+               version: str = _version) -> dict:
+    """Score a CSV or Parquet file, writing the predictions to another.
+
+    Args:
+        input_file: File with the model features.
+        output_file: File to write, Parquet for a .parquet suffix,
+            CSV otherwise. Has a prediction per input row, in the same
+            order, NaN for the rows that can not be scored.
+        chunk_size: Rows read and scored at a time.
+        workers: Number of processes scoring chunks in parallel.
+        id_column: Input column copied to the output next to the
+            predictions.
+        version: Model version scoring every chunk, the package one by
+            default.
+
+    Returns:
+        The number of rows scored and rejected, as well as the model
+        version.
+    """
+
+    chunks = read_chunks(file_name=input_file, chunk_size=chunk_size,
+                         id_column=id_column)
+    if _is_parquet(output_file):
+        writer = _ParquetWriter(output_file)
+    else:
+        writer = _CSVWriter(output_file)
+
+    rows = 0
+    rejected = 0
+    try:
+        for chunk, output in _scored_chunks(chunks, workers, version):
+            frame = pd.DataFrame({PREDICTION_COLUMN: output})
+            if id_column is not None:
+                frame.insert(0, id_column, chunk[id_column].values)
+            writer.write(frame)
+            rows += len(output)
+            rejected += int(np.isnan(output).sum())
+    finally:
+        writer.close()
+
+    _logger.info(
+        f'Scored {input_file} with model version: {version} '
+        f'Rows: {rows} Rows rejected: {rejected}')
+
+    return {'rows': rows, 'rejected_rows': rejected, 'version': version}
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Score a CSV or Parquet file in chunks.')
+    parser.add_argument('input_file', help='CSV or Parquet file to score')
+    parser.add_argument('output_file',
+                        help='predictions file, Parquet for a .parquet '
+                             'suffix, CSV otherwise')
+    parser.add_argument('--chunk-size', type=int,
+                        default=config.SCORE_CHUNK_SIZE,
+                        help='rows read and scored at a time')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes scoring chunks in parallel')
+    parser.add_argument('--id-column',
+                        help='input column to copy to the output')
+    parser.add_argument('--version', default=_version,
+                        help='model version to score with')
+    args = parser.parse_args(argv)
+
+    result = score_file(input_file=args.input_file,
+                        output_file=args.output_file,
+                        chunk_size=args.chunk_size,
+                        workers=args.workers,
+                        id_column=args.id_column,
+                        version=args.version)
+    print(f"scored {result['rows']} rows, "
+          f"rejected {result['rejected_rows']}, "
+          f"model version {result['version']}")
+
+
+if __name__ == '__main__':
+    main()
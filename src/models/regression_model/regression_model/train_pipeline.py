@@ -1,24 +1,151 @@
+import argparse
+
 import numpy as np
-from sklearn.model_selection import train_test_split
+import pandas as pd
+from sklearn.base import clone
+from sklearn.externals.joblib import Parallel, delayed
+from sklearn.linear_model import lasso_path
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.pipeline import Pipeline
 
 # from regression_model import pipeline
 from regression_model import pipeline
 from regression_model.processing.data_management import (
-    load_dataset, save_pipeline)
+    load_dataset, load_pipeline, save_pipeline)
 from regression_model.config import config
 from regression_model import __version__ as _version
 
 import logging
+import typing as t
 
 
 _logger = logging.getLogger(__name__)
 
 
-def run_training() -> None:
-    """Train the model."""
+def _lasso_path_errors(X_train: np.ndarray, y_train: np.ndarray,
+                       X_test: np.ndarray, y_test: np.ndarray,
+                       alphas: t.List[float]) -> np.ndarray:
+    """Fit a warm started Lasso path, returns the test MSE per alpha."""
+
+    # the path does not fit an intercept, center as Lasso does
+    X_mean = X_train.mean(axis=0)
+    y_mean = y_train.mean()
+    _, coefs, _ = lasso_path(X_train - X_mean, y_train - y_mean,
+                             alphas=alphas)
+
+    predictions = (X_test - X_mean).dot(coefs) + y_mean
+    return ((predictions - y_test[:, np.newaxis]) ** 2).mean(axis=0)
+
+
+def _score_fold(X: pd.DataFrame, y: pd.Series, train_index: np.ndarray,
+                test_index: np.ndarray, tols: t.List[float],
+                alphas: t.List[float]) -> t.Dict[float, np.ndarray]:
+    """Score the grid on one fold, returns the MSE per alpha by tol."""
+
+    steps = clone(pipeline.price_pipe).steps[:-1]
+    names = [name for name, _ in steps]
+    position = names.index('categorical_encoder')
+    y_train = y.values[train_index]
+    y_test = y.values[test_index]
+
+    # the steps before the encoder do not depend on the tolerance,
+    # they are fitted once per fold
+    shared = Pipeline(steps[:position])
+    X_train = shared.fit_transform(X.iloc[train_index], y_train)
+    X_test = shared.transform(X.iloc[test_index])
+
+    errors = {}
+    for tol in tols:
+        encoding = Pipeline([(name, clone(step))
+                             for name, step in steps[position:]])
+        encoding.set_params(categorical_encoder__tol=tol)
+        errors[tol] = _lasso_path_errors(
+            encoding.fit_transform(X_train, y_train), y_train,
+            encoding.transform(X_test), y_test, alphas)
+    return errors
+
+
+def tune_hyperparameters(*, X: pd.DataFrame, y: pd.Series,
+                         alphas: t.List[float] = config.TUNING_ALPHAS,
+                         tols: t.List[float] = config.TUNING_RARE_LABEL_TOLS,
+                         cv: int = config.TUNING_CV_FOLDS,
+                         n_jobs: int = config.TUNING_N_JOBS) -> dict:
+    """Cross validate the Lasso alpha and the rare label tolerance.
+
+    The folds are scored in parallel. In every fold the imputers are
+    fitted once, the encoding steps once per tolerance, and all the
+    alphas are scored along one warm started Lasso path.
+
+    Returns:
+        The best alpha and tolerance, their mean squared error on the
+        log target, and the errors of the whole grid.
+    """
+
+    # lasso_path scores the alphas from the largest one
+    alphas = sorted(alphas, reverse=True)
+    folds = KFold(n_splits=cv, shuffle=True, random_state=0).split(X)
+    fold_errors = Parallel(n_jobs=n_jobs)(
+        delayed(_score_fold)(X, y, train_index, test_index, tols, alphas)
+        for train_index, test_index in folds)
+
+    grid = {}
+    for tol in tols:
+        errors = np.mean([fold[tol] for fold in fold_errors], axis=0)
+        for alpha, error in zip(alphas, errors):
+            grid[(tol, alpha)] = float(error)
+
+    tol, alpha = min(grid, key=grid.get)
+    _logger.info(f'best alpha: {alpha} rare label tol: {tol} '
+                 f'cross validated mse: {grid[(tol, alpha)]}')
+
+    return {'alpha': alpha, 'tol': tol, 'mse': grid[(tol, alpha)],
+            'grid': grid}
+
+
+def partial_fit_pipeline(price_pipe: Pipeline, X: pd.DataFrame,
+                         y: pd.Series) -> Pipeline:
+    """Update a fitted pipeline with new rows only.
 
-    # read training data
-    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    Every step with fitted state updates it with partial_fit, stateless
+    steps only transform the rows for the next ones. The model
+    coefficients apply to the features as first encoded and scaled: the
+    categorical encoder keeps its codes, and the scaler keeps the bounds
+    of the first fit, new values are scaled out of them.
+    """
+
+    *transformers, (_, model) = price_pipe.steps
+    # checked before any step is updated, not to leave a half updated
+    # pipeline behind
+    if not hasattr(model, 'partial_fit'):
+        raise ValueError(f'Model {type(model).__name__} can not be updated '
+                         f'with new rows, train an online model first')
+    for name, step in transformers:
+        is_fitted = any(attribute.endswith('_') for attribute in vars(step))
+        if is_fitted and not hasattr(step, 'partial_fit'):
+            raise ValueError(f'Step {name} can not be updated with new rows')
+
+    Xt = X
+    for name, step in transformers:
+        if hasattr(step, 'partial_fit') and name != 'scaler':
+            step.partial_fit(Xt, y)
+        Xt = step.transform(Xt)
+
+    for _ in range(config.ONLINE_MODEL_EPOCHS):
+        model.partial_fit(Xt, y)
+    return price_pipe
+
+
+def run_training(*, tune: bool = False, online: bool = False) -> None:
+    """Train the model.
+
+    Args:
+        tune: Cross validate the hyperparameters before the fit.
+        online: Train a model that can later be updated with new rows.
+    """
+
+    # read training data, the columns of the model only
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE,
+                        columns=config.FEATURES + [config.TARGET])
 
     # divide train and test
     X_train, X_test, y_train, y_test = train_test_split(
@@ -31,12 +158,68 @@ def run_training() -> None:
     y_train = np.log(y_train)
     y_test = np.log(y_test)
 
-    pipeline.price_pipe.fit(X_train[config.FEATURES],
-                            y_train)
+    price_pipe = pipeline.online_price_pipe if online else pipeline.price_pipe
+
+    if tune:
+        best = tune_hyperparameters(X=X_train[config.FEATURES], y=y_train)
+        price_pipe.set_params(
+            categorical_encoder__tol=best['tol'],
+            Linear_model__alpha=best['alpha'])
+
+    price_pipe.fit(X_train[config.FEATURES],
+                   y_train)
 
     _logger.info(f'saving model version: {_version}')
-    save_pipeline(pipeline_to_persist=pipeline.price_pipe)
+    save_pipeline(pipeline_to_persist=price_pipe)
+
+
+def run_incremental_training(*, file_name: str, from_version: str) -> None:
+    """Update a saved online model with the rows of a new dataset.
+
+    The updated model is saved as the current package version, which
+    has to be bumped first: every version names one model, the
+    prediction caches and the version router rely on it.
+
+    Args:
+        file_name: Dataset with the new rows only.
+        from_version: Version of the saved model to update.
+    """
+
+    if from_version == _version:
+        raise ValueError(f'Bump the package version before updating '
+                         f'the model of version {from_version}')
+
+    data = load_dataset(file_name=file_name,
+                        columns=config.FEATURES + [config.TARGET])
+    price_pipe = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{from_version}.pkl')
+
+    partial_fit_pipeline(price_pipe, data[config.FEATURES],
+                         np.log(data[config.TARGET]))
+
+    _logger.info(f'saving model version: {_version} updated from '
+                 f'{from_version} with {len(data)} rows from {file_name}')
+    save_pipeline(pipeline_to_persist=price_pipe)
 
 
 if __name__ == '__main__':
-    run_training()
+    parser = argparse.ArgumentParser(description='Train the model.')
+    parser.add_argument('--tune', action='store_true',
+                        help='cross validate the hyperparameters first')
+    parser.add_argument('--online', action='store_true',
+                        help='train a model that can be updated later')
+    parser.add_argument('--update', metavar='FILE_NAME',
+                        help='update a saved online model with the '
+                             'new rows of a dataset')
+    parser.add_argument('--from-version',
+                        help='version of the saved model to update, '
+                             'older than the package version')
+    args = parser.parse_args()
+
+    if args.update:
+        if args.from_version is None:
+            parser.error('--update needs --from-version')
+        run_incremental_training(file_name=args.update,
+                                 from_version=args.from_version)
+    else:
+        run_training(tune=args.tune, online=args.online)
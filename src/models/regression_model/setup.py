@@ -63,7 +63,15 @@ setup(
     packages=find_packages(exclude=('tests',)),
     package_data={'regression_model': ['VERSION']},
     install_requires=list_reqs(),
-    extras_require={},
+    extras_require={'parquet': ['pyarrow>=0.11.1']},
+    entry_points={
+        'console_scripts': [
+            'regression_model.score=regression_model.score:main',
+        ],
+        'deployment_framework.models': [
+            'regression_model=regression_model.plugin:plugin',
+        ],
+    },
     include_package_data=True,
     license='MIT',
     classifiers=[
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from regression_model.config import config
+from regression_model.processing.artifacts import (
+    MANIFEST_FILE, load_artifact, save_artifact)
+from regression_model.processing.data_management import (
+    load_dataset, load_pipeline)
+from regression_model.processing.errors import InvalidArtifactError
+from regression_model import __version__ as _version
+
+
+def test_artifact_predicts_as_the_pickle(tmp_path):
+    """Test the artifact rebuilds the pipeline, with mapped arrays"""
+    test_data = load_dataset(file_name='test.csv').dropna(
+        subset=config.NUMERICAL_NA_NOT_ALLOWED)
+    pickled = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{_version}.pkl')
+    save_artifact(pickled, tmp_path, version=_version)
+
+    subject = load_artifact(tmp_path)
+
+    assert isinstance(subject.named_steps['Linear_model'].coef_, np.memmap)
+    assert list(subject.named_steps) == list(pickled.named_steps)
+    np.testing.assert_array_equal(
+        subject.predict(test_data[config.FEATURES]),
+        pickled.predict(test_data[config.FEATURES]))
+
+
+def test_artifact_rejects_unknown_steps(tmp_path):
+    """Test an artifact can only build the known step classes"""
+    pickled = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{_version}.pkl')
+    save_artifact(pickled, tmp_path, version=_version)
+    with open(tmp_path / MANIFEST_FILE) as manifest_file:
+        manifest = json.load(manifest_file)
+    manifest['steps'][0]['type'] = 'Popen'
+    with open(tmp_path / MANIFEST_FILE, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    with pytest.raises(InvalidArtifactError):
+        load_artifact(tmp_path)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from regression_model.predict import make_batch_prediction, make_prediction
+from regression_model.processing.data_management import load_dataset
+
+
+def test_batch_prediction_matches_make_prediction():
+    """Test the batch path gives the same predictions"""
+    test_data = load_dataset(file_name='test.csv')
+
+    expected = make_prediction(input_data=test_data)
+    subject = make_batch_prediction(input_data=test_data)
+
+    assert subject.get('version') == expected.get('version')
+    assert isinstance(subject.get('predictions'), np.ndarray)
+    np.testing.assert_allclose(subject.get('predictions'),
+                               expected.get('predictions'), rtol=1e-9)
+    assert subject.get('valid_rows').sum() == len(
+        subject.get('predictions'))
+    assert len(subject.get('valid_rows')) == len(test_data)
+
+
+def test_batch_prediction_input_types():
+    """Test structured arrays and chunk iterators are accepted"""
+    test_data = load_dataset(file_name='test.csv')
+    expected = make_batch_prediction(input_data=test_data)
+
+    records = test_data.to_records(index=False)
+    from_records = make_batch_prediction(input_data=records)
+
+    chunks = (test_data[i:i + 100] for i in range(0, len(test_data), 100))
+    from_chunks = make_batch_prediction(input_data=chunks)
+
+    np.testing.assert_allclose(from_records.get('predictions'),
+                               expected.get('predictions'))
+    np.testing.assert_allclose(from_chunks.get('predictions'),
+                               expected.get('predictions'))
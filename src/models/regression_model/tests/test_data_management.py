@@ -0,0 +1,176 @@
+import os
+import shutil
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.externals import joblib
+from sklearn.linear_model import Lasso
+from sklearn.pipeline import Pipeline
+
+from regression_model.config import config
+from regression_model.predict import make_batch_prediction, shadow_scorer
+from regression_model.processing import data_management
+from regression_model.processing.data_management import (
+    PipelineRegistry, VersionRouter, disable_copies, load_dataset,
+    load_pipeline, remove_old_pipelines, saved_versions)
+from regression_model.processing.validation import validate_inputs
+from regression_model import __version__ as _version
+
+
+def test_registry_loads_lazily():
+    """Test a pipeline is only loaded on first use, and then reused"""
+    registry = PipelineRegistry(max_size=2)
+    assert registry.loaded_versions() == []
+
+    pipeline = registry.get(_version)
+
+    assert isinstance(pipeline, Pipeline)
+    assert registry.loaded_versions() == [_version]
+    assert registry.get(_version) is pipeline
+    assert not pipeline.named_steps['categorical_imputer'].copy
+
+
+def test_pipeline_pickled_without_copy_argument(tmp_path):
+    """Test pipelines saved before the copy argument existed still load"""
+    pipeline = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{_version}.pkl')
+    for _, step in pipeline.steps:
+        if type(step).__module__.startswith('regression_model'):
+            del step.__dict__['copy']
+    joblib.dump(pipeline, tmp_path / 'old_pipeline.pkl')
+    old_pipeline = joblib.load(tmp_path / 'old_pipeline.pkl')
+    data = validate_inputs(
+        input_data=load_dataset(file_name=config.TESTING_DATA_FILE))
+
+    expected = pipeline.predict(data[config.FEATURES])
+    subject = old_pipeline.predict(data[config.FEATURES])
+
+    assert np.allclose(subject, expected)
+    disable_copies(old_pipeline)
+    assert not old_pipeline.named_steps['categorical_imputer'].copy
+
+
+def test_registry_evicts_least_recently_used():
+    """Test the registry keeps at most max_size versions loaded"""
+    registry = PipelineRegistry(max_size=2)
+
+    def load_pipeline(file_name):
+        return Pipeline([('Linear_model', Lasso())])
+
+    with mock.patch('regression_model.processing.data_management.'
+                    'load_pipeline', side_effect=load_pipeline) as load:
+        registry.get('0.0.1')
+        registry.get('0.0.2')
+        registry.get('0.0.1')
+        registry.get('0.0.3')
+
+    assert load.call_count == 3
+    assert registry.loaded_versions() == ['0.0.1', '0.0.3']
+
+
+def test_registry_warmup():
+    """Test warmup loads the current version"""
+    registry = PipelineRegistry()
+    # gc.freeze would hold every object of the test session
+    with mock.patch('gc.freeze', create=True) as freeze:
+        registry.warmup()
+
+    assert registry.loaded_versions() == [_version]
+    freeze.assert_called_once_with()
+
+
+def test_registry_locks_reset_after_fork():
+    """Test the registries get a new lock in a forked child"""
+    registry = PipelineRegistry()
+    lock = registry._lock
+
+    data_management._after_fork_in_child()
+
+    assert registry._lock is not lock
+
+
+def test_remove_old_pipelines_keeps_recent_versions(tmp_path):
+    """Test the files of the most recently saved versions are kept"""
+    for mtime, version in enumerate(['0.0.1', '0.0.2', '0.0.3']):
+        for file_name in [f'{config.PIPELINE_SAVE_FILE}{version}.pkl',
+                          f'{config.FROZEN_PIPELINE_SAVE_FILE}{version}.json']:
+            (tmp_path / file_name).touch()
+            os.utime(tmp_path / file_name, (mtime, mtime))
+    (tmp_path / f'{config.ARTIFACT_SAVE_DIR}0.0.1').mkdir()
+    os.utime(tmp_path / f'{config.ARTIFACT_SAVE_DIR}0.0.1', (0, 0))
+
+    with mock.patch.object(config, 'TRAINED_MODEL_DIR', tmp_path):
+        remove_old_pipelines(
+            files_to_keep=[f'{config.PIPELINE_SAVE_FILE}0.0.4.pkl'],
+            versions_to_keep=3)
+        assert saved_versions() == ['0.0.3', '0.0.2']
+
+
+def test_version_router_splits_traffic():
+    """Test a share of the calls is routed to the candidate version"""
+    router = VersionRouter(current_version='0.0.1',
+                           candidate_version='0.0.2', candidate_share=0.2)
+
+    versions = [router.choose_version() for _ in range(1000)]
+
+    assert 100 < versions.count('0.0.2') < 300
+    assert not router.shadows('0.0.1')
+    assert VersionRouter(current_version='0.0.1').choose_version() == '0.0.1'
+
+
+def test_shadow_scoring_records_differences():
+    """Test the candidate scores the current version batches"""
+    test_data = load_dataset(file_name='test.csv')
+    router = VersionRouter(current_version=_version,
+                           candidate_version=_version, shadow=True)
+
+    with mock.patch('regression_model.predict.version_router', router):
+        result = make_batch_prediction(input_data=test_data)
+        shadow_scorer.wait()
+
+    stats = router.stats()
+    assert result.get('version') == _version
+    assert stats['rows'] == len(result.get('predictions'))
+    assert stats['rows_over_threshold'] == 0
+    assert stats['max_difference'] == 0.0
+
+
+def test_load_dataset_caches_typed_columns(tmp_path):
+    """Test the parsed dataset is cached until the CSV is modified"""
+    pytest.importorskip('pyarrow')
+    shutil.copy(str(config.DATASET_DIR / 'train.csv'), str(tmp_path))
+
+    with mock.patch.object(config, 'DATASET_DIR', tmp_path):
+        subject = load_dataset(file_name='train.csv')
+        assert (tmp_path / 'train.parquet').exists()
+        with mock.patch('pandas.read_csv') as read_csv:
+            cached = load_dataset(file_name='train.csv')
+        assert not read_csv.called
+
+        os.utime(tmp_path / 'train.csv', (0, 0))
+        with mock.patch('pandas.read_csv', wraps=pd.read_csv) as read_csv:
+            load_dataset(file_name='train.csv')
+        assert read_csv.called
+
+    header = pd.read_csv(config.DATASET_DIR / 'train.csv', nrows=0)
+    assert list(subject.columns) == list(header.columns)
+    assert subject['MSZoning'].dtype == 'category'
+    assert subject['LotFrontage'].dtype == np.float32
+    pd.testing.assert_frame_equal(cached, subject)
+
+
+def test_load_dataset_without_writable_cache(tmp_path):
+    """Test a dataset is loaded where the cache can not be written"""
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    shutil.copy(str(config.DATASET_DIR / 'test.csv'), str(tmp_path))
+
+    with mock.patch.object(config, 'DATASET_DIR', tmp_path), \
+            mock.patch.object(pyarrow_parquet, 'write_table',
+                              side_effect=PermissionError('read-only')):
+        subject = load_dataset(file_name='test.csv',
+                               columns=config.FEATURES)
+
+    assert list(subject.columns) == config.FEATURES
+    assert os.listdir(tmp_path) == ['test.csv']
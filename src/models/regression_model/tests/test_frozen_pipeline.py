@@ -0,0 +1,57 @@
+import math
+
+from regression_model.config import config
+from regression_model.predict import make_frozen_prediction, make_prediction
+from regression_model.processing.data_management import (
+    load_dataset, load_frozen_pipeline)
+from regression_model.processing.validation import validate_inputs
+from regression_model import __version__ as _version
+
+
+def test_frozen_prediction_matches_make_prediction():
+    """Test the frozen pipeline gives the same predictions"""
+    test_data = load_dataset(file_name='test.csv')
+    validated_data = validate_inputs(input_data=test_data)
+
+    expected = make_prediction(input_data=validated_data)
+    subject = make_frozen_prediction(
+        input_data=validated_data.to_dict(orient='records'))
+
+    assert subject.get('version') == expected.get('version')
+    assert len(subject.get('predictions')) == len(
+        expected.get('predictions'))
+    for frozen_value, pipeline_value in zip(subject.get('predictions'),
+                                            expected.get('predictions')):
+        assert math.isclose(frozen_value, pipeline_value,
+                            rel_tol=config.ACCEPTABLE_MODEL_DIFFERENCE)
+
+
+def test_saved_frozen_pipeline_matches_make_prediction():
+    """Test the persisted frozen artifact gives the same predictions"""
+    test_data = load_dataset(file_name='test.csv')
+    single_test_input = validate_inputs(input_data=test_data)[0:1]
+    frozen_pipe = load_frozen_pipeline(
+        file_name=f'{config.FROZEN_PIPELINE_SAVE_FILE}{_version}.json')
+
+    expected = make_prediction(input_data=single_test_input)
+    subject = frozen_pipe.predict(
+        single_test_input.to_dict(orient='records'))
+
+    assert frozen_pipe.version == _version
+    assert math.isclose(subject[0], expected.get('predictions')[0],
+                        rel_tol=config.ACCEPTABLE_MODEL_DIFFERENCE)
+
+
+def test_frozen_prediction_of_a_single_record():
+    """Test a single record dict gives the prediction of its row"""
+    test_data = load_dataset(file_name='test.csv')
+    single_test_input = validate_inputs(input_data=test_data)[0:1]
+    record = single_test_input.to_dict(orient='records')[0]
+
+    expected = make_prediction(input_data=single_test_input)
+    subject = make_frozen_prediction(input_data=record)
+
+    assert len(subject.get('predictions')) == 1
+    assert math.isclose(subject.get('predictions')[0],
+                        expected.get('predictions')[0],
+                        rel_tol=config.ACCEPTABLE_MODEL_DIFFERENCE)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from regression_model.config import config
+from regression_model.predict import make_batch_prediction, make_prediction
+from regression_model.processing.data_management import (
+    load_dataset, pipeline_registry)
+from regression_model.processing.instrumentation import (
+    Histogram, InstrumentedPipeline, PipelineMetrics, pipeline_metrics)
+
+
+def test_histogram_buckets():
+    histogram = Histogram([1, 10, 100])
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == 556.5
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_instrumented_pipeline_measures_every_step():
+    """Sampled calls time every step and predict the same values"""
+    test_data = load_dataset(file_name='test.csv')
+    X = test_data[config.FEATURES].dropna()
+    metrics = PipelineMetrics(sample_rate=1.0)
+    price_pipe = InstrumentedPipeline(pipeline_registry.get(), metrics)
+
+    expected = pipeline_registry.get().predict(X.copy())
+    subject = price_pipe.predict(X.copy())
+
+    assert np.allclose(subject, expected)
+    summary = metrics.summary()
+    assert list(summary) == [name for name, _ in price_pipe.steps]
+    for step in summary.values():
+        assert step['seconds']['count'] == 1
+        assert step['rows_in']['mean'] == len(X)
+        assert step['rows_out']['mean'] == len(X)
+        assert step['output_bytes']['mean'] > 0
+
+
+def test_no_measure_without_sampling():
+    metrics = PipelineMetrics(sample_rate=0.0)
+    price_pipe = InstrumentedPipeline(pipeline_registry.get(), metrics)
+    test_data = load_dataset(file_name='test.csv')
+
+    price_pipe.predict(test_data[config.FEATURES].dropna())
+
+    assert metrics.summary() == {}
+
+
+def test_make_prediction_metrics_in_prometheus_format():
+    test_data = load_dataset(file_name='test.csv')
+    pipeline_metrics.clear()
+    pipeline_metrics.sample_rate = 1.0
+    try:
+        make_prediction(input_data=test_data[0:10])
+    finally:
+        pipeline_metrics.sample_rate = config.PIPELINE_METRICS_SAMPLE_RATE
+
+    text = pipeline_metrics.to_prometheus()
+    name = f'{config.PIPELINE_NAME}_step_seconds'
+    assert f'# TYPE {name} histogram' in text
+    assert f'{name}_count{{step="validate_inputs"}} 1' in text
+    assert f'{name}_bucket{{step="Linear_model",le="+Inf"}} 1' in text
+    assert f'{config.PIPELINE_NAME}_step_rows_in_sum' \
+        f'{{step="validate_inputs"}} 10' in text
+    pipeline_metrics.clear()
+
+
+def test_batch_prediction_metrics():
+    """The columnar path serving traffic is measured too"""
+    test_data = load_dataset(file_name='test.csv')
+    pipeline_metrics.clear()
+    pipeline_metrics.sample_rate = 1.0
+    try:
+        result = make_batch_prediction(input_data=test_data[0:10])
+    finally:
+        pipeline_metrics.sample_rate = config.PIPELINE_METRICS_SAMPLE_RATE
+
+    summary = pipeline_metrics.summary()
+    pipeline_metrics.clear()
+    assert list(summary) == ['validate_inputs', 'columnar_transform',
+                             'Linear_model']
+    assert summary['validate_inputs']['rows_in']['mean'] == 10
+    assert summary['Linear_model']['rows_out']['mean'] == len(
+        result['predictions'])
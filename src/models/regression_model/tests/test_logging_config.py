@@ -0,0 +1,53 @@
+import logging
+import threading
+
+from regression_model.config.logging_config import AsyncHandler
+
+
+class _BlockingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.released.wait()
+        self.messages.append(record.getMessage())
+
+
+def _logger(handler):
+    logger = logging.getLogger('tests.async_handler')
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_async_handler_writes_in_the_background():
+    target = _BlockingHandler()
+    handler = AsyncHandler(target)
+    logger = _logger(handler)
+
+    # the target blocks, the calls do not
+    for number in range(5):
+        logger.info('message %d', number)
+    assert target.messages == []
+
+    target.released.set()
+    handler.flush_queue()
+    assert target.messages == [f'message {number}' for number in range(5)]
+
+
+def test_async_handler_drops_records_when_full():
+    target = _BlockingHandler()
+    handler = AsyncHandler(target, max_size=2)
+    logger = _logger(handler)
+
+    for number in range(10):
+        logger.info('message %d', number)
+
+    target.released.set()
+    handler.flush_queue()
+    assert handler.dropped >= 7
+    assert len(target.messages) == 10 - handler.dropped
@@ -0,0 +1,41 @@
+from regression_model.config import config
+from regression_model.processing.data_management import (
+    disable_copies, load_dataset, load_pipeline)
+from regression_model.processing.validation import validate_inputs
+from regression_model import __version__ as _version
+
+
+def _load_features():
+    test_data = load_dataset(file_name='test.csv')
+    return validate_inputs(input_data=test_data).reindex(
+        columns=config.FEATURES)
+
+
+def _package_transformers(pipeline):
+    return [step for _, step in pipeline.steps
+            if type(step).__module__.startswith('regression_model')]
+
+
+def test_transformers_without_copies_work_in_place():
+    """Test every package step transforms its input frame in place"""
+    pipeline = disable_copies(load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{_version}.pkl'))
+    X = _load_features()
+
+    for step in _package_transformers(pipeline):
+        assert step.transform(X) is X
+
+
+def test_transformers_copy_by_default():
+    """Test the steps leave their input untouched by default"""
+    pipeline = load_pipeline(
+        file_name=f'{config.PIPELINE_SAVE_FILE}{_version}.pkl')
+    X = _load_features()
+    expected = X.copy()
+
+    Xt = X
+    for step in _package_transformers(pipeline):
+        transformed = step.transform(Xt)
+        assert transformed is not Xt
+        Xt = transformed
+    assert X.equals(expected)
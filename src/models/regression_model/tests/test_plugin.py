@@ -0,0 +1,40 @@
+from unittest import mock
+
+import numpy as np
+
+from regression_model.config import config
+from regression_model.plugin import plugin
+from regression_model.processing.data_management import load_dataset
+from regression_model import __version__ as _version
+
+
+def test_plugin_predicts_records():
+    """Invalid records get None, the others a prediction"""
+    test_data = load_dataset(file_name='test.csv')
+    rows = test_data[config.FEATURES][0:3].astype(object).where(
+        test_data[config.FEATURES][0:3].notnull(), None).to_dict('records')
+    rows[1]['GrLivArea'] = None
+
+    subject = plugin.predict_batch(rows)
+
+    predictions = subject.get('predictions')
+    assert len(predictions) == 3
+    assert isinstance(predictions[0], float)
+    assert predictions[1] is None
+    assert subject.get('version') == _version
+    assert set(config.FEATURES) == set(plugin.input_schema['required'])
+
+
+def test_plugin_reports_the_routed_version():
+    """The version returned is the one the router chose"""
+    router = mock.Mock(**{'choose_version.return_value': 'candidate'})
+    result = {'predictions': np.array([1.0]), 'valid_rows': np.array([True]),
+              'version': 'candidate'}
+
+    with mock.patch('regression_model.plugin.version_router', router), \
+            mock.patch('regression_model.plugin.make_cached_prediction',
+                       return_value=result) as predict:
+        subject = plugin.predict_batch([{}])
+
+    assert predict.call_args[1]['version'] == 'candidate'
+    assert subject == {'predictions': [1.0], 'version': 'candidate'}
@@ -1,3 +1,4 @@
+import logging
 import math
 
 from regression_model.predict import make_prediction
@@ -28,3 +29,25 @@ def test_make_multiple_predictions():
     assert len(subject.get('predictions')) == 1451
     # It is expected some rows to be filtered out
     assert len(subject.get('predictions')) != original_data_length
+
+
+def test_prediction_logs_summary_not_inputs():
+    """The prediction log has row counts and a digest, not the inputs"""
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger('regression_model.predict')
+    logger.addHandler(handler)
+    test_data = load_dataset(file_name='test.csv')
+    try:
+        subject = make_prediction(input_data=test_data)
+        make_prediction(input_data=test_data)
+    finally:
+        logger.removeHandler(handler)
+
+    first, second = [record.prediction for record in records]
+    assert first['rows'] == len(subject.get('predictions'))
+    assert first['rows_rejected'] == len(test_data) - first['rows']
+    assert first['input_digest'] == second['input_digest']
+    assert first['latency_ms'] > 0
+    assert 'Neighborhood' not in records[0].getMessage()
@@ -0,0 +1,83 @@
+import numpy as np
+
+from regression_model.config import config
+
+from regression_model.predict import (
+    make_batch_prediction, make_cached_prediction)
+from regression_model.processing.cache import (
+    LRUCache, PredictionCache, row_keys)
+from regression_model.processing.data_management import load_dataset
+
+
+def test_cached_prediction_matches_batch_prediction():
+    """Test cached predictions are the same, and scored only once"""
+    test_data = load_dataset(file_name='test.csv')
+    cache = PredictionCache(LRUCache(max_size=10000))
+
+    expected = make_batch_prediction(input_data=test_data)
+    first = make_cached_prediction(input_data=test_data, cache=cache)
+    second = make_cached_prediction(input_data=test_data, cache=cache)
+
+    np.testing.assert_allclose(first.get('predictions'),
+                               expected.get('predictions'))
+    np.testing.assert_allclose(second.get('predictions'),
+                               expected.get('predictions'))
+    np.testing.assert_array_equal(second.get('valid_rows'),
+                                  expected.get('valid_rows'))
+    assert cache.misses == len(test_data)
+    assert cache.hits == len(test_data)
+    assert cache.hit_rate == 0.5
+
+
+def test_only_misses_are_scored():
+    """Test a batch only scores the rows missing from the cache"""
+    test_data = load_dataset(file_name='test.csv')
+    cache = PredictionCache(LRUCache(max_size=10000))
+
+    make_cached_prediction(input_data=test_data[:100], cache=cache)
+    make_cached_prediction(input_data=test_data[50:150], cache=cache)
+
+    assert cache.hits == 50
+    assert cache.misses == 150
+    text = cache.to_prometheus()
+    name = f'{config.PIPELINE_NAME}_prediction_cache'
+    assert f'{name}_hits_total 50\n' in text
+    assert f'{name}_misses_total 150\n' in text
+    assert f'{name}_hit_rate 0.25\n' in text
+
+
+def test_row_keys_are_canonical():
+    """Test equal rows get equal keys whatever their dtypes"""
+    test_data = load_dataset(file_name='test.csv')[:1]
+    other_dtypes = test_data.astype(object)
+    other_dtypes['OverallQual'] = str(int(test_data['OverallQual'].iloc[0]))
+
+    assert row_keys(test_data, '1.0.0') == row_keys(other_dtypes, '1.0.0')
+    assert row_keys(test_data, '1.0.0') != row_keys(test_data, '1.0.1')
+
+
+def test_cache_is_cleared_on_version_change():
+    """Test entries are dropped when more versions are in use"""
+    test_data = load_dataset(file_name='test.csv')[:10]
+    backend = LRUCache(max_size=100)
+    cache = PredictionCache(backend, max_versions=2)
+
+    cache.set_many(dict.fromkeys(cache.keys(test_data, '1.0.0'), 1.0))
+    assert len(backend) == 10
+    # a candidate version is served side by side
+    cache.keys(test_data, '1.0.1')
+    cache.keys(test_data, '1.0.0')
+    assert len(backend) == 10
+    cache.keys(test_data, '1.0.2')
+    assert len(backend) == 0
+    assert cache.stats()['versions'] == ['1.0.2']
+
+
+def test_lru_cache_is_bounded():
+    """Test the least recently used entries are evicted"""
+    backend = LRUCache(max_size=2, ttl=None)
+    backend.set_many({'a': 1.0, 'b': 2.0})
+    backend.get_many(['a'])
+    backend.set_many({'c': 3.0})
+
+    assert backend.get_many(['a', 'b', 'c']) == {'a': 1.0, 'c': 3.0}
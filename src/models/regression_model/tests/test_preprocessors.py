@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from regression_model.config import config
+from regression_model.processing import preprocessors as pp
+from regression_model.processing.data_management import load_dataset
+
+
+def _imputed(data: pd.DataFrame) -> pd.DataFrame:
+    imputer = pp.CategoricalImputer(variables=config.CATEGORICAL_VARS_WITH_NA)
+    return imputer.transform(data[config.FEATURES])
+
+
+def _fit_encoders():
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = _imputed(data), np.log(data[config.TARGET])
+
+    rare_encoder = pp.RareLabelCategoricalEncoder(
+        tol=0.01, variables=config.CATEGORICAL_VARS)
+    encoder = pp.CategoricalEncoder(variables=config.CATEGORICAL_VARS)
+    encoder.fit(rare_encoder.fit_transform(X), y)
+
+    fused = pp.RareLabelOrdinalEncoder(
+        tol=0.01, variables=config.CATEGORICAL_VARS).fit(X, y)
+    return rare_encoder, encoder, fused
+
+
+def test_fused_encoder_matches_two_step_encoding():
+    """Test the fused encoder gives the codes of the two encoders"""
+    rare_encoder, encoder, fused = _fit_encoders()
+    test_data = _imputed(load_dataset(file_name='test.csv'))
+    # unseen labels are encoded as 'Rare', where it was learnt
+    for feature in config.CATEGORICAL_VARS:
+        if 'Rare' in encoder.encoder_dict_[feature]:
+            test_data.loc[0, feature] = 'Unseen'
+
+    expected = encoder.transform(rare_encoder.transform(test_data))
+    subject = fused.transform(test_data)
+
+    assert fused.encoder_dict_ == encoder.encoder_dict_
+    for feature in config.CATEGORICAL_VARS:
+        assert subject[feature].dtype == np.int8
+        assert (subject[feature].values == expected[feature].values).all()
+
+
+def test_fused_encoder_output_is_compact():
+    """Test the fused encoder codes take less memory than the two steps"""
+    rare_encoder, encoder, fused = _fit_encoders()
+    test_data = _imputed(load_dataset(file_name='test.csv'))
+
+    expected = encoder.transform(rare_encoder.transform(test_data))
+    subject = fused.transform(test_data)
+
+    columns = config.CATEGORICAL_VARS
+    fused_bytes = subject[columns].memory_usage(index=False).sum()
+    two_step_bytes = expected[columns].memory_usage(index=False).sum()
+    assert fused_bytes < two_step_bytes
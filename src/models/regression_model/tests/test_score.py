@@ -0,0 +1,92 @@
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regression_model.config import config
+from regression_model.predict import make_batch_prediction
+from regression_model.processing.data_management import load_dataset
+from regression_model.score import main, score_file
+from regression_model import __version__ as _version
+
+
+def _expected_predictions(test_data: pd.DataFrame) -> np.ndarray:
+    result = make_batch_prediction(input_data=test_data)
+    expected = np.full(len(test_data), np.nan)
+    expected[result.get('valid_rows')] = result.get('predictions')
+    return expected
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_score_csv_file_in_chunks(tmp_path, workers):
+    """Test chunked scoring gives one prediction per row, in order"""
+    test_data = load_dataset(file_name='test.csv')
+    test_data.loc[0, 'GrLivArea'] = 0
+    input_file = tmp_path / 'input.csv'
+    test_data.to_csv(input_file, index=False)
+    output_file = tmp_path / 'predictions.csv'
+
+    result = score_file(input_file=input_file, output_file=output_file,
+                        chunk_size=100, workers=workers, id_column='Id')
+    subject = pd.read_csv(output_file)
+    expected = _expected_predictions(test_data)
+
+    assert result.get('rows') == len(test_data)
+    assert result.get('rejected_rows') == np.isnan(expected).sum()
+    assert np.isnan(subject['prediction'].values[0])
+    assert list(subject.columns) == ['Id', 'prediction']
+    assert (subject['Id'].values == test_data['Id'].values).all()
+    np.testing.assert_allclose(subject['prediction'].values, expected)
+
+
+def test_unencodable_row_is_scored_as_nan(tmp_path):
+    """Test a row with an unseen label does not fail the whole file"""
+    test_data = load_dataset(file_name='test.csv')
+    expected = _expected_predictions(test_data)
+    test_data['MSZoning'] = test_data['MSZoning'].astype(object)
+    test_data.loc[5, 'MSZoning'] = 'unseen'
+    expected[5] = np.nan
+    input_file = tmp_path / 'input.csv'
+    test_data.to_csv(input_file, index=False)
+    output_file = tmp_path / 'predictions.csv'
+
+    result = score_file(input_file=input_file, output_file=output_file)
+    subject = pd.read_csv(output_file)
+
+    assert result.get('rejected_rows') == np.isnan(expected).sum()
+    np.testing.assert_allclose(subject['prediction'].values, expected)
+
+
+def test_every_chunk_is_scored_with_one_version(tmp_path):
+    """Test the version reported is the one every chunk was scored with"""
+    test_data = load_dataset(file_name='test.csv')
+    input_file = tmp_path / 'input.csv'
+    test_data.to_csv(input_file, index=False)
+
+    with mock.patch('regression_model.score.make_batch_prediction',
+                    wraps=make_batch_prediction) as predict:
+        result = score_file(input_file=input_file,
+                            output_file=tmp_path / 'predictions.csv',
+                            chunk_size=500, version=_version)
+
+    assert result.get('version') == _version
+    assert predict.call_count == 3
+    for call in predict.call_args_list:
+        assert call[1]['version'] == _version
+
+
+def test_score_parquet_file(tmp_path):
+    """Test Parquet files are read and written, row group by row group"""
+    pytest.importorskip('pyarrow')
+    test_data = load_dataset(file_name='test.csv')
+    input_file = tmp_path / 'input.parquet'
+    test_data[config.FEATURES].to_parquet(input_file, index=False,
+                                          row_group_size=300)
+    output_file = tmp_path / 'predictions.parquet'
+
+    main([str(input_file), str(output_file), '--chunk-size', '100'])
+    subject = pd.read_parquet(output_file)
+
+    np.testing.assert_allclose(subject['prediction'].values,
+                               _expected_predictions(test_data))
@@ -0,0 +1,118 @@
+import copy
+import math
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, KFold
+
+from regression_model import pipeline
+from regression_model.config import config
+from regression_model.processing.data_management import load_dataset
+from regression_model.train_pipeline import (
+    partial_fit_pipeline, run_incremental_training, tune_hyperparameters)
+from regression_model import __version__ as _version
+
+
+def test_tuning_matches_grid_search():
+    """Test the tuning mode finds the grid search best parameters"""
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = data[config.FEATURES], np.log(data[config.TARGET])
+    alphas = [0.001, 0.005, 0.05]
+    tols = [0.01, 0.05]
+
+    subject = tune_hyperparameters(X=X, y=y, alphas=alphas, tols=tols,
+                                   cv=3, n_jobs=2)
+
+    grid_search = GridSearchCV(
+        pipeline.price_pipe,
+        {'Linear_model__alpha': alphas, 'categorical_encoder__tol': tols},
+        cv=KFold(n_splits=3, shuffle=True, random_state=0),
+        scoring='neg_mean_squared_error').fit(X, y)
+
+    assert len(subject.get('grid')) == len(alphas) * len(tols)
+    assert subject.get('alpha') == grid_search.best_params_[
+        'Linear_model__alpha']
+    assert subject.get('tol') == grid_search.best_params_[
+        'categorical_encoder__tol']
+    assert math.isclose(subject.get('mse'), -grid_search.best_score_,
+                        rel_tol=1e-4)
+
+
+def test_partial_fit_keeps_the_encoding():
+    """Test updating with new rows keeps the codes and scale of the model"""
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = data[config.FEATURES], np.log(data[config.TARGET])
+    half = len(data) // 2
+
+    full = clone(pipeline.online_price_pipe).fit(X, y)
+    first = clone(pipeline.online_price_pipe).fit(X[:half], y[:half])
+    updated = copy.deepcopy(first)
+    # no pass over the new rows, the model coefficients are the same
+    with mock.patch.object(config, 'ONLINE_MODEL_EPOCHS', 0):
+        partial_fit_pipeline(updated, X[half:], y[half:])
+
+    imputer = updated.named_steps['numerical_inputer']
+    expected_imputer = full.named_steps['numerical_inputer']
+    assert imputer.imputer_dict_ == expected_imputer.imputer_dict_
+    encodings = updated.named_steps['categorical_encoder'].encoder_dict_
+    first_encodings = first.named_steps['categorical_encoder'].encoder_dict_
+    for feature, codes in first_encodings.items():
+        # labels seen since get the next codes
+        assert list(encodings[feature].items())[:len(codes)] == list(
+            codes.items())
+        assert sorted(encodings[feature].values()) == list(
+            range(len(encodings[feature])))
+    for attribute in ('min_', 'scale_'):
+        np.testing.assert_array_equal(
+            getattr(updated.named_steps['scaler'], attribute),
+            getattr(first.named_steps['scaler'], attribute))
+
+    # rows the imputer modes do not apply to are encoded as before
+    test_data = load_dataset(file_name=config.TESTING_DATA_FILE).dropna(
+        subset=[*config.NUMERICAL_NA_NOT_ALLOWED,
+                *config.NUMERICAL_VARS_WITH_NA])
+    np.testing.assert_allclose(updated.predict(test_data[config.FEATURES]),
+                               first.predict(test_data[config.FEATURES]),
+                               rtol=1e-12)
+
+
+def test_partial_fit_improves_the_model():
+    """Test updating with new rows lowers the error on held out rows"""
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = data[config.FEATURES], np.log(data[config.TARGET])
+    first, second = int(len(data) * 0.4), int(len(data) * 0.8)
+
+    price_pipe = clone(pipeline.online_price_pipe).fit(X[:first],
+                                                       y[:first])
+    error = np.abs(price_pipe.predict(X[second:]) - y[second:]).mean()
+    partial_fit_pipeline(price_pipe, X[first:second], y[first:second])
+    prediction = price_pipe.predict(X[second:])
+    updated_error = np.abs(prediction - y[second:]).mean()
+
+    assert updated_error < error
+
+
+def test_partial_fit_needs_an_online_model():
+    """Test a Lasso pipeline can not be updated with new rows"""
+    data = load_dataset(file_name=config.TRAINING_DATA_FILE)
+    X, y = data[config.FEATURES], np.log(data[config.TARGET])
+    price_pipe = clone(pipeline.price_pipe).fit(X, y)
+    imputer = price_pipe.named_steps['numerical_inputer']
+    value_counts = copy.deepcopy(imputer.value_counts_)
+
+    with pytest.raises(ValueError):
+        partial_fit_pipeline(price_pipe, X[:10], y[:10])
+    # no step was updated
+    for feature, counts in value_counts.items():
+        pd.testing.assert_series_equal(imputer.value_counts_[feature],
+                                       counts)
+
+
+def test_incremental_training_needs_a_new_version():
+    """Test an updated model is never saved as the version it updates"""
+    with pytest.raises(ValueError):
+        run_incremental_training(file_name=config.TRAINING_DATA_FILE,
+                                 from_version=_version)
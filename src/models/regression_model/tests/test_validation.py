@@ -0,0 +1,37 @@
+import numpy as np
+
+from regression_model.processing.data_management import load_dataset
+from regression_model.processing.validation import (
+    get_validation_mask, validate_inputs)
+
+
+def test_validation_drops_invalid_rows():
+    """Test rows failing a check are dropped, and counted per check"""
+    test_data = load_dataset(file_name='test.csv')[:10].copy()
+    test_data.loc[0, 'OverallQual'] = np.nan
+    test_data.loc[1, 'MSZoning'] = np.nan
+    test_data.loc[2, 'GrLivArea'] = 0
+    test_data.loc[3, 'GrLivArea'] = -1
+    test_data.loc[3, 'OverallQual'] = np.nan
+
+    mask, rejected = get_validation_mask(test_data)
+    validated_data = validate_inputs(input_data=test_data)
+
+    assert mask.tolist() == [False] * 4 + [True] * 6
+    assert rejected == {'numerical_na': 2, 'categorical_na': 1,
+                        'non_positive_log': 2}
+    assert list(validated_data.index) == list(range(4, 10))
+    # the remaining rows are left as they were, not NaN filled
+    assert validated_data.equals(test_data[4:])
+
+
+def test_validation_keeps_missing_values_to_impute():
+    """Test NA in variables imputed by the pipeline are not rejected"""
+    test_data = load_dataset(file_name='test.csv')[:2].copy()
+    test_data.loc[0, 'LotFrontage'] = np.nan
+    test_data.loc[0, 'FireplaceQu'] = np.nan
+
+    mask, _ = get_validation_mask(test_data)
+
+    assert mask.all()
+    assert validate_inputs(input_data=test_data) is test_data